@@ -0,0 +1,106 @@
+"""
+ASGI entry point serving the same API as server.py with Starlette, for running under uvicorn:
+
+    python asgi.py
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+Handlers run on the event loop and await the blocking DB, embedding and graph work in
+Starlette's thread pool, so slow requests do not hold up others; ingestion jobs run on the
+JobManager threads and call Claude with the async client. Streaming /get_graph responses
+are produced by a thread-pool iterator for the same reason.
+
+Each uvicorn worker process has its own DB pool, process pool and jobs. With more than one
+worker (INCITE_WEB_WORKERS) use the streaming /get_graph mode or sticky sessions, since a
+/jobs poll may otherwise reach a worker that does not know the job.
+"""
+import os
+import contextlib
+
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+import server
+from server import APIError, STREAM_FORMATS, STREAM_HEADERS
+from data_retrieval.worker_pool import init_process_pool, shutdown_process_pool
+
+
+class APIResponse(JSONResponse):
+    """
+    JSON response serialised like Flask's jsonify (dates, sorted keys), so both servers
+    return identical bodies.
+    """
+
+    def render(self, content):
+        return server.app.json.dumps(content).encode("utf-8")
+
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+async def get_graph(request):
+    query, options, stream_format = server.parse_graph_request(
+        await read_json(request), request.headers.get("accept", "")
+    )
+    if stream_format:
+        return StreamingResponse(
+            iterate_in_threadpool(server.stream_body(query, options, stream_format)),
+            media_type=STREAM_FORMATS[stream_format],
+            headers=STREAM_HEADERS,
+        )
+    body, status = await run_in_threadpool(server.graph_response, query, options)
+    return APIResponse(body, status_code=status)
+
+
+async def get_job(request):
+    return APIResponse(server.job_response(request.path_params["job_id"]))
+
+
+async def get_paper(request):
+    return APIResponse(await run_in_threadpool(server.paper_response, await read_json(request)))
+
+
+async def handle_api_error(request, error):
+    return APIResponse({"error": error.message}, status_code=error.status_code)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Fork the paper-processing workers before the thread pool starts any threads.
+    init_process_pool()
+    yield
+    server.job_manager.shutdown(wait=False)
+    server.paper_analyser.close()
+    shutdown_process_pool(wait=False)
+    server.vector_db.close()
+
+
+app = Starlette(
+    routes=[
+        Route("/get_graph", get_graph, methods=["POST"]),
+        Route("/jobs/{job_id}", get_job, methods=["GET"]),
+        Route("/get_paper", get_paper, methods=["POST"]),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    exception_handlers={APIError: handle_api_error},
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        "asgi:app",
+        host=os.environ.get("INCITE_HOST", "127.0.0.1"),
+        port=int(os.environ.get("INCITE_PORT", 5000)),
+        workers=int(os.environ.get("INCITE_WEB_WORKERS", 1)),
+        timeout_keep_alive=int(os.environ.get("INCITE_KEEP_ALIVE", 5)),
+    )
@@ -0,0 +1,115 @@
+import random
+from datetime import date, timedelta
+
+SYLLABLES = (
+    "ka", "lo", "mi", "ne", "ru", "ta", "vi", "so", "de", "pa", "zu", "gro", "tri", "qua",
+    "ben", "cor", "fel", "lin", "mor", "sen", "tal", "ver", "xan", "yol",
+)
+
+
+def make_vocabulary(size=2000, seed=0):
+    """
+    `size` distinct pseudo-words, so term statistics look like a real corpus without a
+    dictionary file.
+    """
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def _sentence(rng, vocabulary, words):
+    # Zipf-like draw: low indices are frequent, like common terms in real text.
+    return " ".join(
+        vocabulary[min(int(rng.paretovariate(1.0)) - 1, len(vocabulary) - 1)]
+        if rng.random() < 0.5
+        else rng.choice(vocabulary)
+        for _ in range(words)
+    ).capitalize() + "."
+
+
+def synthetic_corpus(
+    num_papers,
+    references_per_paper=10,
+    internal_reference_ratio=0.5,
+    paragraphs=8,
+    words_per_paragraph=120,
+    seed=0,
+):
+    """
+    `num_papers` paper dicts in the format of retrieve_arxiv_papers.format_paper (plus a
+    summary), with unique arXiv ids and titles.
+
+    Each paper has `references_per_paper` references; `internal_reference_ratio` of them
+    cite other papers of the corpus by title (so they resolve and form citation edges), the
+    rest are titles outside the corpus. Content is `paragraphs` paragraphs separated by blank
+    lines, so longer papers are split into several chunks by the embedding service.
+    Embeddings come from FakeEmbeddingBackend, seeded by the text: 1536-dim and identical
+    across runs.
+    """
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(seed=seed)
+    titles = []
+    seen = set()
+    while len(titles) < num_papers:
+        title = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(4, 9))).title()
+        if title not in seen:
+            seen.add(title)
+            titles.append(title)
+
+    papers = []
+    first_date = date(2015, 1, 1)
+    for i, title in enumerate(titles):
+        arxiv_id = f"{15 + i // 99999 % 85:02d}{1 + i % 12:02d}.{i % 99999:05d}"
+        content = "\n\n".join(
+            " ".join(
+                _sentence(rng, vocabulary, rng.randint(8, 20))
+                for _ in range(max(1, words_per_paragraph // 14))
+            )
+            for _ in range(paragraphs)
+        )
+        references = []
+        for _ in range(references_per_paper):
+            if num_papers > 1 and rng.random() < internal_reference_ratio:
+                cited = rng.randrange(num_papers - 1)
+                references.append(titles[cited if cited < i else cited + 1])
+            else:
+                references.append(
+                    " ".join(rng.choice(vocabulary) for _ in range(rng.randint(4, 9))).title()
+                )
+        papers.append(
+            {
+                "name": title,
+                "url": f"http://arxiv.org/abs/{arxiv_id}v1",
+                "arxiv_id": f"{arxiv_id}v1",
+                "authors": ", ".join(
+                    f"{rng.choice(vocabulary).title()} {rng.choice(vocabulary).title()}"
+                    for _ in range(rng.randint(1, 5))
+                ),
+                "content": content,
+                "publication_date": first_date + timedelta(days=rng.randrange(3650)),
+                "out_references": list(dict.fromkeys(references)),
+                "num_out": len(set(references)),
+                "summary": _sentence(rng, vocabulary, 30),
+            }
+        )
+    return papers
+
+
+def synthetic_queries(papers, num_queries, seed=0):
+    """
+    Search queries: half are words from a paper's title (a known relevant paper exists),
+    half are random words from paper contents.
+    """
+    rng = random.Random(seed + 1)
+    queries = []
+    for i in range(num_queries):
+        paper = rng.choice(papers)
+        if i % 2 == 0:
+            words = paper["name"].split()
+            queries.append(" ".join(rng.sample(words, min(3, len(words)))))
+        else:
+            words = paper["content"].split()
+            queries.append(" ".join(rng.choice(words).strip(".") for _ in range(4)))
+    return queries
@@ -0,0 +1,287 @@
+"""
+Offline benchmarks of the ingest and retrieval paths.
+
+Runs InCiteIRISDatabase against a SQLite file standing in for IRIS, with fake embedding and
+Claude clients whose latency is configurable, over a synthetic corpus. Reports latency
+percentiles, throughput and peak Python memory per stage as JSON, and can compare a run
+with an earlier one:
+
+    python -m benchmarks.run_benchmarks --papers 500 --output new.json
+    python -m benchmarks.run_benchmarks --papers 500 --baseline old.json --max-regression 1.25
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from functools import partial
+
+import numpy as np
+
+from benchmarks.corpus import synthetic_corpus, synthetic_queries
+from benchmarks.stand_ins import FakeAnthropicClient, sqlite_connect
+from llm_cache import LLMCache
+from paper_evaluator import PaperAnalyser
+from vector_db.embeddings import EmbeddingCache, EmbeddingService, FakeEmbeddingBackend
+from vector_db.InCiteOOP import InCiteIRISDatabase, RETRIEVAL_MODES
+
+
+def run_stage(name, operations, items=None, warmup=(), track_memory=True):
+    """
+    Times each zero-argument callable of `operations` in turn. `warmup` callables run first,
+    untimed. `items` is the number of papers or queries processed (default: one per
+    operation) and is used for the throughput. Peak memory is what the stage allocated on
+    top of what was already allocated, as traced by tracemalloc.
+    """
+    for operation in warmup:
+        operation()
+    operations = list(operations)
+    if track_memory:
+        tracemalloc.start()
+    latencies = []
+    started = time.perf_counter()
+    for operation in operations:
+        start = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - start)
+    total = time.perf_counter() - started
+    peak = None
+    if track_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    latencies_ms = np.array(latencies or [0.0]) * 1000.0
+    items = len(operations) if items is None else items
+    return {
+        "name": name,
+        "operations": len(operations),
+        "items": items,
+        "total_s": round(total, 6),
+        "throughput_per_s": round(items / total, 3) if total > 0 else None,
+        "latency_ms": {
+            "mean": round(float(latencies_ms.mean()), 3),
+            "p50": round(float(np.percentile(latencies_ms, 50)), 3),
+            "p90": round(float(np.percentile(latencies_ms, 90)), 3),
+            "p99": round(float(np.percentile(latencies_ms, 99)), 3),
+            "max": round(float(latencies_ms.max()), 3),
+        },
+        "peak_memory_mb": round(peak / 2**20, 3) if peak is not None else None,
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            timeout=10,
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": commit,
+    }
+
+
+def run_benchmarks(args, log=sys.stderr):
+    papers = synthetic_corpus(
+        args.papers,
+        references_per_paper=args.references,
+        internal_reference_ratio=args.internal_references,
+        paragraphs=args.paragraphs,
+        seed=args.seed,
+    )
+    queries = synthetic_queries(papers, args.queries, seed=args.seed)
+    single, bulk = papers[: args.single_inserts], papers[args.single_inserts :]
+    batches = [bulk[start : start + args.batch_size] for start in range(0, len(bulk), args.batch_size)]
+    stage = partial(run_stage, track_memory=not args.no_memory)
+    stages = []
+
+    def report(result):
+        stages.append(result)
+        latency = result["latency_ms"]
+        print(
+            f"{result['name']:<34} {result['operations']:>6} ops  p50 {latency['p50']:>10.3f} ms  "
+            f"p99 {latency['p99']:>10.3f} ms  {result['throughput_per_s'] or 0:>10.1f} items/s  "
+            f"peak {result['peak_memory_mb'] or 0:>8.2f} MB",
+            file=log,
+        )
+
+    with tempfile.TemporaryDirectory() as directory, redirect_stdout(
+        sys.stderr if args.verbose else open(os.devnull, "w")
+    ):
+        embeddings = EmbeddingService(
+            backend=FakeEmbeddingBackend(latency=args.embedding_latency), cache=EmbeddingCache()
+        )
+        db = InCiteIRISDatabase(
+            embedding_service=embeddings,
+            pool_size=args.pool_size,
+            search_mode=args.search_mode,
+            chunk_search=not args.no_chunk_search,
+            connect=sqlite_connect(os.path.join(directory, "incite.sqlite3"), args.db_latency),
+        )
+        db.setup_tables()
+
+        # --- Ingest ---
+        report(stage("insert_article_json", [partial(db.insert_article_json, paper) for paper in single]))
+        report(
+            stage(
+                "upsert_articles",
+                [partial(db.upsert_articles, batch) for batch in batches],
+                items=len(bulk),
+            )
+        )
+        report(
+            stage(
+                "upsert_articles_unchanged",
+                [partial(db.upsert_articles, batch) for batch in batches],
+                items=len(bulk),
+            )
+        )
+
+        # --- Retrieval, with the in-memory indexes loaded ---
+        db.lexical_index()
+        db.load_citation_graph()
+        if args.search_mode == "ann":
+            db.vector_index(db.articles_table_name)
+            db.vector_index(db.article_chunks_table_name)
+        for mode in RETRIEVAL_MODES:
+            search = partial(db.query_articles_json, top_k=args.top_k, include_content=False, mode=mode)
+            report(
+                stage(
+                    f"query_articles_json[{mode}]",
+                    [partial(search, query) for query in queries],
+                    warmup=[partial(search, queries[0])] if queries else (),
+                )
+            )
+        graph = partial(db.query_graph, max_nodes=args.max_nodes, hops=args.hops)
+        report(
+            stage(
+                "query_graph",
+                [partial(graph, query) for query in queries],
+                warmup=[partial(graph, queries[0])] if queries else (),
+            )
+        )
+
+        # --- Analysis ---
+        analyser = PaperAnalyser(cache=LLMCache(path=None), database=db)
+        analyser.client = FakeAnthropicClient(latency=args.llm_latency)
+        contents = [paper["content"] for paper in papers[: args.summaries]]
+        report(stage("summarize", [partial(analyser.summarize, content) for content in contents]))
+        report(stage("summarize_cached", [partial(analyser.summarize, content) for content in contents]))
+
+        db.close()
+
+    return {
+        "benchmark": "incite",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": vars(args),
+        "environment": environment(),
+        "corpus": {
+            "papers": len(papers),
+            "references": sum(len(paper["out_references"]) for paper in papers),
+            "queries": len(queries),
+        },
+        "stages": stages,
+    }
+
+
+def compare(result, baseline, max_regression, log=sys.stderr):
+    """
+    Prints the p50/p99 latency ratio of every stage against a baseline run and returns the
+    names of stages whose p50 got slower than `max_regression` times the baseline.
+    """
+    previous = {stage["name"]: stage for stage in baseline["stages"]}
+    regressions = []
+    for stage in result["stages"]:
+        old = previous.get(stage["name"])
+        if old is None or not old["latency_ms"]["p50"]:
+            continue
+        ratios = {
+            percentile: stage["latency_ms"][percentile] / old["latency_ms"][percentile]
+            if old["latency_ms"][percentile]
+            else None
+            for percentile in ("p50", "p99")
+        }
+        regressed = ratios["p50"] > max_regression
+        if regressed:
+            regressions.append(stage["name"])
+        print(
+            f"{stage['name']:<34} p50 x{ratios['p50']:.2f}  "
+            f"p99 x{ratios['p99'] or 0:.2f}{'  REGRESSION' if regressed else ''}",
+            file=log,
+        )
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    corpus = parser.add_argument_group("corpus")
+    corpus.add_argument("--papers", type=int, default=500)
+    corpus.add_argument("--references", type=int, default=10, help="references per paper")
+    corpus.add_argument(
+        "--internal-references", type=float, default=0.5,
+        help="fraction of references citing papers of the corpus",
+    )
+    corpus.add_argument("--paragraphs", type=int, default=8, help="paragraphs per paper")
+    corpus.add_argument("--queries", type=int, default=50)
+    corpus.add_argument("--seed", type=int, default=0)
+
+    workload = parser.add_argument_group("workload")
+    workload.add_argument("--single-inserts", type=int, default=50, help="papers inserted one at a time")
+    workload.add_argument("--batch-size", type=int, default=50, help="papers per upsert_articles call")
+    workload.add_argument("--summaries", type=int, default=50)
+    workload.add_argument("--top-k", type=int, default=10)
+    workload.add_argument("--max-nodes", type=int, default=100)
+    workload.add_argument("--hops", type=int, default=1)
+    workload.add_argument("--search-mode", choices=("exact", "ann"), default="exact")
+    workload.add_argument("--no-chunk-search", action="store_true")
+    workload.add_argument("--pool-size", type=int, default=4)
+
+    latency = parser.add_argument_group("stand-in latency (seconds)")
+    latency.add_argument("--db-latency", type=float, default=0.0, help="per SQL statement")
+    latency.add_argument("--embedding-latency", type=float, default=0.0, help="per embedding request")
+    latency.add_argument("--llm-latency", type=float, default=0.0, help="per Claude request")
+
+    output = parser.add_argument_group("output")
+    output.add_argument("--output", default="-", help="JSON results file ('-' for stdout)")
+    output.add_argument("--baseline", help="earlier JSON results to compare with")
+    output.add_argument("--max-regression", type=float, default=1.25, help="allowed p50 slowdown ratio")
+    output.add_argument("--no-memory", action="store_true", help="skip tracemalloc (it slows Python code down)")
+    output.add_argument("--verbose", action="store_true", help="show the database's own output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    result = run_benchmarks(args)
+    text = json.dumps(result, indent=2, default=str)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.max_regression)
+        if regressions:
+            print(f"Regressed stages: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import re
+import time
+import hashlib
+import sqlite3
+from functools import lru_cache
+from types import SimpleNamespace
+
+import numpy as np
+
+from vector_db.InCiteOOP import IntegrityError
+
+
+@lru_cache(maxsize=1024)
+def translate_sql(sql):
+    """
+    Rewrites the IRIS SQL used by InCiteIRISDatabase for SQLite: schema-qualified names,
+    VECTOR columns (stored as their text literal, as IRIS returns them), TO_VECTOR and TOP.
+    """
+    sql = re.sub(r"\bInCite\.", "InCite_", sql)
+    sql = re.sub(r"VECTOR\(\w+,\s*\d+\)", "TEXT", sql)
+    sql = re.sub(r"to_vector\((\?),\s*\w+\)", r"\1", sql, flags=re.IGNORECASE)
+    top = re.search(r"SELECT\s+TOP\s+(\d+)", sql)
+    if top:
+        sql = f"{sql[: top.start()]}SELECT{sql[top.end():]} LIMIT {top.group(1)}"
+    return sql
+
+
+@lru_cache(maxsize=65536)
+def _parse_vector(text):
+    # Stored vectors are rescanned by every exact search, so they are parsed once.
+    return np.array(text.split(","), dtype=np.float64)
+
+
+def _dot_product(a, b):
+    if a is None or b is None:
+        return None
+    return float(np.dot(_parse_vector(a), _parse_vector(b)))
+
+
+class SQLiteCursor:
+    """
+    DB-API cursor translating IRIS SQL, sleeping `latency` seconds per statement to mimic
+    the round trip to a database server.
+    """
+
+    def __init__(self, cursor, latency):
+        self.cursor = cursor
+        self.latency = latency
+
+    def _call(self, method, sql, params):
+        if self.latency:
+            time.sleep(self.latency)
+        try:
+            return method(translate_sql(sql), params)
+        except sqlite3.IntegrityError as e:
+            raise IntegrityError(str(e)) from e
+
+    def execute(self, sql, params=()):
+        return self._call(self.cursor.execute, sql, params)
+
+    def executemany(self, sql, rows):
+        return self._call(self.cursor.executemany, sql, list(rows))
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        return self.cursor.fetchmany(size) if size is not None else self.cursor.fetchmany()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def close(self):
+        self.cursor.close()
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+
+class SQLiteConnection:
+    def __init__(self, path, latency=0.0):
+        self.latency = latency
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.create_function("VECTOR_DOT_PRODUCT", 2, _dot_product, deterministic=True)
+
+    def cursor(self):
+        return SQLiteCursor(self.conn.cursor(), self.latency)
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+
+def sqlite_connect(path, latency=0.0):
+    """
+    Connection factory for vector_db.connection_pool.ConnectionPool: a SQLite file standing
+    in for IRIS, with VECTOR_DOT_PRODUCT computed by NumPy.
+    """
+    return lambda: SQLiteConnection(path, latency)
+
+
+class FakeMessages:
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def create(self, **request):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = request["messages"][-1]["content"][0]["text"]
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+        text = (
+            f"<summary>Synthetic summary {digest}. It stands in for Claude.</summary>\n"
+            "<methodological_issues>- Small sample\n- Synthetic data</methodological_issues>\n"
+            "<conflict_of_interest>None declared.</conflict_of_interest>\n"
+            f"<future_research>Scale up {digest}\nCompare with baselines</future_research>"
+        )
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)])
+
+
+class FakeAnthropicClient:
+    """
+    Offline stand-in for anthropic.Anthropic: messages.create sleeps `latency` seconds and
+    returns a well-formed analysis derived from the prompt.
+    """
+
+    def __init__(self, latency=0.0):
+        self.messages = FakeMessages(latency)
@@ -0,0 +1,196 @@
+import threading
+
+import numpy as np
+
+
+def _gather(indptr, indices, nodes):
+    """
+    Concatenated adjacency lists of `nodes` in a CSR structure, without a Python loop.
+    """
+    starts = indptr[nodes]
+    lengths = indptr[nodes + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return indices[offsets + np.arange(total)]
+
+
+class CitationGraph:
+    """
+    Directed citation graph (citing paper -> cited paper) over integer node ids.
+
+    Papers are identified by arbitrary hashable keys (article ids, list positions, ...),
+    mapped to dense node ids in insertion order. Edges are appended cheaply and compacted on
+    the next query into CSR arrays for both directions, so degrees, k-hop neighbourhoods
+    and subgraphs are NumPy operations over the whole graph.
+
+    Nodes and edges can be added at any time.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.node_ids = {}
+        self.lock = threading.RLock()
+
+        self._pending_src = []
+        self._pending_dst = []
+        self.src = np.empty(0, dtype=np.int64)
+        self.dst = np.empty(0, dtype=np.int64)
+        self._csr = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def num_edges(self):
+        with self.lock:
+            self._compact()
+            return len(self.src)
+
+    def node(self, key):
+        return self.node_ids[key]
+
+    def key(self, node):
+        return self.keys[node]
+
+    def add_node(self, key):
+        """
+        Adds a node (if new) and returns its node id.
+        """
+        with self.lock:
+            node = self.node_ids.get(key)
+            if node is None:
+                node = len(self.keys)
+                self.node_ids[key] = node
+                self.keys.append(key)
+            return node
+
+    def _add_edge(self, src, dst):
+        if src != dst:
+            self._pending_src.append(src)
+            self._pending_dst.append(dst)
+            self._csr = None
+
+    def add_edges(self, edges):
+        """
+        Adds (citing key, cited key) edges; both keys must already be nodes.
+        """
+        with self.lock:
+            for src_key, dst_key in edges:
+                self._add_edge(self.node_ids[src_key], self.node_ids[dst_key])
+
+    def remove_out_edges(self, keys):
+        """
+        Drops every edge from the given keys (e.g. before re-adding a paper's references).
+        """
+        with self.lock:
+            nodes = [self.node_ids[key] for key in keys if key in self.node_ids]
+            if not nodes:
+                return
+            self._compact()
+            keep = ~np.isin(self.src, nodes)
+            self.src, self.dst = self.src[keep], self.dst[keep]
+            self._csr = None
+
+    def _compact(self):
+        if not self._pending_src:
+            return
+        n = len(self.keys)
+        src = np.concatenate([self.src, np.asarray(self._pending_src, dtype=np.int64)])
+        dst = np.concatenate([self.dst, np.asarray(self._pending_dst, dtype=np.int64)])
+        # Sort edges by (src, dst) and drop duplicates.
+        edge_ids = np.sort(src * max(n, 1) + dst)
+        edge_ids = edge_ids[np.concatenate(([True], edge_ids[1:] != edge_ids[:-1]))]
+        self.src, self.dst = np.divmod(edge_ids, max(n, 1))
+        self._pending_src = []
+        self._pending_dst = []
+        self._csr = None
+
+    def _adjacency(self):
+        """
+        Returns (out_indptr, out_indices, in_indptr, in_indices), rebuilding them if nodes or
+        edges were added since the last call.
+        """
+        with self.lock:
+            self._compact()
+            n = len(self.keys)
+            if self._csr is None or len(self._csr[0]) != n + 1:
+                out_indptr = np.zeros(n + 1, dtype=np.int64)
+                np.cumsum(np.bincount(self.src, minlength=n), out=out_indptr[1:])
+                order = np.argsort(self.dst, kind="stable")
+                in_indptr = np.zeros(n + 1, dtype=np.int64)
+                np.cumsum(np.bincount(self.dst, minlength=n), out=in_indptr[1:])
+                self._csr = (out_indptr, self.dst, in_indptr, self.src[order])
+            return self._csr
+
+    def out_degree(self):
+        out_indptr, _, _, _ = self._adjacency()
+        return np.diff(out_indptr)
+
+    def in_degree(self):
+        _, _, in_indptr, _ = self._adjacency()
+        return np.diff(in_indptr)
+
+    def successors(self, node):
+        """
+        Node ids cited by `node`.
+        """
+        out_indptr, out_indices, _, _ = self._adjacency()
+        return out_indices[out_indptr[node] : out_indptr[node + 1]]
+
+    def predecessors(self, node):
+        """
+        Node ids citing `node`.
+        """
+        _, _, in_indptr, in_indices = self._adjacency()
+        return in_indices[in_indptr[node] : in_indptr[node + 1]]
+
+    def subgraph_edges(self, nodes):
+        """
+        Edges (citing node ids, cited node ids) between the given nodes.
+        """
+        out_indptr, out_indices, _, _ = self._adjacency()
+        nodes = np.asarray(nodes, dtype=np.int64)
+        selected = np.zeros(len(self.keys), dtype=bool)
+        selected[nodes] = True
+        lengths = out_indptr[nodes + 1] - out_indptr[nodes]
+        src = np.repeat(nodes, lengths)
+        dst = _gather(out_indptr, out_indices, nodes)
+        keep = selected[dst]
+        return src[keep], dst[keep]
+
+    def k_hop(self, nodes, hops=1, direction="both", max_nodes=None):
+        """
+        Breadth-first neighbourhood of `nodes` up to `hops` steps away, following citations
+        "out", "in" or in "both" directions. Returns (node ids, distances) ordered by
+        distance; with max_nodes the expansion stops once that many nodes are reached. When
+        a hop reaches more nodes than the budget allows, the ones linked to most nodes of
+        the previous hop are kept, then the most cited.
+        """
+        out_indptr, out_indices, in_indptr, in_indices = self._adjacency()
+        distance = np.full(len(self.keys), -1, dtype=np.int64)
+        frontier = np.unique(np.asarray(nodes, dtype=np.int64))
+        distance[frontier] = 0
+        reached = [frontier]
+        count = len(frontier)
+        for hop in range(1, hops + 1):
+            if not len(frontier) or (max_nodes is not None and count >= max_nodes):
+                break
+            neighbours = []
+            if direction in ("out", "both"):
+                neighbours.append(_gather(out_indptr, out_indices, frontier))
+            if direction in ("in", "both"):
+                neighbours.append(_gather(in_indptr, in_indices, frontier))
+            frontier, links = np.unique(np.concatenate(neighbours), return_counts=True)
+            new = distance[frontier] < 0
+            frontier, links = frontier[new], links[new]
+            if max_nodes is not None and len(frontier) > max_nodes - count:
+                cited = np.diff(in_indptr)[frontier]
+                order = np.lexsort((frontier, -cited, -links))
+                frontier = np.sort(frontier[order[: max_nodes - count]])
+            distance[frontier] = hop
+            reached.append(frontier)
+            count += len(frontier)
+        reached = np.concatenate(reached)
+        return reached, distance[reached]
@@ -0,0 +1,148 @@
+import os
+import time
+import random
+import asyncio
+import threading
+
+import anthropic
+from anthropic import Anthropic, AsyncAnthropic
+
+_sync_client = None
+_sync_client_pid = None
+_sync_client_lock = threading.Lock()
+
+
+def get_anthropic_client() -> Anthropic:
+    """
+    Returns this process's shared (thread-safe) Anthropic client, so connections and TLS
+    sessions are reused across calls. A new client is created after a fork.
+    """
+    global _sync_client, _sync_client_pid
+    with _sync_client_lock:
+        if _sync_client is None or _sync_client_pid != os.getpid():
+            _sync_client = Anthropic()
+            _sync_client_pid = os.getpid()
+        return _sync_client
+
+
+class TokenBucket:
+    """
+    Async token bucket: allows `rate` acquisitions per second on average, with bursts of up
+    to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+RETRYABLE_ERRORS = (
+    anthropic.RateLimitError,
+    anthropic.InternalServerError,
+    anthropic.APIConnectionError,
+)
+
+
+class AsyncClaudeClient:
+    """
+    Thin wrapper around AsyncAnthropic for fanning out many requests from one process.
+
+    - at most `max_concurrency` requests are in flight at once
+    - requests start at no more than `requests_per_second` (token bucket)
+    - rate-limit, overload and connection errors are retried up to `max_retries` times with
+      exponential backoff and full jitter
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        requests_per_second: float = 4.0,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+    ):
+        # Retries are handled here, so the SDK's own retry loop is disabled.
+        self.client = AsyncAnthropic(max_retries=0)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.bucket = TokenBucket(requests_per_second)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    async def aclose(self):
+        await self.client.close()
+
+    async def create_message(self, **kwargs):
+        """
+        Same arguments as AsyncAnthropic().messages.create.
+        """
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            try:
+                async with self.semaphore:
+                    return await self.client.messages.create(**kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+                print(f"Claude request failed ({type(e).__name__}), retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+
+class EventLoopThread:
+    """
+    An event loop running in a daemon thread, started on first use. Coroutines submitted
+    from any thread run on it, so asyncio limits (semaphores, token buckets) hold across
+    all of them.
+    """
+
+    def __init__(self, name="event-loop"):
+        self.name = name
+        self.loop = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def run(self, coro):
+        """
+        Runs `coro` on the loop and returns its result, blocking the calling thread.
+        """
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(target=self.loop.run_forever, name=self.name, daemon=True)
+                self.thread.start()
+            loop = self.loop
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def close(self, timeout=10.0):
+        """
+        Finalises the loop's async generators (closing per-loop clients), then stops it.
+        """
+        with self.lock:
+            loop, thread = self.loop, self.thread
+            self.loop = self.thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(loop.shutdown_asyncgens(), loop).result(timeout)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            if not thread.is_alive():
+                loop.close()
@@ -0,0 +1,153 @@
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import threading
+
+DEFAULT_CORPUS_DIR = os.environ.get(
+    "INCITE_CORPUS_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "incite", "corpus"),
+)
+DEFAULT_CORPUS_MAX_BYTES = int(os.environ.get("INCITE_CORPUS_MAX_BYTES", 5 * 1024**3))
+
+
+class CorpusCacheMiss(KeyError):
+    """Raised in offline mode when a requested file is not in the store."""
+
+
+class CorpusCache:
+    """
+    Content-addressed on-disk store for arXiv PDFs and text extracted from them.
+
+    Entries are keyed by versioned arXiv id and kind ("pdf", "fulltext", "references"); each
+    file lives at <root>/<aa>/<sha256 of key>. A SQLite index tracks sizes and access times
+    so the store is kept under `max_bytes` by evicting the least recently used files.
+    In offline mode nothing is downloaded and a missing PDF raises CorpusCacheMiss, which
+    makes ingest reproducible against a fixture directory.
+    """
+
+    def __init__(self, root=DEFAULT_CORPUS_DIR, max_bytes=DEFAULT_CORPUS_MAX_BYTES, offline=False):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, size INTEGER, accessed_at REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+        self.db.commit()
+
+    @staticmethod
+    def entry_key(arxiv_id, kind):
+        return f"{arxiv_id}/{kind}"
+
+    def _path(self, key):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, digest[:2], digest)
+
+    def get_path(self, arxiv_id, kind):
+        """
+        Returns the path of a stored file, or None if it is not in the store.
+        """
+        key = self.entry_key(arxiv_id, kind)
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries (key, size, accessed_at) VALUES (?, ?, ?)",
+                (key, os.path.getsize(path), time.time()),
+            )
+            self.db.commit()
+        return path
+
+    def put_file(self, arxiv_id, kind, source_path):
+        """
+        Moves `source_path` into the store and returns its new path.
+        """
+        key = self.entry_key(arxiv_id, kind)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.move(source_path, path)
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries (key, size, accessed_at) VALUES (?, ?, ?)",
+                (key, os.path.getsize(path), time.time()),
+            )
+            self.db.commit()
+            self._evict(keep=key)
+        return path
+
+    def get_text(self, arxiv_id, kind):
+        path = self.get_path(arxiv_id, kind)
+        if path is None:
+            return None
+        with open(path, encoding="utf-8") as text_file:
+            return text_file.read()
+
+    def put_text(self, arxiv_id, kind, text):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as text_file:
+            text_file.write(text)
+        return self.put_file(arxiv_id, kind, tmp_path)
+
+    def get_pdf(self, arxiv_id, download):
+        """
+        Returns the path of the stored PDF, calling download(arxiv_id, path) to fetch it into
+        the store on a miss (unless offline).
+        """
+        path = self.get_path(arxiv_id, "pdf")
+        if path is not None:
+            return path
+        if self.offline:
+            raise CorpusCacheMiss(f"{arxiv_id} is not in the corpus cache at {self.root}.")
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".pdf.tmp")
+        os.close(fd)
+        try:
+            download(arxiv_id, tmp_path)
+            return self.put_file(arxiv_id, "pdf", tmp_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _evict(self, keep=None):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.db.execute(
+            "SELECT key, size FROM entries ORDER BY accessed_at"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+        self.db.commit()
+
+
+_default_cache = None
+_default_cache_pid = None
+_default_cache_lock = threading.Lock()
+
+
+def get_corpus_cache():
+    """
+    Returns this process's CorpusCache (reopened after a fork). INCITE_OFFLINE=1 enables
+    offline mode.
+    """
+    global _default_cache, _default_cache_pid
+    with _default_cache_lock:
+        if _default_cache is None or _default_cache_pid != os.getpid():
+            _default_cache = CorpusCache(offline=os.environ.get("INCITE_OFFLINE") == "1")
+            _default_cache_pid = os.getpid()
+        return _default_cache
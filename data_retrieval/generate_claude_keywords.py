@@ -1,28 +1,36 @@
 from dotenv import load_dotenv
 import os
-from anthropic import Anthropic
+from claude_client import get_anthropic_client
+from llm_cache import get_llm_cache
 
 load_dotenv()
 
+KEYWORDS_MODEL = "claude-3-5-haiku-20241022"
+# Bump when the prompt changes so cached keywords are not reused.
+KEYWORDS_PROMPT_VERSION = 1
+
 
 def generate_keywords_with_claude(topic):
-    client = Anthropic()
-
-    prompt = f"""You are given a research topic: {topic}.
-        Generate a list of the 5-10 most relevant keywords or short phrases 
-        that a researcher would use to find scientific papers on arXiv 
-        about this topic. 
-        Return these keywords in a comma-separated list only."""
-
-    response = client.messages.create(
-        model="claude-3-5-haiku-20241022",
-        max_tokens=100,
-        messages=[{"role": "user", "content": prompt}],
-    )
+    def compute():
+        client = get_anthropic_client()
+
+        prompt = f"""You are given a research topic: {topic}.
+            Generate a list of the 5-10 most relevant keywords or short phrases 
+            that a researcher would use to find scientific papers on arXiv 
+            about this topic. 
+            Return these keywords in a comma-separated list only."""
 
-    keywords = response.choices[
-            0
-    ].message.content.split(",")
-    keywords = [kw.strip() for kw in keywords]
+        response = client.messages.create(
+            model=KEYWORDS_MODEL,
+            max_tokens=100,
+            messages=[{"role": "user", "content": prompt}],
+        )
+
+        keywords = response.content[0].text.split(",")
+        return [kw.strip() for kw in keywords]
+
+    keywords = get_llm_cache().get_or_compute(
+        KEYWORDS_MODEL, KEYWORDS_PROMPT_VERSION, topic, compute
+    )
     print(keywords)
     return keywords
@@ -0,0 +1,163 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+REFERENCES_HEADING = re.compile(
+    r"^\s*(?:\d+\.?\s*)?(references|bibliography|works cited|literature cited)\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+# Sections that commonly follow the bibliography.
+END_OF_BIBLIOGRAPHY = re.compile(
+    r"^\s*(?:[A-Z]\.?\s+)?(appendix|appendices|supplementary material|checklist)\b.*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+NUMBERED_ENTRY = re.compile(r"^\s*(?:\[\d{1,3}\]|\d{1,3}\.)\s+", re.MULTILINE)
+QUOTED_TITLE = re.compile(r"[“\"](?P<title>[^”\"]{10,300}?)[,.]?[”\"]")
+YEAR_THEN_TITLE = re.compile(
+    r"^(?P<authors>.{3,300}?)\(?(?:19|20)\d{2}[a-z]?\)?[.,]\s+(?P<title>[^.?!]{10,300}[.?!])(?:\s|$)"
+)
+AUTHORS_THEN_TITLE = re.compile(
+    r"^(?P<authors>.{3,400}?(?:[a-z]{2}|et al))\.\s+(?P<title>[A-Z0-9][^?!]{8,300}?[^A-Z\s][.?!])(?:\s|$)"
+)
+VENUE_WORDS = re.compile(r"^(in |proceedings|arxiv|preprint|journal|advances in|conference)", re.IGNORECASE)
+
+# Fraction of entries that must yield a plausible title for the regex path to be trusted;
+# below it the whole bibliography goes to the LLM, above it only the unparsed entries do.
+REGEX_MIN_COVERAGE = 0.8
+CHUNK_CHARS = 6000
+MAX_PARALLEL_CHUNKS = 4
+
+
+def locate_bibliography(text):
+    """
+    Returns the bibliography section of a paper's text: from the last references heading up
+    to the next appendix-like heading. Returns the whole text if no heading is found.
+    """
+    matches = list(REFERENCES_HEADING.finditer(text))
+    if not matches:
+        return text
+    start = matches[-1].end()
+    end_match = END_OF_BIBLIOGRAPHY.search(text, start)
+    end = end_match.start() if end_match else len(text)
+    return text[start:end]
+
+
+def _clean(entry):
+    entry = re.sub(r"-\n(?=[a-z])", "", entry)
+    return " ".join(entry.split())
+
+
+def split_entries(bibliography):
+    """
+    Splits a bibliography into individual entries, using [n] / n. markers when present and
+    blank lines otherwise. Returns an empty list if neither gives at least three entries.
+    """
+    markers = list(NUMBERED_ENTRY.finditer(bibliography))
+    if len(markers) >= 3:
+        bounds = [m.start() for m in markers] + [len(bibliography)]
+        entries = [
+            bibliography[markers[i].end() : bounds[i + 1]] for i in range(len(markers))
+        ]
+    else:
+        entries = re.split(r"\n\s*\n", bibliography)
+    entries = [_clean(entry) for entry in entries if entry.strip()]
+    return entries if len(entries) >= 3 else []
+
+
+def _plausible_title(title):
+    title = title.strip().rstrip(".").strip()
+    words = title.split()
+    if not 2 <= len(words) <= 40 or VENUE_WORDS.match(title):
+        return None
+    if sum(c.isalpha() for c in title) < 0.6 * len(title):
+        return None
+    return title
+
+
+def regex_title(entry):
+    """
+    Extracts the title from a well-formatted reference entry (quoted IEEE titles,
+    author-year styles and "Authors. Title. Venue" styles), or returns None.
+    """
+    for pattern in (QUOTED_TITLE, YEAR_THEN_TITLE, AUTHORS_THEN_TITLE):
+        match = pattern.search(entry) if pattern is QUOTED_TITLE else pattern.match(entry)
+        if match:
+            title = _plausible_title(match.group("title"))
+            if title:
+                return title
+    return None
+
+
+def regex_titles(entries):
+    """
+    Fast path: returns the title (or None) of every entry if the bibliography is regular
+    enough (at least REGEX_MIN_COVERAGE of entries parse), otherwise None.
+    """
+    if not entries:
+        return None
+    titles = [regex_title(entry) for entry in entries]
+    if sum(1 for title in titles if title) < REGEX_MIN_COVERAGE * len(entries):
+        return None
+    return titles
+
+
+def chunk_bibliography(bibliography, entries, chunk_chars=CHUNK_CHARS):
+    """
+    Splits the bibliography into chunks of about chunk_chars, on entry boundaries when the
+    entries are known and on line boundaries otherwise.
+    """
+    pieces = entries if entries else bibliography.splitlines()
+    chunks, current, size = [], [], 0
+    for piece in pieces:
+        if current and size + len(piece) > chunk_chars:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def dedupe_titles(titles):
+    seen = set()
+    unique = []
+    for title in titles:
+        title = title.strip().strip("-*•").strip()
+        key = re.sub(r"[^a-z0-9]+", " ", title.lower()).strip()
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(title)
+    return unique
+
+
+def extract_references(text, extract_chunk, max_workers=MAX_PARALLEL_CHUNKS):
+    """
+    Extracts referenced paper titles from a paper's text.
+
+    The bibliography is located first; if its entries parse with regexes no LLM call is made
+    for them, and only the entries the regexes could not parse are sent to the LLM (their
+    titles follow the parsed ones). Otherwise the whole bibliography is split into chunks.
+    Chunks are sent to `extract_chunk` (text -> list of titles) concurrently, and the results
+    are merged and deduplicated in order.
+    """
+    bibliography = locate_bibliography(text)
+    entries = split_entries(bibliography)
+    titles = regex_titles(entries)
+    if titles is not None:
+        parsed = [title for title in titles if title]
+        unparsed = [entry for entry, title in zip(entries, titles) if not title]
+        print(
+            f"Parsed {len(parsed)} references without the LLM"
+            + (f", sending {len(unparsed)} others to it." if unparsed else ".")
+        )
+        if not unparsed:
+            return dedupe_titles(parsed)
+        chunks = chunk_bibliography("\n".join(unparsed), unparsed)
+    else:
+        parsed = []
+        chunks = chunk_bibliography(bibliography, entries)
+    if not chunks:
+        return dedupe_titles(parsed)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        results = list(executor.map(extract_chunk, chunks))
+    return dedupe_titles(parsed + [title for chunk_titles in results for title in chunk_titles])
@@ -1,26 +1,108 @@
 import re
 import io
+import os
+import threading
 import requests
 import json
-from langchain_community.retrievers import ArxivRetriever
-from anthropic import Anthropic 
+import arxiv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from claude_client import get_anthropic_client
 from io import BytesIO
 from pdfminer.high_level import extract_text
-from concurrent.futures import ProcessPoolExecutor
 
-def format_paper(paper):
-    info = paper.metadata
-    arxiv_id = info["entry_id"].split("/")[-1].split("v")[0]
+from llm_cache import get_llm_cache
+from data_retrieval.corpus_cache import get_corpus_cache
+from data_retrieval.reference_extraction import REFERENCES_HEADING, extract_references
+from data_retrieval.worker_pool import get_process_pool
+
+REFERENCES_MODEL = "claude-3-5-haiku-20241022"
+# Bump when the prompt changes so cached reference lists are not reused.
+REFERENCES_PROMPT_VERSION = 2
+# Output budget per bibliography chunk (see reference_extraction.CHUNK_CHARS).
+REFERENCES_MAX_TOKENS = 2048
+
+# "pymupdf" (fast, default) or "pdfminer".
+PDF_TEXT_BACKEND = os.environ.get("INCITE_PDF_BACKEND", "pymupdf")
+PDF_DOWNLOAD_TIMEOUT = (10, 60)  # (connect, read) seconds
+PDF_MAX_BYTES = 100 * 1024 * 1024
+PDF_CHUNK_SIZE = 64 * 1024
+ARXIV_MAX_QUERY_LENGTH = 300
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_arxiv_client = None
+
+
+def get_arxiv_client():
+    """
+    Returns the shared arxiv API client (it rate-limits its own requests).
+    """
+    global _arxiv_client
+    with _session_lock:
+        if _arxiv_client is None:
+            _arxiv_client = arxiv.Client()
+        return _arxiv_client
+
+
+def get_http_session():
+    """
+    Returns this process's pooled requests.Session (keep-alive connections and retries on
+    transient errors). Each worker process gets its own session after a fork.
+    """
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            retry = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET",),
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+            _session_pid = os.getpid()
+        return _session
+
+def paper_metadata(result):
+    """
+    Picklable metadata for an arxiv.Result, so papers can be formatted in worker processes.
+    """
+    return {
+        "arxiv_id": result.get_short_id(),  # includes the version, e.g. 2101.01234v2
+        "name": result.title,
+        "url": result.entry_id,
+        "authors": ", ".join(author.name for author in result.authors),
+        "publication_date": result.updated.date(),
+        "abstract": result.summary,
+    }
+
+def format_paper(metadata):
+    arxiv_id = metadata["arxiv_id"]
+    try:
+        content, references_text = get_paper_texts(arxiv_id)
+    except Exception as e:
+        print(f"Could not get the PDF for {arxiv_id}, using the abstract: {e}")
+        content, references_text = metadata["abstract"], ""
     try:
-        references = get_references(arxiv_id)
+        references = (
+            extract_references(references_text, extract_references_from_claude)
+            if references_text
+            else []
+        )
     except:
         references = []
     paper_information = {
-        "name": info["Title"],
-        "url": info["entry_id"],
-        "authors": info["Authors"],
-        "content": paper.page_content,
-        "publication_date": info["Published"],
+        "name": metadata["name"],
+        "url": metadata["url"],
+        "arxiv_id": arxiv_id,
+        "authors": metadata["authors"],
+        "content": content,
+        "publication_date": metadata["publication_date"],
         "out_references": references,
         "num_out": len(references),
     }
@@ -28,27 +110,41 @@ def format_paper(paper):
     return paper_information
 
 
-def get_papers(keywords, max_results):
-
-    retriever = ArxivRetriever(
-        load_max_docs=max_results,
-        get_full_documents=True,
-        load_all_available_meta=True,
-        top_k_results=max_results,
-    )
-    query = " OR ".join(keywords)
-    docs = retriever.invoke(query)
-    papers_list = []
+def get_papers(keywords, max_results, executor=None):
+    """
+    Searches arXiv and formats the results in parallel on `executor` (by default the
+    long-lived process pool from worker_pool).
+    """
+    query = " OR ".join(keywords)[:ARXIV_MAX_QUERY_LENGTH]
+    search = arxiv.Search(query=query, max_results=max_results)
+    results = [paper_metadata(result) for result in get_arxiv_client().results(search)]
 
-    with ProcessPoolExecutor() as executor:
-        papers = list(executor.map(format_paper, docs))
+    executor = executor or get_process_pool()
+    return list(executor.map(format_paper, results))
 
-    return papers
+def get_paper_texts(arxiv_id):
+    """
+    Returns (full text, references section text) for an arXiv paper. Both are served from the
+    local corpus cache when present; otherwise the PDF is fetched once (or read from the
+    cache), both texts are extracted from it in one pass and stored.
+    """
+    corpus = get_corpus_cache()
+    content = corpus.get_text(arxiv_id, "fulltext")
+    references_text = corpus.get_text(arxiv_id, "references")
+    if content is None or references_text is None:
+        pdf_path = corpus.get_pdf(arxiv_id, download_arxiv_pdf_to)
+        content, references_text = extract_pdf_texts(pdf_path)
+        corpus.put_text(arxiv_id, "fulltext", content)
+        corpus.put_text(arxiv_id, "references", references_text)
+    return content, references_text
 
 def get_references(arxiv_id):
-    raw_pdf_bytes = get_arxiv_pdf_in_memory(arxiv_id)
-    text = extract_text_from_pdf_bytes(raw_pdf_bytes)
-    references = extract_references_from_claude(text)
+    corpus = get_corpus_cache()
+    text = corpus.get_text(arxiv_id, "references")
+    if text is None:
+        text = extract_references_text(corpus.get_pdf(arxiv_id, download_arxiv_pdf_to))
+        corpus.put_text(arxiv_id, "references", text)
+    references = extract_references(text, extract_references_from_claude)
     print("Got references")
     # cleansed_references = cleanse_references(references)
     return references
@@ -62,13 +158,86 @@ def get_arxiv_pdf_in_memory(arxiv_id):
     pdf_url = f"https://arxiv.org/pdf/{arxiv_id}.pdf"
     print(f"Fetching PDF from: {pdf_url}")
     
-    response = requests.get(pdf_url)
+    response = get_http_session().get(pdf_url, timeout=PDF_DOWNLOAD_TIMEOUT)
     if response.status_code != 200:
         raise ValueError(f"Failed to download PDF (HTTP {response.status_code}) from {pdf_url}.")
     print(f"Downloaded {len(response.content)} bytes.")
     
     return response.content  # Return the raw PDF bytes
 
+def download_arxiv_pdf_to(arxiv_id, path):
+    """
+    Streams the PDF for an arXiv ID into the file at `path`. Memory use is bounded by
+    PDF_CHUNK_SIZE, not the PDF size.
+    """
+    pdf_url = f"https://arxiv.org/pdf/{arxiv_id}.pdf"
+    print(f"Fetching PDF from: {pdf_url}")
+
+    with open(path, "wb") as pdf_file:
+        with get_http_session().get(pdf_url, stream=True, timeout=PDF_DOWNLOAD_TIMEOUT) as response:
+            if response.status_code != 200:
+                raise ValueError(f"Failed to download PDF (HTTP {response.status_code}) from {pdf_url}.")
+            size = 0
+            for chunk in response.iter_content(chunk_size=PDF_CHUNK_SIZE):
+                size += len(chunk)
+                if size > PDF_MAX_BYTES:
+                    raise ValueError(f"PDF at {pdf_url} is larger than {PDF_MAX_BYTES} bytes.")
+                pdf_file.write(chunk)
+    print(f"Downloaded {size} bytes.")
+
+def _open_pymupdf(pdf_path):
+    try:
+        import pymupdf
+    except ImportError:  # PyMuPDF < 1.24.3
+        import fitz as pymupdf
+    return pymupdf.open(pdf_path)
+
+def extract_pdf_texts(pdf_path, backend=None):
+    """
+    Reads every page of a PDF once and returns (full text, references section text).
+    """
+    backend = backend or PDF_TEXT_BACKEND
+    if backend == "pymupdf":
+        with _open_pymupdf(pdf_path) as doc:
+            pages = [page.get_text() for page in doc]
+    else:
+        # pdfminer separates pages with form feeds.
+        pages = [page for page in extract_text(pdf_path).split("\f")]
+    return "".join(pages), _references_from_pages(len(pages), pages.__getitem__)
+
+def extract_references_text(pdf_path, backend=None):
+    """
+    Extracts only the reference section of a PDF: pages are read from the end until the
+    "References"/"Bibliography" heading is found, and text from that heading to the end is
+    returned. Falls back to the whole document when no heading is found.
+    """
+    backend = backend or PDF_TEXT_BACKEND
+    if backend == "pymupdf":
+        with _open_pymupdf(pdf_path) as doc:
+            page_count = doc.page_count
+            read_page = lambda page_number: doc.load_page(page_number).get_text()
+            return _references_from_pages(page_count, read_page)
+
+    from pdfminer.pdfpage import PDFPage
+
+    with open(pdf_path, "rb") as pdf_file:
+        page_count = sum(1 for _ in PDFPage.get_pages(pdf_file))
+        read_page = lambda page_number: extract_text(pdf_file, page_numbers=[page_number])
+        return _references_from_pages(page_count, read_page)
+
+def _references_from_pages(page_count, read_page):
+    pages = []
+    for page_number in range(page_count - 1, -1, -1):
+        text = read_page(page_number)
+        pages.append(text)
+        # Take the last heading on the page, in case an earlier section mentions references.
+        matches = list(REFERENCES_HEADING.finditer(text))
+        if matches:
+            pages[-1] = text[matches[-1].start():]
+            return "".join(reversed(pages))
+    print("No references heading found, using the full text.")
+    return "".join(reversed(pages))
+
 def extract_text_from_pdf_bytes(pdf_bytes):
     """
     Convert PDF bytes into text using pdfminer.six, all in memory.
@@ -80,24 +249,32 @@ def extract_text_from_pdf_bytes(pdf_bytes):
 
 
 def extract_references_from_claude(text):
-    client = Anthropic()
-
-    prompt = f"""
-        Extract the titles of papers referenced by the given text. You must give the titles in a list seperated by newlines. Your response must be inside <titles> tags.
-        Here is the text: {text}
     """
+    Asks Claude for the titles referenced in `text` (one bibliography chunk; see
+    reference_extraction.extract_references). Results are cached by chunk.
+    """
+    def compute():
+        client = get_anthropic_client()
+
+        prompt = f"""
+            Extract the titles of papers referenced by the given text. You must give the titles in a list seperated by newlines. Your response must be inside <titles> tags.
+            Here is the text: {text}
+        """
 
-    response = client.messages.create(
-        model="claude-3-5-haiku-20241022",  
-        max_tokens=6024,
-        messages=[
-            {"role": "user", "content": prompt},
-            {"role": "assistant", "content":"[{"}
-        ]
-    ).content[0].text
+        response = client.messages.create(
+            model=REFERENCES_MODEL,
+            max_tokens=REFERENCES_MAX_TOKENS,
+            messages=[
+                {"role": "user", "content": prompt},
+                {"role": "assistant", "content":"[{"}
+            ]
+        ).content[0].text
 
-    documents = extract_tag_content(response, "titles").split("\n")
-    return documents
+        return extract_tag_content(response, "titles").split("\n")
+
+    return get_llm_cache().get_or_compute(
+        REFERENCES_MODEL, REFERENCES_PROMPT_VERSION, text, compute
+    )
 
 def cleanse_references(references):
     references = references.split("name: ")
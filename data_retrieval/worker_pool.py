@@ -0,0 +1,72 @@
+import os
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_PROCESS_WORKERS = int(os.environ.get("INCITE_PROCESS_WORKERS", os.cpu_count() or 4))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    """
+    Runs once in each worker process: creates the per-process API clients, HTTP session and
+    caches up front so individual tasks do not pay for them. Warm-up is best effort: an
+    exception here would break the whole pool, so failures are left to the first task.
+    """
+    try:
+        from claude_client import get_anthropic_client
+        from data_retrieval.corpus_cache import get_corpus_cache
+        from data_retrieval.retrieve_arxiv_papers import get_http_session
+        from llm_cache import get_llm_cache
+    except Exception as e:
+        print(f"Could not warm up worker {os.getpid()}: {e}")
+        return
+
+    for warm_up in (get_anthropic_client, get_http_session, get_llm_cache, get_corpus_cache):
+        try:
+            warm_up()
+        except Exception as e:
+            print(f"Could not initialise {warm_up.__name__} in worker {os.getpid()}: {e}")
+
+
+def _noop():
+    return os.getpid()
+
+
+def init_process_pool(max_workers=None):
+    """
+    Creates the long-lived process pool and starts its workers now, so they are forked
+    before the server starts any threads. Calling it again returns the existing pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers or DEFAULT_PROCESS_WORKERS, initializer=_init_worker
+            )
+            # The first submit spawns every worker process.
+            _pool.submit(_noop).result()
+        return _pool
+
+
+def get_process_pool():
+    """
+    Returns the shared process pool, creating it on first use.
+    """
+    return _pool or init_process_pool()
+
+
+def shutdown_process_pool(wait=True):
+    """
+    Stops the shared pool; pending tasks are cancelled, running ones finish if wait=True.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait, cancel_futures=True)
+            _pool = None
+
+
+atexit.register(shutdown_process_pool)
@@ -4,6 +4,8 @@ import { motion } from "framer-motion"
 import "reactflow/dist/style.css";
 import './App.css';
 
+const API_URL = 'https://legible-locust-innocent.ngrok-free.app';
+
 function App() {
     const [activeTab, setActiveTab] = useState('home');
     const [inputText, setInputText] = useState('');
@@ -134,29 +136,70 @@ function App() {
         );
     };
 
+    // Streams the graph as NDJSON events, calling onNodes with every node received so far,
+    // so a partial graph can be drawn while the server is still ingesting papers.
+    const fetchGraph = async (query, onNodes) => {
+        const response = await fetch(`${API_URL}/get_graph`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ query, stream: 'ndjson' }),
+        });
+
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        const nodes = new Map();
+        let buffered = '';
+        let summary = null;
+
+        const handleEvent = (event) => {
+            if (event.type === 'node') {
+                nodes.set(event.node.id, event.node);
+                onNodes([...nodes.values()]);
+            } else if (event.type === 'summary') {
+                summary = event;
+            } else if (event.type === 'error') {
+                throw new Error(`Graph generation failed: ${event.error}`);
+            }
+        };
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffered += decoder.decode(value, { stream: true });
+            const lines = buffered.split('\n');
+            buffered = lines.pop();
+            lines.filter((line) => line.trim()).forEach((line) => handleEvent(JSON.parse(line)));
+        }
+        if (buffered.trim()) {
+            handleEvent(JSON.parse(buffered));
+        }
+        if (!summary) {
+            throw new Error('Graph stream ended early');
+        }
+        return summary.ids.filter((id) => nodes.has(id)).map((id) => nodes.get(id));
+    };
+
+    const renderGraph = (graphDatas) => {
+        setGraphDatas(graphDatas);
+        const processedData = processInputData(graphDatas);
+        const { nodes, edges } = generateGraph(processedData);
+        setGraph({ nodes, edges });
+    };
+
     const handleSubmit = async (e) => {
         e.preventDefault();
         setError('');
 
         try {
-            const response = await fetch('https://legible-locust-innocent.ngrok-free.app/get_graph', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ query: inputText }),
-            });
-
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            const responseData = await response.json();
-            const graphDatas = responseData.graph;
-            setGraphDatas(graphDatas);
-
-            const processedData = processInputData(graphDatas);
-            const { nodes, edges } = generateGraph(processedData);
-            setGraph({ nodes, edges });
+            const graphDatas = await fetchGraph(inputText, renderGraph);
+            renderGraph(graphDatas);
             const nodesWithInfluence = calculateNodeInfluence(graphDatas);
             const gradient = generateBackgroundGradient(nodesWithInfluence);
             console.log("Generated Gradient:", gradient);
@@ -176,7 +219,7 @@ function App() {
                     publication_date: graphData.publication_date,
                     out_references: graphData.out_references,
                     num_out: graphData.num_out,
-                    in_references: graphData.in_references,
+                    in_refs: graphData.in_refs,
                     num_in: graphData.num_in,
                     summary: graphData.summary,
                     method_issues: graphData.method_issues,
@@ -520,8 +563,8 @@ function App() {
                             {/* In References */}
                             <p>
                                 <strong>Referenced by:</strong>
-                                {selectedNode?.num_in > 0 && Array.isArray(selectedNode?.in_references) && selectedNode.in_references.length > 0 ? (
-                                    selectedNode.in_references.map((ref) => (
+                                {selectedNode?.num_in > 0 && Array.isArray(selectedNode?.in_refs) && selectedNode.in_refs.length > 0 ? (
+                                    selectedNode.in_refs.map((ref) => (
                                         <button
                                             key={ref}
                                             onClick={() => handleReferenceClick(ref)}
@@ -616,8 +659,8 @@ function App() {
                             {/* In References */}
                             <p>
                                 <strong>Referenced by:</strong>
-                                {selectedNode?.num_in > 0 && Array.isArray(selectedNode?.in_references) && selectedNode.in_references.length > 0 ? (
-                                    selectedNode.in_references.map((ref) => (
+                                {selectedNode?.num_in > 0 && Array.isArray(selectedNode?.in_refs) && selectedNode.in_refs.length > 0 ? (
+                                    selectedNode.in_refs.map((ref) => (
                                         <button
                                             key={ref}
                                             onClick={() => handleReferenceClick(ref)}
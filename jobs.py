@@ -0,0 +1,159 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Job:
+    """
+    A unit of background work with status and progress that can be polled over HTTP.
+    Status goes queued -> running -> done | failed.
+
+    The job function can also publish events (e.g. each item it produced); follow() lets any
+    number of readers stream them, together with progress, while the job runs.
+    """
+
+    def __init__(self, job_id, description=""):
+        self.id = job_id
+        self.description = description
+        self.status = "queued"
+        self.progress = 0
+        self.total = None
+        self.message = ""
+        self.error = None
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.events = []
+        self.version = 0
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    def update(self, progress=None, total=None, message=None):
+        with self.lock:
+            if progress is not None:
+                self.progress = progress
+            if total is not None:
+                self.total = total
+            if message is not None:
+                self.message = message
+            self._notify()
+
+    def _notify(self):
+        # Called with self.lock held.
+        self.version += 1
+        self.changed.notify_all()
+
+    def publish(self, event):
+        """
+        Appends an event (a JSON-serialisable dict) for readers of follow().
+        """
+        with self.lock:
+            self.events.append(event)
+            self._notify()
+
+    def follow(self, timeout=15):
+        """
+        Yields (new events, to_json() state) whenever the job publishes events or its status
+        or progress change, starting with every event published so far, until the job has
+        finished. If nothing changes for `timeout` seconds, yields ([], state) anyway so
+        callers can send keep-alives.
+        """
+        seen = 0
+        version = None
+        while True:
+            with self.changed:
+                self.changed.wait_for(lambda: self.version != version, timeout)
+                version = self.version
+                events = self.events[seen:]
+                seen = len(self.events)
+                finished = self.finished
+            yield events, self.to_json()
+            if finished:
+                return
+
+    def to_json(self):
+        with self.lock:
+            return {
+                "job_id": self.id,
+                "description": self.description,
+                "status": self.status,
+                "progress": self.progress,
+                "total": self.total,
+                "message": self.message,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobManager:
+    """
+    Runs jobs on a local worker pool. `fn(job, *args)` is called on a worker thread and its
+    return value becomes job.result. Submitting with a `key` that matches a job that is still
+    queued or running returns that job instead of starting a duplicate.
+    Only the most recent `max_finished_jobs` finished jobs are kept.
+    """
+
+    def __init__(self, max_workers=2, max_finished_jobs=200):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="incite-job")
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs = OrderedDict()
+        self.active_keys = {}
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args, key=None, description=""):
+        with self.lock:
+            if key is not None and key in self.active_keys:
+                job = self.jobs.get(self.active_keys[key])
+                if job is not None and not job.finished:
+                    return job
+            job = Job(uuid.uuid4().hex, description)
+            self.jobs[job.id] = job
+            if key is not None:
+                self.active_keys[key] = job.id
+            self._prune()
+        self.executor.submit(self._run, job, key, fn, args)
+        return job
+
+    def _run(self, job, key, fn, args):
+        with job.lock:
+            job.status = "running"
+            job.started_at = time.time()
+            job._notify()
+        try:
+            result = fn(job, *args)
+            with job.lock:
+                job.result = result
+                job.status = "done"
+        except Exception as e:
+            print(f"Job {job.id} failed: {e}")
+            with job.lock:
+                job.error = str(e)
+                job.status = "failed"
+        finally:
+            with job.lock:
+                job.finished_at = time.time()
+                job._notify()
+            with self.lock:
+                if key is not None and self.active_keys.get(key) == job.id:
+                    del self.active_keys[key]
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
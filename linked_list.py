@@ -2,7 +2,10 @@ import types
 
 
 class PaperNode:
-   def __init__(self, name, url, keywords, out_refs, in_refs = set()):
+   def __init__(self, name, url, keywords, out_refs, in_refs = None):
+      # A set() default would be shared by every node. For whole graphs use
+      # citation_graph.CitationGraph instead.
+      in_refs = set() if in_refs is None else set(in_refs)
       self.name = self.val = name
       self.url = url
       self.keywords = keywords # set of strings
@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+from vector_db.embeddings import DEFAULT_CACHE_DIR
+
+_MISSING = object()
+
+
+class LLMCache:
+    """
+    Durable cache for deterministic LLM calls, keyed by (model, prompt template version,
+    SHA-256 of the input). Values must be JSON-serialisable.
+
+    An in-memory LRU sits in front of a SQLite file (WAL mode, so the pool's worker processes
+    can share it); the file is bounded to `max_entries`, evicting least recently used rows.
+    """
+
+    def __init__(
+        self,
+        path=os.path.join(DEFAULT_CACHE_DIR, "llm.sqlite3"),
+        max_entries=50000,
+        max_memory_items=2000,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_memory_items = max_memory_items
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+
+        self.db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, accessed_at REAL, value TEXT)"
+            )
+            self.db.execute(
+                "CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at)"
+            )
+            self.db.commit()
+            self.size = self.db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    @staticmethod
+    def key(model, template_version, text):
+        digest = hashlib.sha256()
+        for part in (model, str(template_version), text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_items:
+            self.memory.popitem(last=False)
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return self.memory[key]
+            if self.db is not None:
+                row = self.db.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self.db.execute(
+                        "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key)
+                    )
+                    self.db.commit()
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self.lock:
+            self._remember(key, value)
+            if self.db is None:
+                return
+            self.db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, accessed_at, value) VALUES (?, ?, ?)",
+                (key, time.time(), json.dumps(value)),
+            )
+            self.size += 1
+            if self.size > self.max_entries:
+                # Evict in chunks of 10% so this does not run on every insert.
+                self.db.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                    (max(1, self.max_entries // 10),),
+                )
+                self.size = self.db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            self.db.commit()
+
+    def get_or_compute(self, model, template_version, text, compute):
+        """
+        Returns the cached value for this call, or runs compute() and caches its result.
+        """
+        key = self.key(model, template_version, text)
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    async def aget_or_compute(self, model, template_version, text, compute):
+        """
+        Async version of get_or_compute; compute is a coroutine function.
+        """
+        key = self.key(model, template_version, text)
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = await compute()
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "memory_items": len(self.memory)}
+
+
+_default_cache = None
+_default_cache_pid = None
+_default_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """
+    Returns the process-wide LLMCache. A new one is opened after a fork, because SQLite
+    connections must not be shared between processes. Set INCITE_LLM_CACHE=0 to disable.
+    """
+    global _default_cache, _default_cache_pid
+    with _default_cache_lock:
+        if _default_cache is None or _default_cache_pid != os.getpid():
+            path = None if os.environ.get("INCITE_LLM_CACHE") == "0" else os.path.join(DEFAULT_CACHE_DIR, "llm.sqlite3")
+            _default_cache = LLMCache(path=path, max_memory_items=2000 if path else 0)
+            _default_cache_pid = os.getpid()
+        return _default_cache
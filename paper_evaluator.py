@@ -1,10 +1,21 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from anthropic import Anthropic
 from openai import OpenAI
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 import re
+import asyncio
+import threading
+import weakref
+
+from claude_client import AsyncClaudeClient, EventLoopThread, get_anthropic_client
+from llm_cache import LLMCache, get_llm_cache
 
 MODEL_NAME = "claude-3-5-sonnet-20241022"
+# Bump when analyse_prompt changes so cached analyses are not reused.
+ANALYSE_PROMPT_VERSION = 1
+# Bump when the batched gap evaluation prompt changes.
+GAP_PROMPT_VERSION = 1
+GAP_VERDICTS = ("yes", "partially", "no")
 
 
 @dataclass
@@ -17,16 +28,54 @@ class AnalysisResponse:
 
 @dataclass
 class SearchResult:
-    """mock container to represent papers/entries returned by IRIS vector DB"""
+    """a corpus paper returned by the IRIS vector search; metadata has id, title, summary and score"""
 
     text: str
     metadata: Dict[str, Any]
 
 
+@dataclass
+class GapEvaluation:
+    """whether a corpus paper addresses a research gap: verdict is yes, partially, no (or unknown)"""
+
+    gap: str
+    result: SearchResult
+    verdict: str
+    explanation: str
+
+
 class PaperAnalyser:
-    def __init__(self, model_name: str = MODEL_NAME):
+    def __init__(
+        self,
+        model_name: str = MODEL_NAME,
+        max_concurrency: int = 8,
+        requests_per_second: float = 4.0,
+        cache: Optional[LLMCache] = None,
+        database=None,
+        gap_similarity_threshold: float = 0.8,
+        max_gap_pairs_per_prompt: int = 40,
+    ):
         self.model_name = model_name
-        self.client = Anthropic()
+        self.client = get_anthropic_client()
+        self.cache = cache
+
+        # InCiteIRISDatabase searched by check_gaps_against_iris. Only (gap, paper) pairs with
+        # a similarity of at least gap_similarity_threshold are sent to Claude, in prompts of
+        # up to max_gap_pairs_per_prompt pairs.
+        self.database = database
+        self.gap_similarity_threshold = gap_similarity_threshold
+        self.max_gap_pairs_per_prompt = max_gap_pairs_per_prompt
+
+        # One async client per event loop, since its semaphore and HTTP pool cannot be
+        # shared between loops; it is closed when its loop shuts down. Work submitted with
+        # run() shares one loop, and so one client and its limits, across threads.
+        self.async_client_options = {
+            "max_concurrency": max_concurrency,
+            "requests_per_second": requests_per_second,
+        }
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._async_clients_lock = threading.Lock()
+        self.event_loop = EventLoopThread("claude-analysis")
 
         self.analyse_prompt = f"""
             Please do the following:
@@ -36,19 +85,89 @@ class PaperAnalyser:
             4. If the paper poses any open question or states any areas of future research, give them in a list seperated only by newlines. (In <future_research> tags.)
         """
 
-    def summarize(self, text: str) -> AnalysisResponse:
-        """summarises the paper into a structured AnalysisResponse using custom parsng"""
+    def async_client(self) -> AsyncClaudeClient:
+        """returns the concurrency-limited async client for the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._async_clients_lock:
+            entry = self._async_clients.get(loop)
+            if entry is None:
+                client = AsyncClaudeClient(**self.async_client_options)
+                # A started async generator is finalised by loop.shutdown_asyncgens(), which
+                # asyncio.run and EventLoopThread.close call before the loop ends.
+                closer = self._close_with_loop(loop, client)
+                asyncio.ensure_future(closer.__anext__())
+                entry = self._async_clients[loop] = (client, closer)
+        return entry[0]
+
+    async def _close_with_loop(self, loop, client: AsyncClaudeClient):
+        try:
+            yield
+        finally:
+            with self._async_clients_lock:
+                if self._async_clients.get(loop, (None,))[0] is client:
+                    del self._async_clients[loop]
+            await client.aclose()
+
+    def run(self, coro):
+        """runs a coroutine on the analyser's shared event loop, so concurrent callers share its Claude limits"""
+        return self.event_loop.run(coro)
+
+    def close(self) -> None:
+        """closes the shared event loop and its async client"""
+        self.event_loop.close()
+
+    def summarize_request(self, text: str) -> Dict[str, Any]:
+        """messages.create arguments for summarising a paper"""
         messages = [
             {
                 "role": "user",
                 "content": [{"type": "text", "text": self.analyse_prompt + text}],
             }
         ]
-        response = self.client.messages.create(
-            max_tokens=500, temperature=0, model=self.model_name, messages=messages
+        return dict(max_tokens=500, temperature=0, model=self.model_name, messages=messages)
+
+    def llm_cache(self) -> LLMCache:
+        """the analysis cache; defaults to the process-wide cache (resolved lazily so it survives forks)"""
+        return self.cache if self.cache is not None else get_llm_cache()
+
+    def summarize(self, text: str) -> AnalysisResponse:
+        """summarises the paper into a structured AnalysisResponse using custom parsng"""
+
+        def compute():
+            response = self.client.messages.create(**self.summarize_request(text))
+            raw_text = response.content[0].text  # " ".join(chunk.text for chunk in response.content)
+            return asdict(self.parse_analysis(raw_text))
+
+        cached = self.llm_cache().get_or_compute(
+            self.model_name, ANALYSE_PROMPT_VERSION, text, compute
+        )
+        return AnalysisResponse(**cached)
+
+    async def asummarize(self, text: str) -> AnalysisResponse:
+        """async version of summarize, sharing the client's concurrency and rate limits"""
+
+        async def compute():
+            response = await self.async_client().create_message(**self.summarize_request(text))
+            return asdict(self.parse_analysis(response.content[0].text))
+
+        cached = await self.llm_cache().aget_or_compute(
+            self.model_name, ANALYSE_PROMPT_VERSION, text, compute
         )
-        raw_text = response.content[0].text  # " ".join(chunk.text for chunk in response.content)
+        return AnalysisResponse(**cached)
 
+    async def asummarize_many(
+        self, texts: List[str], return_exceptions: bool = False
+    ) -> List[AnalysisResponse]:
+        """
+        summarises many papers concurrently from one process; results keep the order of `texts`.
+        With return_exceptions=True a failed paper yields its exception instead of failing the batch.
+        """
+        return await asyncio.gather(
+            *(self.asummarize(text) for text in texts), return_exceptions=return_exceptions
+        )
+
+    def parse_analysis(self, raw_text: str) -> AnalysisResponse:
+        """parses the tagged model output into an AnalysisResponse"""
         summary = self.extract_tag_content(raw_text, "summary")
         methodological_issues = self.extract_tag_content(
             raw_text, "methodological_issues"
@@ -79,106 +198,188 @@ class PaperAnalyser:
     # IRIS VECTOR CHECKING LOGIC
 
     def check_gaps_against_iris(
-        self, analysis: AnalysisResponse, top_k: int = 3
-    ) -> None:
+        self,
+        analysis: AnalysisResponse,
+        top_k: int = 3,
+        threshold: Optional[float] = None,
+        exclude_ids: Sequence[int] = (),
+    ) -> List[GapEvaluation]:
         """
-        For each 'future research' gap in the analysis, perform:
-            1. Embedding
-            2. Vector search in IRIS
-            3. Summarize & evaluate how well the search results address that gap.
+        Checks every 'future research' gap of the analysis against the corpus:
+            1. All gaps are embedded in one batch and searched with one multi-query vector search.
+            2. Papers below the similarity threshold are dropped.
+            3. The remaining (gap, paper) pairs are judged by Claude in batched prompts.
 
-        Prints the results, but you could also return them if desired.
+        Prints and returns the evaluations. exclude_ids skips papers, e.g. the analysed paper itself.
         """
-        # 1. If there are no future research items, just return
         if not analysis.future_research:
             print("No future research gaps identified. Nothing to check against IRIS.")
-            return
+            return []
+        return self.check_gaps(analysis.future_research, top_k, threshold, exclude_ids)
 
-        for i, gap in enumerate(analysis.future_research, start=1):
-            print(f"\n=== Checking Future Research Gap #{i}: ===\n{gap}")
+    def check_gaps(
+        self,
+        gaps: Sequence[str],
+        top_k: int = 3,
+        threshold: Optional[float] = None,
+        exclude_ids: Sequence[int] = (),
+    ) -> List[GapEvaluation]:
+        """check_gaps_against_iris for any list of gaps, e.g. those of every paper in a graph"""
+        gaps = list(gaps)
+        results = self.search_gaps(gaps, top_k, threshold, exclude_ids)
+        pairs = [(gap, result) for gap, gap_results in zip(gaps, results) for result in gap_results]
+        if not pairs:
+            print("No papers in IRIS are similar enough to the research gaps.")
+            return []
+        evaluations = self.evaluate_gap_pairs(pairs)
 
-            # (a) Get naive embedding for the gap
-            gap_embedding = self.embed_text(gap)
+        for i, gap in enumerate(gaps, start=1):
+            print(f"\n=== Future Research Gap #{i}: ===\n{gap}")
+            gap_evaluations = [e for e in evaluations if e.gap == gap]
+            if not gap_evaluations:
+                print("No similar papers in IRIS.")
+            for evaluation in gap_evaluations:
+                print(f"\n--- {evaluation.result.metadata['title']} ---")
+                print(f"Similarity: {evaluation.result.metadata['score']:.3f}")
+                print(f"Addresses the gap: {evaluation.verdict}")
+                print(f"Evaluation: {evaluation.explanation}")
+        return evaluations
 
-            # (b) Query IRIS vector DB for top_k results
-            results = self.iris_vector_search(gap_embedding, top_k=top_k)
+    def search_gaps(
+        self,
+        gaps: Sequence[str],
+        top_k: int = 3,
+        threshold: Optional[float] = None,
+        exclude_ids: Sequence[int] = (),
+    ) -> List[List[SearchResult]]:
+        """
+        Up to top_k similar corpus papers per gap from one batched search, keeping only papers
+        with a similarity of at least `threshold` (default gap_similarity_threshold).
+        """
+        if self.database is None:
+            raise ValueError("PaperAnalyser needs a database to check gaps against IRIS")
+        threshold = self.gap_similarity_threshold if threshold is None else threshold
+        excluded = set(exclude_ids)
+        hits = self.database.search_many(gaps, top_k + len(excluded), min_score=threshold)
+        article_ids = {article_id for gap_hits in hits for article_id, _ in gap_hits}
+        articles = self.database.fetch_articles(article_ids - excluded, ["name", "summary"])
 
-            # (c) Evaluate each result to see if it addresses the gap
-            for idx, result in enumerate(results, start=1):
-                eval_output = self.evaluate_gap_against_paper(gap, result)
-                print(f"\n--- IRIS Result #{idx} ---")
-                print(f"Title: {result.metadata.get('title', 'Unknown')}")
-                print(
-                    f"Summary: {result.metadata.get('summary', 'No summary available')}"
+        results = []
+        for gap_hits in hits:
+            gap_results = [
+                SearchResult(
+                    text=articles[article_id]["summary"] or "",
+                    metadata={
+                        "id": article_id,
+                        "title": articles[article_id]["name"],
+                        "summary": articles[article_id]["summary"] or "",
+                        "score": score,
+                    },
                 )
-                print(f"Evaluation: {eval_output}")
+                for article_id, score in gap_hits
+                if article_id in articles
+            ]
+            results.append(gap_results[:top_k])
+        return results
 
-    def evaluate_gap_against_paper(self, gap: str, search_result: SearchResult) -> str:
+    def evaluate_gaps_request(self, pairs: Sequence[Tuple[str, SearchResult]]) -> Dict[str, Any]:
+        """messages.create arguments for judging many (gap, search result) pairs in one prompt"""
+        listed = "\n".join(
+            f'<pair id="{i}">\n<gap>{gap}</gap>\n'
+            f"<paper_title>{result.metadata.get('title', '')}</paper_title>\n"
+            f"<paper_summary>{result.metadata.get('summary', '')}</paper_summary>\n</pair>"
+            for i, (gap, result) in enumerate(pairs, start=1)
+        )
+        eval_prompt = (
+            "Each pair below has a research gap and the summary of a paper.\n"
+            f"{listed}\n\n"
+            "For every pair, decide whether the paper addresses the research gap. Answer with one "
+            '<evaluation pair="N"><verdict>yes, partially or no</verdict>'
+            "<explanation>a short explanation</explanation></evaluation> per pair."
+        )
+        return dict(
+            model=self.model_name,
+            max_tokens=min(8192, 100 + 150 * len(pairs)),
+            temperature=0,
+            messages=[{"role": "user", "content": eval_prompt}],
+        )
+
+    def parse_gap_evaluations(self, raw_text: str, count: int) -> List[List[str]]:
+        """[verdict, explanation] for pairs 1..count; pairs missing from the output are unknown"""
+        parsed = [["unknown", ""] for _ in range(count)]
+        for number, body in re.findall(
+            r'<evaluation pair="(\d+)">(.*?)</evaluation>', raw_text, re.DOTALL
+        ):
+            if 1 <= int(number) <= count:
+                verdict = self.extract_tag_content(body, "verdict").lower()
+                parsed[int(number) - 1] = [
+                    verdict if verdict in GAP_VERDICTS else "unknown",
+                    self.extract_tag_content(body, "explanation"),
+                ]
+        return parsed
+
+    def evaluate_gap_pairs(self, pairs: Sequence[Tuple[str, SearchResult]]) -> List[GapEvaluation]:
         """
-        Uses Claude to see if the given `search_result` addresses the research gap.
+        Judges (gap, search result) pairs with one Claude call per max_gap_pairs_per_prompt
+        pairs instead of one per pair. Results are cached by prompt.
         """
+        evaluations = []
+        for start in range(0, len(pairs), self.max_gap_pairs_per_prompt):
+            batch = pairs[start : start + self.max_gap_pairs_per_prompt]
+            request = self.evaluate_gaps_request(batch)
+
+            def compute():
+                response = self.client.messages.create(**request)
+                raw_text = " ".join(chunk.text for chunk in response.content)
+                return self.parse_gap_evaluations(raw_text, len(batch))
+
+            verdicts = self.llm_cache().get_or_compute(
+                self.model_name,
+                GAP_PROMPT_VERSION,
+                request["messages"][0]["content"],
+                compute,
+            )
+            evaluations.extend(
+                GapEvaluation(gap=gap, result=result, verdict=verdict, explanation=explanation)
+                for (gap, result), (verdict, explanation) in zip(batch, verdicts)
+            )
+        return evaluations
+
+    def evaluate_gap_request(self, gap: str, search_result: SearchResult) -> Dict[str, Any]:
+        """messages.create arguments for judging one gap against one search result"""
         eval_prompt = (
             f"Research Gap: {gap}\n"
             f"Paper Summary: {search_result.metadata.get('summary', '')}\n\n"
             "Question: Does this paper address the research gap? Provide a short explanation."
         )
-        response = self.client.messages.create(
+        return dict(
             model=self.model_name,
             max_tokens=300,
             messages=[{"role": "user", "content": eval_prompt}],
         )
-        raw_text = " ".join(chunk.text for chunk in response.content)
-        return raw_text.strip()
 
-    # mock embedding and iris vector search
-    @staticmethod
-    def embed_text(text: str) -> List[float]:
+    def evaluate_gap_against_paper(self, gap: str, search_result: SearchResult) -> str:
         """
-        Converts the text into a vector embedding (mock/placeholder).
-
-        In a real system, plug in an actual embeddings model
-        (like sentence-transformers or an API call).
+        Uses Claude to see if the given `search_result` addresses the research gap.
         """
-        return [float(ord(c)) % 50 for c in text[:16]]  # Very naive placeholder
+        response = self.client.messages.create(**self.evaluate_gap_request(gap, search_result))
+        raw_text = " ".join(chunk.text for chunk in response.content)
+        return raw_text.strip()
 
-    @staticmethod
-    def iris_vector_search(
-        embedding: List[float], top_k: int = 3
-    ) -> List[SearchResult]:
-        """
-        Mock function that simulates searching in a vector DB.
-        In reality, you'd call your actual vector DB or API here.
-        """
-        # Return some static dummy results for demonstration
-        mock_results = [
-            SearchResult(
-                text="Paper on scaling XYZ to large-scale environments...",
-                metadata={
-                    "title": "Scaling XYZ",
-                    "summary": "Explores performance aspects of scaling XYZ technology.",
-                },
-            ),
-            SearchResult(
-                text="Comparative study of XYZ vs. old method",
-                metadata={
-                    "title": "Comparative Study",
-                    "summary": "Compares XYZ with previous approaches, focusing on performance trade-offs.",
-                },
-            ),
-            SearchResult(
-                text="New frontiers in ABC domain with advanced XYZ",
-                metadata={
-                    "title": "New Frontiers",
-                    "summary": "Discusses advanced features and future directions for XYZ in ABC domain.",
-                },
-            ),
-        ]
-        return mock_results[:top_k]
+    async def aevaluate_gap_against_paper(self, gap: str, search_result: SearchResult) -> str:
+        """async version of evaluate_gap_against_paper"""
+        response = await self.async_client().create_message(
+            **self.evaluate_gap_request(gap, search_result)
+        )
+        raw_text = " ".join(chunk.text for chunk in response.content)
+        return raw_text.strip()
 
 
 if __name__ == "__main__":
+    from vector_db.InCiteOOP import InCiteIRISDatabase
+
     # 3.1 Instantiate the analyser
-    analyser = PaperAnalyser()
+    analyser = PaperAnalyser(database=InCiteIRISDatabase())
 
     # 3.2 Some mock paper text
     mock_paper_text = """
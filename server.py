@@ -1,21 +1,60 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from typing import Dict, Any
 from paper_evaluator import PaperAnalyser, AnalysisResponse
 from data_retrieval.retrieve_arxiv_papers import get_papers
+from data_retrieval.worker_pool import init_process_pool
 from data_retrieval.generate_claude_keywords import generate_keywords_with_claude
 from pprint import pprint
-from vector_db.InCiteOOP import InCiteIRISDatabase
+from vector_db.InCiteOOP import InCiteIRISDatabase, GRAPH_FIELDS, DEFAULT_GRAPH_FIELDS, PAPER_FIELDS
+from vector_db.embeddings import DEFAULT_CACHE_DIR
+from vector_db.query_cache import QueryResultCache, normalize_query
+from jobs import JobManager
 import asyncio
-from concurrent.futures import ProcessPoolExecutor
-from functools import partial
+import atexit
+import base64
+import json
+import os
 
 app = Flask(__name__)
 CORS(app)   
 
-vector_db = InCiteIRISDatabase()
-paper_analyser = PaperAnalyser()
+vector_db = InCiteIRISDatabase(
+    pool_size=int(os.environ.get("INCITE_DB_POOL_SIZE", 8)),
+    search_mode=os.environ.get("INCITE_SEARCH_MODE", "exact"),
+    ann_nprobe=int(os.environ.get("INCITE_ANN_NPROBE", 16)),
+    vector_datatype=os.environ.get("INCITE_VECTOR_DATATYPE", "double"),
+    resolve_with_embeddings=os.environ.get("INCITE_RESOLVE_WITH_EMBEDDINGS") == "1",
+    retrieval_mode=os.environ.get("INCITE_RETRIEVAL_MODE", "hybrid"),
+    chunk_search=os.environ.get("INCITE_CHUNK_SEARCH", "1") == "1",
+    chunk_aggregation=os.environ.get("INCITE_CHUNK_AGGREGATION", "max"),
+    max_chunks=int(os.environ.get("INCITE_MAX_CHUNKS", 64)),
+)
+# Results of previous default /get_graph queries; any new article invalidates them.
+query_cache = QueryResultCache(
+    path=os.path.join(DEFAULT_CACHE_DIR, "graph_results.sqlite3"),
+    ttl=int(os.environ.get("INCITE_QUERY_CACHE_TTL", 24 * 60 * 60)),
+    max_entries=int(os.environ.get("INCITE_QUERY_CACHE_SIZE", 1000)),
+)
+vector_db.insert_listeners.append(query_cache.invalidate)
+paper_analyser = PaperAnalyser(
+    max_concurrency=int(os.environ.get("INCITE_CLAUDE_CONCURRENCY", 8)),
+    requests_per_second=float(os.environ.get("INCITE_CLAUDE_RPS", 4)),
+    database=vector_db,
+    gap_similarity_threshold=float(os.environ.get("INCITE_GAP_SIMILARITY", 0.8)),
+)
 graph_generator = None
+# Cache misses are ingested in the background so /get_graph returns immediately.
+job_manager = JobManager(max_workers=int(os.environ.get("INCITE_JOB_WORKERS", 2)))
+atexit.register(job_manager.shutdown, wait=False)
+atexit.register(paper_analyser.close)
+
+# Limits for the /get_graph options.
+GRAPH_DEFAULT_MAX_NODES = 100
+GRAPH_MAX_NODES = int(os.environ.get("INCITE_GRAPH_MAX_NODES", 1000))
+GRAPH_MAX_HOPS = 3
+# Streaming response modes for /get_graph.
+STREAM_FORMATS = {'ndjson': 'application/x-ndjson', 'sse': 'text/event-stream'}
 
 # Error handling
 class APIError(Exception):
@@ -24,14 +63,248 @@ class APIError(Exception):
         self.status_code = status_code
         super().__init__(message)
 
-def analyze_paper(paper):
-    analysis = paper_analyser.summarize(paper['content'])
+def parse_int(data, key, default, minimum, maximum):
+    value = data.get(key, default)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or not minimum <= value <= maximum:
+        raise APIError(f'{key} must be an integer between {minimum} and {maximum}')
+    return value
+
+def parse_fields(data, default):
+    """
+    Reads the `fields` projection: a list or a comma-separated string of field names.
+    """
+    fields = data.get('fields')
+    if fields is None:
+        return list(default)
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+    if not isinstance(fields, list) or not all(isinstance(field, str) for field in fields):
+        raise APIError('fields must be a list or a comma-separated string')
+    unknown = [field for field in fields if field != 'id' and field not in GRAPH_FIELDS]
+    if unknown:
+        raise APIError(f'Unknown fields: {", ".join(unknown)}')
+    return fields
+
+def encode_cursor(offset):
+    return base64.urlsafe_b64encode(json.dumps({'offset': offset}).encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        offset = json.loads(base64.urlsafe_b64decode(cursor.encode()))['offset']
+    except Exception:
+        raise APIError('Invalid cursor')
+    if not isinstance(offset, int) or offset < 0:
+        raise APIError('Invalid cursor')
+    return offset
+
+def parse_graph_options(data):
+    """
+    Validates the optional /get_graph arguments: max_nodes (node budget), hops (citation
+    steps to expand from the search results), top_k (number of search results), direction,
+    fields (projection), limit (page size) and cursor (from a previous page).
+    """
+    max_nodes = parse_int(data, 'max_nodes', GRAPH_DEFAULT_MAX_NODES, 1, GRAPH_MAX_NODES)
+    direction = data.get('direction', 'both')
+    if direction not in ('in', 'out', 'both'):
+        raise APIError("direction must be 'in', 'out' or 'both'")
+    cursor = data.get('cursor')
+    if cursor is not None and not isinstance(cursor, str):
+        raise APIError('cursor must be a string')
+    return {
+        'max_nodes': max_nodes,
+        'hops': parse_int(data, 'hops', 0, 0, GRAPH_MAX_HOPS),
+        'top_k': parse_int(data, 'top_k', None, 1, max_nodes),
+        'direction': direction,
+        'fields': parse_fields(data, DEFAULT_GRAPH_FIELDS),
+        'limit': parse_int(data, 'limit', None, 1, max_nodes),
+        'offset': decode_cursor(cursor) if cursor else 0,
+    }
+
+DEFAULT_GRAPH_OPTIONS = parse_graph_options({})
+
+def parse_stream_format(data, accept=''):
+    """
+    Streaming mode for /get_graph: the `stream` field ("ndjson" or "sse"), else an Accept
+    header naming one of their content types; None for a single JSON response.
+    """
+    stream = data.get('stream')
+    if stream is None:
+        accepted = {part.split(';')[0].strip() for part in accept.split(',')}
+        return next((name for name, mimetype in STREAM_FORMATS.items() if mimetype in accepted), None)
+    if stream not in STREAM_FORMATS:
+        raise APIError(f"stream must be one of: {', '.join(STREAM_FORMATS)}")
+    return stream
+
+def format_event(event, stream_format):
+    """
+    One NDJSON line, or one SSE frame named after the event type.
+    """
+    data = app.json.dumps(event)
+    if stream_format == 'sse':
+        return f"event: {event['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+def build_graph(query, options):
+    """
+    Runs vector_db.query_graph and returns the response body (without the query).
+    """
+    page = vector_db.query_graph(query, **options)
+    return {
+        'graph': page['nodes'],
+        'edges': page['edges'],
+        'total': page['total'],
+        'next_cursor': (
+            encode_cursor(page['next_offset']) if page['next_offset'] is not None else None
+        ),
+    }
+
+def apply_analysis(paper, analysis):
     paper['summary'] = analysis.summary
     paper['method_issues'] = analysis.methodological_issues
     paper['coi'] = analysis.conflict_of_interest
     paper['future_research'] = analysis.future_research
     return paper
 
+async def analyze_and_insert(job, papers):
+    """
+    Analyses all papers concurrently with the async Claude client (one process, bounded
+    concurrency) and upserts each one as soon as its analysis finishes. Papers whose content
+    is already stored unchanged are upserted without a new analysis.
+    """
+    needs_analysis = await asyncio.to_thread(vector_db.needs_analysis, papers)
+
+    async def analyze_one(paper, analyse):
+        if analyse:
+            apply_analysis(paper, await paper_analyser.asummarize(paper['content']))
+        written = await asyncio.to_thread(vector_db.upsert_articles, [paper])
+        for article in written:
+            # Lets streaming /get_graph requests send the paper right away.
+            job.publish({'type': 'paper', 'id': article['id']})
+        return paper
+
+    analysed = []
+    failed = 0
+    tasks = [analyze_one(paper, analyse) for paper, analyse in zip(papers, needs_analysis)]
+    for next_done in asyncio.as_completed(tasks):
+        try:
+            analysed.append(await next_done)
+        except Exception as e:
+            print(f"Could not analyse or insert paper: {e}")
+            failed += 1
+        job.update(progress=len(analysed) + failed)
+    return analysed, failed
+
+def ingest_query(job, query):
+    """
+    Background job for a /get_graph cache miss: generates keywords, retrieves papers and
+    analyses them, inserting each paper into the DB as soon as its analysis finishes.
+    Returns the default graph response for the query, which is also stored in the query cache.
+    """
+    job.update(message="Generating keywords")
+    kw = generate_keywords_with_claude(query)
+    job.update(message="Retrieving papers from arXiv")
+    papers = get_papers(kw, 10)
+    print([paper['name'] for paper in papers])
+
+    job.update(progress=0, total=len(papers), message="Analyzing papers")
+    # Every job runs on the analyser's shared loop, so the Claude limits hold across jobs.
+    analysed, failed = paper_analyser.run(analyze_and_insert(job, papers))
+    job.update(message=f"Stored {len(analysed)} papers ({failed} failed)")
+
+    generation = query_cache.generation()
+    result = build_graph(query, DEFAULT_GRAPH_OPTIONS)
+    query_cache.put(query, result, generation)
+    return result
+
+def graph_events(result, sent):
+    """
+    "node" events for the nodes of a build_graph result not yet in `sent`, then "edge" events
+    for their edges.
+    """
+    new_ids = set()
+    for node in result['graph']:
+        if node['id'] not in sent:
+            sent.add(node['id'])
+            new_ids.add(node['id'])
+            yield {'type': 'node', 'node': node}
+    for citing, cited in result['edges']:
+        if citing in new_ids:
+            yield {'type': 'edge', 'edge': [citing, cited]}
+
+def paper_events(article_id, fields, sent):
+    """
+    "node" event for a newly inserted paper and "edge" events linking it to the papers
+    already sent.
+    """
+    if article_id in sent:
+        return
+    node = vector_db.get_article(article_id, fields)
+    if node is None:
+        return
+    sent.add(article_id)
+    yield {'type': 'node', 'node': node}
+    graph = vector_db.load_citation_graph()
+    if article_id not in graph.node_ids:
+        return
+    position = graph.node(article_id)
+    for cited in graph.successors(position):
+        if graph.key(cited) in sent:
+            yield {'type': 'edge', 'edge': [article_id, graph.key(cited)]}
+    for citing in graph.predecessors(position):
+        if graph.key(citing) in sent:
+            yield {'type': 'edge', 'edge': [graph.key(citing), article_id]}
+
+def stream_graph(query, options):
+    """
+    Events of a streaming /get_graph response. If the graph is already in the DB its nodes
+    and edges are sent at once. Otherwise the ingestion job is started (or joined) and
+    "progress" events follow it, with a "node" (and "edge") event as soon as each paper is
+    analysed and inserted. A final "summary" gives the ids of the requested page in order,
+    the total and the next cursor; any page node not streamed yet is sent before it.
+    Failures end the stream with an "error" event.
+    """
+    sent = set()
+    try:
+        generation = query_cache.generation()
+        cached = query_cache.get(query) if options == DEFAULT_GRAPH_OPTIONS else None
+        result = cached if cached is not None else build_graph(query, options)
+        if not result['graph'] and options['offset'] == 0:
+            job = job_manager.submit(
+                ingest_query,
+                query,
+                key=normalize_query(query),
+                description=f"Ingest papers for '{query}'",
+            )
+            yield {'type': 'job', 'job_id': job.id, 'status': job.status}
+            for events, state in job.follow():
+                for event in events:
+                    if event['type'] == 'paper':
+                        yield from paper_events(event['id'], options['fields'], sent)
+                yield {
+                    'type': 'progress',
+                    **{key: state[key] for key in ('status', 'progress', 'total', 'message')},
+                }
+            if state['status'] == 'failed':
+                yield {'type': 'error', 'error': state['error']}
+                return
+            result = build_graph(query, options)
+        elif cached is None and options == DEFAULT_GRAPH_OPTIONS:
+            query_cache.put(query, result, generation)
+
+        yield from graph_events(result, sent)
+        yield {
+            'type': 'summary',
+            'query': query,
+            'ids': [node['id'] for node in result['graph']],
+            'total': result['total'],
+            'next_cursor': result['next_cursor'],
+        }
+    except Exception as e:
+        print(f"Error streaming graph: {e}")
+        yield {'type': 'error', 'error': f'Error generating graph: {str(e)}'}
+
 @app.errorhandler(APIError)
 def handle_api_error(error: APIError) -> tuple[Dict[str, Any], int]:
     response = {
@@ -39,94 +312,126 @@ def handle_api_error(error: APIError) -> tuple[Dict[str, Any], int]:
     }
     return jsonify(response), error.status_code
 
-@app.route('/get_graph', methods=['POST'])
-async def get_graph():
-    data = request.get_json()
-    
+# Request handlers shared by the Flask routes below and the ASGI app in asgi.py. They take
+# the parsed JSON body and return response bodies, raising APIError for error responses.
+
+def parse_graph_request(data, accept=''):
+    """
+    Returns (query, options, stream format or None) for a /get_graph request body.
+    """
     if not data or 'query' not in data:
         raise APIError('Missing required field: query')
-    
+
     query = data['query']
     if not isinstance(query, str):
         raise APIError('Query must be a string')
-    
-    papers = vector_db.query_articles_json(query, 100)
-    if not papers:
-        print("Cache Miss")
-        kw = generate_keywords_with_claude(query)
-        papers = get_papers(kw, 10)
-        print([paper['name'] for paper in papers])
-        print("Analyzing papers")
-        # Use ProcessPoolExecutor for CPU-intensive tasks
-        with ProcessPoolExecutor() as executor:
-            # Create a partial function with the paper_analyser instance
-            papers = list(executor.map(analyze_paper, papers))
-        print("Inserting papers into DB")
-        for paper in papers:
-            vector_db.insert_article_json(paper)
-    else:
-        print("Cache Hit")
-
-    papers = apply_in_refs(papers)
-    
-    print([paper['summary'] for paper in papers])
-    
+
+    return query, parse_graph_options(data), parse_stream_format(data, accept)
+
+def graph_response(query, options):
+    """
+    Non-streaming /get_graph: returns (body, status). On a cache miss the ingestion job is
+    started and a 202 with its job_id is returned.
+    """
+    # Only the default (unpaginated, default fields) response is cached.
+    cacheable = options == DEFAULT_GRAPH_OPTIONS
+    generation = query_cache.generation()
+    if cacheable:
+        cached = query_cache.get(query)
+        if cached is not None:
+            print("Query Cache Hit")
+            return {'query': query, **cached}, 200
+
     try:
-        # Process the query and generate graph
-        # Replace this with your actual graph generation logic
-        result = {
-            'query': query,
-            'graph': papers
-        }
-        return jsonify(result)
+        result = build_graph(query, options)
     except Exception as e:
-        raise APIError(f'Error generating graph: {str(e)}')
+        raise APIError(f'Error generating graph: {str(e)}', status_code=500)
 
-def apply_in_refs(papers):
-    # Step 1: Create a mapping from paper URLs to their indices
-    name_to_index = {paper['name']: i for i, paper in enumerate(papers)}
-    
-    # Initialize in_refs for each paper
-    for paper in papers:
-        paper['in_refs'] = []
-        paper['num_in'] = 0
-    
-    # Step 2: Iterate through the list of papers
-    for paper in papers:
-        for out_ref in paper['out_references']:
-            if out_ref in name_to_index:
-                referenced_paper_index = name_to_index[out_ref]
-                papers[referenced_paper_index]['in_refs'].append(paper['name'])
-                papers[referenced_paper_index]['num_in'] += 1
-    
-    return papers
+    if not result['graph'] and options['offset'] == 0:
+        print("Cache Miss")
+        job = job_manager.submit(
+            ingest_query,
+            query,
+            key=normalize_query(query),
+            description=f"Ingest papers for '{query}'",
+        )
+        return {
+            'query': query,
+            'graph': [],
+            'job_id': job.id,
+            'status': job.status,
+        }, 202
+    print("Cache Hit")
 
-@app.route('/get_paper', methods=['POST'])
-def get_paper():
-    data = request.get_json()
-    
+    if cacheable:
+        query_cache.put(query, result, generation)
+    return {'query': query, **result}, 200
+
+def stream_body(query, options, stream_format):
+    """
+    The formatted frames of a streaming /get_graph response.
+    """
+    return (format_event(event, stream_format) for event in stream_graph(query, options))
+
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+def job_response(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise APIError('Job not found', status_code=404)
+    result = job.to_json()
+    if job.status == 'done':
+        result.update(job.result)
+    return result
+
+def paper_response(data):
+    """
+    Returns one article by id, for lazily loading the details of a graph node. Accepts an
+    optional `fields` projection like /get_graph; by default the content is included.
+    """
     if not data or 'id' not in data:
         raise APIError('Missing required field: id')
     
     paper_id = data['id']
-    if not isinstance(paper_id, str):
-        raise APIError('Paper ID must be a string')
-    
-    # paper = vector_db.get_paper(paper_id)
-    # if not paper:
-    #     raise APIError('Paper not found', status_code=404)
-    
+    if isinstance(paper_id, str) and paper_id.isdigit():
+        paper_id = int(paper_id)
+    if isinstance(paper_id, bool) or not isinstance(paper_id, int):
+        raise APIError('Paper ID must be an integer')
+    fields = parse_fields(data, PAPER_FIELDS)
+
     try:
-        # Process the paper ID and retrieve paper
-        # Replace this with your actual paper retrieval logic
-        result = {
-            'id': paper_id,
-            'title': f'Paper with ID: {paper_id}',
-            'content': 'Paper content goes here'
-        }
-        return jsonify(result)
+        paper = vector_db.get_article(paper_id, fields)
     except Exception as e:
-        raise APIError(f'Error retrieving paper: {str(e)}')
+        raise APIError(f'Error retrieving paper: {str(e)}', status_code=500)
+    if not paper:
+        raise APIError('Paper not found', status_code=404)
+    return paper
+
+@app.route('/get_graph', methods=['POST'])
+def get_graph():
+    query, options, stream_format = parse_graph_request(
+        request.get_json(), request.headers.get('Accept', '')
+    )
+    if stream_format:
+        return Response(
+            stream_body(query, options, stream_format),
+            mimetype=STREAM_FORMATS[stream_format],
+            headers=STREAM_HEADERS,
+        )
+    body, status = graph_response(query, options)
+    return jsonify(body), status
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    return jsonify(job_response(job_id))
+
+@app.route('/get_paper', methods=['POST'])
+def get_paper():
+    return jsonify(paper_response(request.get_json()))
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # Development server; see asgi.py for running the same API under uvicorn.
+    # Fork the paper-processing workers once, before Flask starts its request threads.
+    init_process_pool()
+    # Each request borrows its own pooled DB connection, so requests can run in parallel threads.
+    app.run(debug=True, threaded=True)
\ No newline at end of file
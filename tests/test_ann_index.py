@@ -0,0 +1,118 @@
+import threading
+
+import numpy as np
+
+from vector_db.ann_index import IVFIndex
+
+
+def unit_vectors(n, dim, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_ids(vectors, ids, query, top_k):
+    return [int(ids[i]) for i in np.argsort(-(vectors @ query))[:top_k]]
+
+
+def test_untrained_index_searches_exactly():
+    vectors = unit_vectors(50, 8)
+    ids = np.arange(100, 150)
+    index = IVFIndex(dim=8, min_train_size=1000)
+    index.add(ids, vectors)
+    hits = index.search(vectors[3], top_k=5)
+    assert [hit[0] for hit in hits] == exact_ids(vectors, ids, vectors[3], 5)
+    assert hits[0] == (103, hits[0][1])
+    assert index.centroids is None
+
+
+def test_add_trains_in_the_background():
+    vectors = unit_vectors(400, 8)
+    index = IVFIndex(dim=8, nprobe=4, min_train_size=100)
+    index.add(np.arange(400), vectors)
+    index.wait_for_training()
+    assert index.centroids is not None
+    assert len(index.centroids) == 20
+    assert sum(len(positions) for positions in index._lists) == 400
+    # Probing every list is exact.
+    hits = index.search(vectors[7], top_k=3, nprobe=len(index.centroids))
+    assert [hit[0] for hit in hits] == exact_ids(vectors, np.arange(400), vectors[7], 3)
+
+
+def untrained_index(vectors, min_train_size=100):
+    # Added with training disabled, so the test decides when training runs.
+    index = IVFIndex(dim=vectors.shape[1], min_train_size=len(vectors) + 1)
+    index.add(np.arange(len(vectors)), vectors)
+    index.min_train_size = min_train_size
+    return index
+
+
+def test_search_does_not_train():
+    index = untrained_index(unit_vectors(200, 8))
+    index.search(unit_vectors(1, 8, seed=1)[0])
+    index.search_many(unit_vectors(2, 8, seed=1))
+    assert index.training_thread is None
+    assert index.centroids is None
+
+
+def test_vectors_added_during_training_are_assigned_at_the_swap():
+    vectors = unit_vectors(300, 8)
+    index = untrained_index(vectors[:200])
+    assign = index._assign
+    clustering = threading.Event()
+    resume = threading.Event()
+
+    def slow_assign(*args):
+        clustering.set()
+        assert resume.wait(10)
+        return assign(*args)
+
+    index._assign = slow_assign
+    training = threading.Thread(target=index.train)
+    training.start()
+    assert clustering.wait(10)
+    # k-means runs without the index lock: adds and searches do not wait for it.
+    index.add(np.arange(200, 300), vectors[200:])
+    assert index.search(vectors[250], top_k=1)[0][0] == 250
+    resume.set()
+    training.join(10)
+    index._assign = assign
+    index.wait_for_training()
+
+    assert sorted(np.concatenate(index._lists).tolist()) == list(range(300))
+    assert index.search(vectors[250], top_k=1, nprobe=len(index.centroids))[0][0] == 250
+
+
+def test_replaced_and_removed_ids_are_not_returned():
+    vectors = unit_vectors(20, 8)
+    index = IVFIndex(dim=8, min_train_size=1000)
+    index.add(np.arange(20), vectors)
+    index.add([0], [-vectors[0]])
+    index.remove([1])
+    assert len(index) == 19
+    ids = [hit[0] for hit in index.search(vectors[0], top_k=20)]
+    assert ids[-1] == 0
+    assert 1 not in ids
+
+
+def test_removed_vectors_are_compacted():
+    vectors = unit_vectors(300, 8)
+    index = IVFIndex(dim=8, min_train_size=100)
+    index.add(np.arange(300), vectors)
+    index.wait_for_training()
+    index.remove(range(250))
+    index.wait_for_training()
+    assert index._size == 50
+    assert sorted(index._positions) == list(range(250, 300))
+    hits = index.search(vectors[260], top_k=3, exact=True)
+    assert hits[0][0] == 260
+
+
+def test_search_many_matches_search():
+    vectors = unit_vectors(100, 8)
+    index = IVFIndex(dim=8, min_train_size=1000)
+    index.add(np.arange(100), vectors)
+    queries = unit_vectors(3, 8, seed=2)
+    for hits, query in zip(index.search_many(queries, top_k=4), queries):
+        expected = index.search(query, top_k=4)
+        assert [hit[0] for hit in hits] == [hit[0] for hit in expected]
+        assert np.allclose([hit[1] for hit in hits], [hit[1] for hit in expected], atol=1e-6)
@@ -0,0 +1,73 @@
+from citation_graph import CitationGraph
+
+
+def make_graph(num_nodes, edges):
+    graph = CitationGraph()
+    for key in range(num_nodes):
+        graph.add_node(key)
+    graph.add_edges(edges)
+    return graph
+
+
+def test_nodes_are_numbered_in_insertion_order():
+    graph = CitationGraph()
+    assert graph.add_node("b") == 0
+    assert graph.add_node("a") == 1
+    assert graph.add_node("b") == 0
+    assert len(graph) == 2
+    assert (graph.node("a"), graph.key(0)) == (1, "b")
+
+
+def test_duplicate_edges_and_self_citations_are_dropped():
+    graph = make_graph(3, [(0, 1), (0, 1), (1, 1), (2, 1)])
+    assert graph.num_edges == 2
+    assert graph.in_degree().tolist() == [0, 2, 0]
+    assert graph.out_degree().tolist() == [1, 0, 1]
+
+
+def test_successors_and_predecessors():
+    graph = make_graph(4, [(0, 1), (0, 2), (3, 0)])
+    assert sorted(graph.successors(0).tolist()) == [1, 2]
+    assert graph.predecessors(0).tolist() == [3]
+    # Nodes and edges added after a query are visible to the next one.
+    graph.add_node(4)
+    graph.add_edges([(4, 0)])
+    assert sorted(graph.predecessors(0).tolist()) == [3, 4]
+
+
+def test_remove_out_edges():
+    graph = make_graph(3, [(0, 1), (0, 2), (1, 2)])
+    graph.remove_out_edges([0, "unknown"])
+    assert graph.num_edges == 1
+    assert graph.successors(0).tolist() == []
+    assert graph.predecessors(2).tolist() == [1]
+
+
+def test_subgraph_edges_only_links_selected_nodes():
+    graph = make_graph(4, [(0, 1), (1, 2), (2, 3), (3, 0)])
+    src, dst = graph.subgraph_edges([0, 1, 2])
+    assert sorted(zip(src.tolist(), dst.tolist())) == [(0, 1), (1, 2)]
+
+
+def test_k_hop_follows_the_requested_direction():
+    graph = make_graph(5, [(0, 1), (1, 2), (3, 0), (4, 3)])
+    nodes, distances = graph.k_hop([0], hops=2, direction="out")
+    assert dict(zip(nodes.tolist(), distances.tolist())) == {0: 0, 1: 1, 2: 2}
+    nodes, distances = graph.k_hop([0], hops=2, direction="in")
+    assert dict(zip(nodes.tolist(), distances.tolist())) == {0: 0, 3: 1, 4: 2}
+    nodes, _ = graph.k_hop([0], hops=1, direction="both")
+    assert sorted(nodes.tolist()) == [0, 1, 3]
+
+
+def test_k_hop_budget_keeps_the_most_cited_neighbours():
+    # 1, 2 and 3 cite the seed 9; 3 is itself cited by 1 and 2.
+    graph = make_graph(10, [(1, 9), (2, 9), (3, 9), (1, 3), (2, 3)])
+    nodes, distances = graph.k_hop([graph.node(9)], hops=2, direction="in", max_nodes=2)
+    assert [graph.key(node) for node in nodes] == [9, 3]
+    assert distances.tolist() == [0, 1]
+
+
+def test_k_hop_budget_prefers_neighbours_linked_to_several_seeds():
+    graph = make_graph(8, [(0, 5), (0, 6), (1, 6), (1, 7)])
+    nodes, _ = graph.k_hop([graph.node(0), graph.node(1)], hops=1, direction="out", max_nodes=3)
+    assert [graph.key(node) for node in nodes] == [0, 1, 6]
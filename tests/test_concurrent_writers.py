@@ -0,0 +1,117 @@
+import threading
+
+from benchmarks.stand_ins import sqlite_connect
+from vector_db.embeddings import EmbeddingCache, EmbeddingService, FakeEmbeddingBackend
+from vector_db.InCiteOOP import InCiteIRISDatabase
+
+
+def make_database(path):
+    db = InCiteIRISDatabase(
+        embedding_service=EmbeddingService(
+            backend=FakeEmbeddingBackend(), cache=EmbeddingCache()
+        ),
+        pool_size=4,
+        search_mode="ann",
+        connect=sqlite_connect(str(path)),
+    )
+    db.setup_tables()
+    return db
+
+
+def paper(name, arxiv_id, references=()):
+    return {
+        "name": name,
+        "url": f"http://arxiv.org/abs/{arxiv_id}v1",
+        "content": f"{name} content",
+        "summary": f"{name} summary",
+        "out_references": list(references),
+    }
+
+
+def test_article_committed_after_a_higher_id_is_loaded(tmp_path):
+    """
+    Writer A reserves id 2 and commits only after writer B has committed id 3 and the
+    citation graph has been loaded. A's article must still reach the graph and indexes.
+    """
+    db = make_database(tmp_path / "incite.sqlite3")
+    db.upsert_articles([paper("Base Paper", "2101.00001")])
+    db.load_citation_graph()
+    db.lexical_index()
+    db.vector_index(db.articles_table_name)
+
+    allocate_ids = db.allocate_ids
+    reserved = threading.Event()
+    resume = threading.Event()
+
+    def slow_allocate_ids(table_name, count):
+        first_id = allocate_ids(table_name, count)
+        if threading.current_thread().name == "writer-a":
+            reserved.set()
+            resume.wait(10)
+        return first_id
+
+    db.allocate_ids = slow_allocate_ids
+    errors = []
+
+    def writer_a():
+        try:
+            db.upsert_articles(
+                [paper("Delayed Paper", "2101.00002", ["Base Paper", "Quick Paper"])]
+            )
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=writer_a, name="writer-a")
+    thread.start()
+    assert reserved.wait(10)
+    quick = db.upsert_articles([paper("Quick Paper", "2101.00003", ["Base Paper"])])
+    assert quick[0]["id"] == 3
+    db.load_citation_graph()
+    resume.set()
+    thread.join(10)
+
+    assert not errors
+    graph = db.load_citation_graph()
+    assert set(graph.node_ids) == {1, 2, 3}
+    src, dst = graph.subgraph_edges(range(len(graph)))
+    edges = {(graph.key(a), graph.key(b)) for a, b in zip(src, dst)}
+    assert edges == {(2, 1), (2, 3), (3, 1)}
+    assert db.lexical_index().search("delayed")[0][0] == 2
+    assert 2 in db.vector_index(db.articles_table_name)._positions
+
+
+def test_graph_loaded_by_another_instance_sees_out_of_order_ids(tmp_path):
+    path = tmp_path / "incite.sqlite3"
+    writer = make_database(path)
+    reader = make_database(path)
+    reader.load_citation_graph()
+
+    reserved = writer.allocate_ids(writer.articles_table_name, 1)
+    writer.upsert_articles([paper("Later Paper", "2101.00010")])
+    reader.load_citation_graph()
+    writer.allocate_ids = lambda table_name, count: reserved
+    writer.upsert_articles([paper("Earlier Paper", "2101.00011", ["Later Paper"])])
+
+    graph = reader.load_citation_graph()
+    assert set(graph.node_ids) == {reserved, reserved + 1}
+    assert graph.num_edges == 1
+
+
+def test_reloading_the_graph_picks_up_rewritten_references(tmp_path):
+    path = tmp_path / "incite.sqlite3"
+    writer = make_database(path)
+    reader = make_database(path)
+    writer.upsert_articles(
+        [paper("Cited Paper", "2101.00020"), paper("Citing Paper", "2101.00021", ["Cited Paper"])]
+    )
+    assert reader.load_citation_graph().num_edges == 1
+
+    rewritten = paper("Citing Paper", "2101.00021")
+    rewritten["content"] = "Citing Paper revised content"
+    writer.upsert_articles([rewritten])
+    assert reader.load_citation_graph().num_edges == 1
+
+    reader.citation_graph_loaded = False
+    graph = reader.load_citation_graph()
+    assert len(graph) == 2
+    assert graph.num_edges == 0
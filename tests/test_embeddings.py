@@ -0,0 +1,92 @@
+import sqlite3
+import threading
+
+import numpy as np
+
+from vector_db.embeddings import (
+    EmbeddingCache,
+    EmbeddingService,
+    FakeEmbeddingBackend,
+    embedding_key,
+    first_chunk,
+    iter_chunks,
+)
+
+
+def test_chunks_overlap_and_the_first_chunk_is_embedded():
+    text = "\n\n".join(f"paragraph {i} " + "x" * 40 for i in range(6))
+    chunks = list(iter_chunks(text, chunk_size=120, chunk_overlap=60))
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 120 for chunk in chunks)
+    assert chunks[0].split("\n\n")[-1] == chunks[1].split("\n\n")[0]
+    assert first_chunk(text, chunk_size=120) == chunks[0]
+    assert first_chunk("") == " "
+
+
+def test_embedding_key_depends_on_the_model():
+    assert embedding_key("a", "text") != embedding_key("b", "text")
+    assert embedding_key("a", "text") == embedding_key("a", "text")
+
+
+def test_cached_and_duplicate_chunks_are_embedded_once():
+    backend = FakeEmbeddingBackend(dim=8)
+    service = EmbeddingService(backend=backend, cache=EmbeddingCache(), batch_size=2)
+    vectors = service.embed_chunks(["a", "b", "a", "c"])
+    assert vectors[0] == vectors[2]
+    assert np.isclose(np.linalg.norm(vectors[1]), 1.0)
+    assert backend.calls == 2
+    assert service.embed_chunks(["c", "b"]) == [vectors[3], vectors[1]]
+    assert backend.calls == 2
+    assert (service.hits, service.misses) == (3, 3)
+
+
+def test_embed_documents_returns_every_chunk_and_the_first_matches_embed():
+    service = EmbeddingService(backend=FakeEmbeddingBackend(dim=8), cache=EmbeddingCache(), chunk_size=20)
+    text = "first paragraph\n\nsecond paragraph\n\nthird paragraph"
+    documents = service.embed_documents([text, ""], max_chunks=2)
+    assert [len(vectors) for vectors in documents] == [2, 1]
+    assert documents[0][0] == service.embed(text)
+
+
+def test_counters_are_exact_under_concurrent_calls():
+    service = EmbeddingService(backend=FakeEmbeddingBackend(dim=4), cache=EmbeddingCache())
+    service.embed_chunks(["shared"])
+
+    def embed():
+        for _ in range(200):
+            service.embed_chunks(["shared"])
+
+    threads = [threading.Thread(target=embed) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (service.hits, service.misses) == (800, 1)
+
+
+def test_file_cache_survives_a_restart(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    EmbeddingCache(path).put_many([("key", [0.5, 0.25])])
+    assert EmbeddingCache(path).get_many(["key", "missing"]) == {"key": [0.5, 0.25]}
+
+
+def test_file_cache_evicts_least_recently_used_rows(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    cache = EmbeddingCache(path, max_memory_items=0, max_entries=10)
+    cache.put_many([(f"key{i}", [float(i)]) for i in range(10)])
+    cache.db.execute("UPDATE embeddings SET accessed_at = 0 WHERE key != 'key0'")
+    cache.get_many(["key0"])
+    cache.put_many([("key10", [10.0])])
+    assert cache.size == 9
+    assert set(cache.get_many([f"key{i}" for i in range(11)])) >= {"key0", "key10"}
+
+
+def test_files_without_access_times_are_upgraded(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+    db.commit()
+    db.close()
+    cache = EmbeddingCache(path)
+    cache.put_many([("key", [1.0])])
+    assert cache.get_many(["key"]) == {"key": [1.0]}
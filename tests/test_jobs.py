@@ -0,0 +1,84 @@
+import threading
+
+from jobs import JobManager
+
+
+def wait_until_finished(job):
+    for _, state in job.follow(timeout=1):
+        if state["status"] in ("done", "failed"):
+            return state
+
+
+def test_job_result_and_progress():
+    manager = JobManager(max_workers=1)
+
+    def work(job, items):
+        job.update(progress=0, total=len(items), message="Working")
+        for i, _ in enumerate(items, start=1):
+            job.update(progress=i)
+        return {"count": len(items)}
+
+    job = manager.submit(work, ["a", "b"], description="Count items")
+    state = wait_until_finished(job)
+    assert state["status"] == "done"
+    assert (state["progress"], state["total"], state["message"]) == (2, 2, "Working")
+    assert job.result == {"count": 2}
+    assert manager.get(job.id) is job
+    manager.shutdown()
+
+
+def test_failed_job_records_the_error():
+    manager = JobManager(max_workers=1)
+
+    def work(job):
+        raise ValueError("no papers")
+
+    state = wait_until_finished(manager.submit(work))
+    assert state["status"] == "failed"
+    assert state["error"] == "no papers"
+    manager.shutdown()
+
+
+def test_submitting_an_active_key_returns_the_running_job():
+    manager = JobManager(max_workers=2)
+    release = threading.Event()
+    job = manager.submit(lambda job: release.wait(10), key="graphs")
+    assert manager.submit(lambda job: None, key="graphs") is job
+    release.set()
+    wait_until_finished(job)
+    assert manager.submit(lambda job: None, key="graphs") is not job
+    manager.shutdown()
+
+
+def test_follow_streams_every_event_to_late_readers():
+    manager = JobManager(max_workers=1)
+    publish = threading.Event()
+
+    def work(job):
+        job.publish({"type": "paper", "id": 1})
+        publish.wait(10)
+        job.publish({"type": "paper", "id": 2})
+
+    job = manager.submit(work)
+    followed = job.follow(timeout=1)
+    events, _ = next(followed)
+    while not events:
+        events, _ = next(followed)
+    publish.set()
+    for new_events, _ in followed:
+        events += new_events
+    assert [event["id"] for event in events] == [1, 2]
+    # A reader that starts after the job finished still gets every event.
+    assert [event["id"] for event in next(job.follow())[0]] == [1, 2]
+    manager.shutdown()
+
+
+def test_only_recent_finished_jobs_are_kept():
+    manager = JobManager(max_workers=1, max_finished_jobs=2)
+    jobs = [manager.submit(lambda job: None) for _ in range(3)]
+    for job in jobs:
+        wait_until_finished(job)
+    manager.submit(lambda job: None)
+    assert manager.get(jobs[0].id) is None
+    assert manager.get(jobs[2].id) is jobs[2]
+    manager.shutdown()
@@ -0,0 +1,53 @@
+from vector_db.lexical_index import BM25Index, extract_keywords, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_drops_stopwords_and_keeps_arxiv_ids():
+    assert tokenize("The Résumé of 2101.01234 and GANs") == ["resume", "2101.01234", "gans"]
+    assert tokenize(None) == []
+
+
+def test_extract_keywords_starts_with_the_arxiv_id_and_favours_title_terms():
+    keywords = extract_keywords(
+        "Sparse Transformers",
+        "attention attention attention attention sparse transformers scale",
+        url="http://arxiv.org/abs/1904.10509v1",
+        max_keywords=3,
+    )
+    assert keywords[:2] == ["1904.10509", "attention"]
+    # Title terms count three times, so they outrank "scale".
+    assert set(keywords[2:]) == {"sparse", "transformers"}
+
+
+def documents():
+    return [
+        (1, {"name": "Graph Neural Networks", "summary": "message passing on graphs"}),
+        (2, {"name": "Protein Folding", "summary": "structure prediction with neural networks"}),
+        (3, {"name": "Image Segmentation", "summary": "convolutional networks for pixels"}),
+    ]
+
+
+def test_title_matches_rank_first():
+    index = BM25Index()
+    index.add_many(documents())
+    hits = index.search("neural networks")
+    assert [doc_id for doc_id, _ in hits][:2] == [1, 2]
+    assert index.search("quantum") == []
+
+
+def test_replace_and_remove_documents():
+    index = BM25Index()
+    index.add_many(documents())
+    index.add_many([(1, {"name": "Quantum Annealing"})])
+    assert index.search("quantum")[0][0] == 1
+    assert 1 not in [doc_id for doc_id, _ in index.search("graphs")]
+    index.remove([1, 2])
+    assert len(index) == 1
+    assert index.search("quantum") == []
+    assert index.total_length == index.doc_lengths[3]
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([[(1, 0.9), (2, 0.8)], [(2, 7.0), (3, 5.0)]], k=60)
+    assert [doc_id for doc_id, _ in fused] == [2, 1, 3]
+    assert fused[0][1] == 1 / 62 + 1 / 61
+    assert reciprocal_rank_fusion([[(1, 1.0), (2, 1.0)]], top_k=1) == [(1, 1 / 61)]
@@ -0,0 +1,59 @@
+import asyncio
+
+from llm_cache import LLMCache
+
+
+def test_key_depends_on_model_version_and_text():
+    key = LLMCache.key("model", 1, "text")
+    assert key == LLMCache.key("model", 1, "text")
+    assert len({key, LLMCache.key("other", 1, "text"), LLMCache.key("model", 2, "text"), LLMCache.key("model", 1, "other")}) == 4
+
+
+def test_get_or_compute_calls_compute_once():
+    cache = LLMCache(path=None)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"summary": "cached"}
+
+    assert cache.get_or_compute("model", 1, "paper", compute) == {"summary": "cached"}
+    assert cache.get_or_compute("model", 1, "paper", compute) == {"summary": "cached"}
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_aget_or_compute():
+    cache = LLMCache(path=None)
+
+    async def compute():
+        return ["a", "b"]
+
+    assert asyncio.run(cache.aget_or_compute("model", 1, "paper", compute)) == ["a", "b"]
+    assert cache.get(LLMCache.key("model", 1, "paper")) == ["a", "b"]
+
+
+def test_values_survive_a_restart(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    LLMCache(path=path).put("key", {"value": 1})
+    cache = LLMCache(path=path)
+    assert cache.get("key") == {"value": 1}
+    assert cache.get("missing", "default") == "default"
+
+
+def test_memory_layer_is_bounded():
+    cache = LLMCache(path=None, max_memory_items=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, key)
+    assert list(cache.memory) == ["b", "c"]
+
+
+def test_file_evicts_least_recently_used_entries(tmp_path):
+    cache = LLMCache(path=str(tmp_path / "llm.sqlite3"), max_entries=10, max_memory_items=0)
+    for i in range(10):
+        cache.put(f"key{i}", i)
+    cache.db.execute("UPDATE llm_cache SET accessed_at = 0 WHERE key = 'key5'")
+    cache.put("key10", 10)
+    assert cache.size == 10
+    assert cache.get("key5") is None
+    assert cache.get("key10") == 10
@@ -0,0 +1,80 @@
+import numpy as np
+
+from vector_db.query_cache import QueryResultCache, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("Graph  Neural Networks?") == "graph neural networks"
+
+
+def test_get_returns_the_result_stored_for_the_normalized_query():
+    cache = QueryResultCache(path=None)
+    cache.put("Graph neural networks", {"graph": [1]}, cache.generation())
+    assert cache.get("graph  neural networks?") == {"graph": [1]}
+    assert cache.get("transformers") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_invalidate_hides_older_entries():
+    cache = QueryResultCache(path=None)
+    cache.put("graphs", {"graph": [1]}, cache.generation())
+    cache.invalidate([1])
+    assert cache.get("graphs") is None
+
+
+def test_put_after_invalidate_is_not_stored():
+    cache = QueryResultCache(path=None)
+    generation = cache.generation()
+    cache.invalidate([1])
+    cache.put("graphs", {"graph": []}, generation)
+    assert cache.get("graphs") is None
+
+
+def test_invalidate_is_seen_by_other_processes_sharing_the_file(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    worker_a = QueryResultCache(path=path)
+    worker_b = QueryResultCache(path=path)
+    worker_a.put("graphs", {"graph": [1]}, worker_a.generation())
+    assert worker_a.get("graphs") == {"graph": [1]}
+
+    worker_b.invalidate([2])
+    assert worker_a.get("graphs") is None
+
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    cache = QueryResultCache(path=path)
+    cache.put("graphs", {"graph": [1]}, cache.generation())
+    assert QueryResultCache(path=path).get("graphs") == {"graph": [1]}
+
+
+def test_expired_entries_are_not_returned():
+    cache = QueryResultCache(path=None, ttl=-1)
+    cache.put("graphs", {"graph": [1]}, cache.generation())
+    assert cache.get("graphs") is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = QueryResultCache(path=None, max_entries=2)
+    generation = cache.generation()
+    cache.put("a", 1, generation)
+    cache.put("b", 2, generation)
+    cache.get("a")
+    cache.put("c", 3, generation)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_near_duplicate_queries_reuse_a_result():
+    vectors = {
+        "graph neural networks": [1.0, 0.0],
+        "neural networks on graphs": [0.99, 0.14],
+        "protein folding": [0.0, 1.0],
+    }
+    cache = QueryResultCache(
+        path=None, embed=lambda text: np.array(vectors[text]), similarity_threshold=0.9
+    )
+    cache.put("graph neural networks", {"graph": [1]}, cache.generation())
+    assert cache.get("neural networks on graphs") == {"graph": [1]}
+    assert cache.get("protein folding") is None
@@ -0,0 +1,20 @@
+from test_concurrent_writers import make_database, paper
+
+
+def test_graph_pages_and_get_article_report_corpus_citation_counts(tmp_path):
+    db = make_database(tmp_path / "incite.sqlite3")
+    db.search_mode = "exact"
+    db.upsert_articles(
+        [
+            paper("Cited Paper", "2101.00030"),
+            paper("First Citing Paper", "2101.00031", ["Cited Paper"]),
+            paper("Second Citing Paper", "2101.00032", ["Cited Paper"]),
+        ]
+    )
+    cited = db.get_article(1, ["name", "in_refs", "num_in"])
+    assert cited["num_in"] == 2
+    assert sorted(cited["in_refs"]) == ["First Citing Paper", "Second Citing Paper"]
+
+    # A graph holding only the cited paper still reports both citations.
+    page = db.query_graph("Cited Paper", max_nodes=1, fields=["name", "in_refs", "num_in"])
+    assert page["nodes"] == [cited]
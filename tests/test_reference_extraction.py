@@ -0,0 +1,44 @@
+from data_retrieval.reference_extraction import extract_references
+
+BIBLIOGRAPHY = """
+Introduction text.
+
+References
+[1] A. Vaswani, N. Shazeer. "Attention is all you need," In NeurIPS, 2017.
+[2] K. He, X. Zhang. "Deep residual learning for image recognition," In CVPR, 2016.
+[3] J. Devlin, M. Chang. "BERT: Pre-training of deep bidirectional transformers," In NAACL, 2019.
+[4] I. Goodfellow. "Generative adversarial networks for everyone," In NeurIPS, 2014.
+[5] Kingma & Ba, Adam
+"""
+
+
+def test_regular_bibliography_needs_no_llm_call():
+    text = BIBLIOGRAPHY.replace("[5] Kingma & Ba, Adam\n", "")
+    titles = extract_references(text, lambda chunk: 1 / 0)
+    assert titles == [
+        "Attention is all you need",
+        "Deep residual learning for image recognition",
+        "BERT: Pre-training of deep bidirectional transformers",
+        "Generative adversarial networks for everyone",
+    ]
+
+
+def test_entries_the_regexes_miss_are_sent_to_the_llm():
+    chunks = []
+
+    def extract_chunk(chunk):
+        chunks.append(chunk)
+        return ["Adam: A method for stochastic optimization"]
+
+    titles = extract_references(BIBLIOGRAPHY, extract_chunk)
+    assert chunks == ["Kingma & Ba, Adam"]
+    assert len(titles) == 5
+    assert titles[-1] == "Adam: A method for stochastic optimization"
+
+
+def test_irregular_bibliography_is_sent_to_the_llm_whole():
+    text = "References\n" + "\n".join(f"[{i}] Somebody {i}, thing {i}" for i in range(1, 6))
+    chunks = []
+    titles = extract_references(text, lambda chunk: chunks.append(chunk) or ["Thing", "thing"])
+    assert len(chunks) == 1 and chunks[0].count("Somebody") == 5
+    assert titles == ["Thing"]
@@ -0,0 +1,70 @@
+import numpy as np
+
+from vector_db.title_index import TitleIndex, jaccard, normalize_title, trigrams
+
+
+def test_normalize_title():
+    assert normalize_title("Attention Is All You Need!") == "attention is all you need"
+    assert normalize_title("Schölkopf's {K}ernel \\emph{Methods}") == "scholkopf s k ernel methods"
+    assert normalize_title(None) == ""
+
+
+def test_jaccard_of_trigrams():
+    grams = trigrams("graph")
+    assert jaccard(grams, grams) == 1.0
+    assert jaccard(grams, set()) == 0.0
+
+
+def test_exact_match_after_normalization():
+    index = TitleIndex()
+    index.add_many([(1, "Attention Is All You Need"), (2, "Deep Residual Learning")])
+    assert index.match("attention is all you need.") == 1
+    assert index.match_all("Deep residual learning") == [(2, 1.0)]
+
+
+def test_fuzzy_match_tolerates_typos_but_not_other_titles():
+    index = TitleIndex()
+    index.add_many(
+        [
+            (1, "Deep Residual Learning for Image Recognition"),
+            (2, "Batch Normalization: Accelerating Deep Network Training"),
+        ]
+    )
+    assert index.match("Deep Residual Learning for Image Recogniton") == 1
+    assert index.match("Dropout: A Simple Way to Prevent Overfitting") is None
+
+
+def test_short_titles_are_only_matched_exactly():
+    index = TitleIndex()
+    index.add(1, "BERT")
+    assert index.match("BERT") == 1
+    assert index.match("BERTs") is None
+
+
+def test_re_adding_a_key_replaces_its_title_and_remove_drops_it():
+    index = TitleIndex()
+    index.add(1, "Graph Attention Networks")
+    index.add(1, "Graph Convolutional Networks")
+    assert index.match("Graph Attention Networks") is None
+    assert index.match("Graph Convolutional Networks") == 1
+    index.remove([1])
+    assert len(index) == 0
+    assert index.match("Graph Convolutional Networks") is None
+
+
+def test_embeddings_are_the_last_resort():
+    vectors = {
+        "Learning Transferable Visual Models": [1.0, 0.0],
+        "CLIP visual models from language supervision": [0.99, 0.1],
+        "Protein structure prediction": [0.0, 1.0],
+    }
+
+    def embed(texts):
+        padded = np.zeros((len(texts), 1536))
+        padded[:, :2] = [vectors[text] for text in texts]
+        return padded
+
+    index = TitleIndex(embed=embed, embedding_threshold=0.95)
+    index.add(1, "Learning Transferable Visual Models")
+    assert index.match("CLIP visual models from language supervision") == 1
+    assert index.match("Protein structure prediction") is None
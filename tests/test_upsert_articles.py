@@ -0,0 +1,27 @@
+from test_concurrent_writers import make_database, paper
+
+
+def test_title_conflict_with_another_arxiv_paper_is_reported(tmp_path, capsys):
+    db = make_database(tmp_path / "incite.sqlite3")
+    db.upsert_articles([paper("Shared Title", "2101.00040")])
+    clash = paper("Shared Title", "2101.00041")
+    assert db.needs_analysis([clash]) == [False]
+
+    capsys.readouterr()
+    assert db.upsert_articles([clash]) == []
+    output = capsys.readouterr().out
+    assert "Not storing 'Shared Title' (arXiv 2101.00041)" in output
+    assert "1 title conflicts" in output
+    assert db.lookup_article_json(1)["url"] == "http://arxiv.org/abs/2101.00040v1"
+
+
+def test_new_version_updates_the_stored_article(tmp_path):
+    db = make_database(tmp_path / "incite.sqlite3")
+    db.upsert_articles([paper("Versioned Paper", "2101.00050")])
+    revised = paper("Versioned Paper", "2101.00050")
+    revised["url"] = "http://arxiv.org/abs/2101.00050v2"
+    revised["content"] = "Versioned Paper second version"
+    assert db.needs_analysis([revised]) == [True]
+    written = db.upsert_articles([revised])
+    assert [article["id"] for article in written] == [1]
+    assert db.lookup_article_json(1)["url"] == revised["url"]
@@ -1,17 +1,126 @@
 import os
+import re
 import json
+import heapq
+import hashlib
+from contextlib import contextmanager
 from datetime import date
-import intersystems_iris.dbapi._DBAPI as dbapi
 import getpass
+import threading
+import numpy as np
 from dotenv import load_dotenv
 
-from langchain.docstore.document import Document
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.embeddings import OpenAIEmbeddings
+from vector_db.embeddings import get_embedding_service
+from vector_db.connection_pool import ConnectionPool
+from vector_db.ann_index import IVFIndex
+from vector_db.vectors import to_array, vector_literal
+from vector_db.title_index import TitleIndex
+from vector_db.lexical_index import BM25Index, extract_keywords, reciprocal_rank_fusion
+from citation_graph import CitationGraph
+
+try:
+    import intersystems_iris.dbapi._DBAPI as dbapi
+
+    IntegrityError = dbapi.IntegrityError
+except ImportError:
+    # Only needed to connect to IRIS; other connection factories (see `connect`) raise this
+    # IntegrityError for constraint violations.
+    dbapi = None
+
+    class IntegrityError(Exception):
+        pass
+
+# Articles columns that can be requested by name (see fetch_articles and query_graph).
+ARTICLE_COLUMNS = (
+    "name",
+    "url",
+    "arxiv_id",
+    "authors",
+    "keywords",
+    "publication_date",
+    "content",
+    "summary",
+    "method_issues",
+    "coi",
+)
+# Everything query_graph can return per node; "id" is always included.
+GRAPH_FIELDS = ARTICLE_COLUMNS + (
+    "out_references",
+    "num_out",
+    "in_refs",
+    "num_in",
+    "score",
+    "hops",
+    "future_research",
+)
+# The fields of the original /get_graph response (everything but the content).
+DEFAULT_GRAPH_FIELDS = (
+    "name",
+    "url",
+    "authors",
+    "publication_date",
+    "out_references",
+    "num_out",
+    "in_refs",
+    "num_in",
+    "summary",
+    "method_issues",
+    "coi",
+    "future_research",
+)
+
+
+# Articles columns indexed for lexical (BM25) search.
+LEXICAL_COLUMNS = ("name", "authors", "keywords", "summary")
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
+# ANN ids of chunk vectors are article_id * CHUNK_ID_STRIDE + chunk_no.
+CHUNK_ID_STRIDE = 1024
+
+# Columns an upsert can change without new content; None in a paper keeps the stored value.
+UPSERT_COLUMNS = ("name", "url", "authors", "publication_date", "summary", "method_issues", "coi")
+
+# The fields returned for a single article by default (see get_article).
+PAPER_FIELDS = ARTICLE_COLUMNS + ("out_references", "num_out", "in_refs", "num_in", "future_research")
+
+
+ARXIV_ID = re.compile(r"(\d{4}\.\d{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})(?:v(\d+))?")
+
+
+def parse_arxiv_id(value):
+    """
+    Splits an arXiv id or arXiv url ("2101.01234v2", "https://arxiv.org/abs/hep-th/9901001")
+    into (base id, version or None). Returns (None, None) if there is no arXiv id.
+    """
+    match = ARXIV_ID.search(value or "")
+    if match is None:
+        return None, None
+    return match.group(1), int(match.group(2)) if match.group(2) else None
+
+
+def content_hash(content):
+    """
+    SHA-256 of an article's content, stored to detect unchanged text on upsert.
+    """
+    return hashlib.sha256((content or "").encode("utf-8")).hexdigest()
 
 
 class InCiteIRISDatabase:
-    def __init__(self, config=None):
+    def __init__(
+        self,
+        config=None,
+        embedding_service=None,
+        pool_size=8,
+        pool_timeout=30.0,
+        search_mode="exact",
+        ann_nprobe=16,
+        vector_datatype="double",
+        resolve_with_embeddings=False,
+        retrieval_mode="hybrid",
+        chunk_search=True,
+        chunk_aggregation="max",
+        max_chunks=64,
+        connect=None,
+    ):
         # Use the provided config or the default configuration.
         if config is None:
             config = {
@@ -23,96 +132,809 @@ class InCiteIRISDatabase:
             }
         self.config = config
 
-        # Connect to IRIS and get a cursor.
-        self.conn = dbapi.connect(**config)
-        self.cursor = self.conn.cursor()
+        # Shared, cached embedding client (see vector_db/embeddings.py).
+        self.embeddings = embedding_service or get_embedding_service()
+
+        # Pool of IRIS connections; every method borrows its own connection and cursor,
+        # so one instance can be shared by concurrent request threads. `connect` replaces
+        # the IRIS driver with another DB-API connection factory (e.g. the SQLite stand-in
+        # in benchmarks/stand_ins.py).
+        self.pool = ConnectionPool(
+            connect or (lambda: self._connect_iris(config)), size=pool_size, timeout=pool_timeout
+        )
 
         # Define table names.
         self.articles_table_name = "InCite.Articles1"
         self.articles_references_table_name = "InCite.ArticleReferences1"
         self.questions_table_name = "InCite.Questions1"
+        self.article_chunks_table_name = "InCite.ArticleChunks1"
+        # Next free id of each table, handed out in blocks by allocate_ids.
+        self.id_sequences_table_name = "InCite.IdSequences1"
+
+        # Element type of the VECTOR columns: "double" (64-bit) or "float" (32-bit, half the size).
+        # Existing double tables can be converted with migrate_vector_storage("float").
+        self.vector_datatype = vector_datatype.lower()
+        self.vector_dim = 1536
+
+        # Maximum number of bound parameters per IN (...) list.
+        self.max_in_list = 500
+
+        # "exact" scans the table with VECTOR_DOT_PRODUCT; "ann" searches local IVF indexes
+        # (loaded from the tables on first use and kept in sync on insert).
+        self.search_mode = search_mode
+        self.ann_nprobe = ann_nprobe
+        self.vector_indexes = {}
+        self.vector_indexes_lock = threading.Lock()
+
+        # Article search (search_article_ids, query_articles_json): "vector" similarity,
+        # "lexical" BM25 over LEXICAL_COLUMNS, or "hybrid" reciprocal rank fusion of the best
+        # hybrid_candidates results of both. The BM25 index is loaded from the table on first
+        # use and kept in sync on insert.
+        if retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"retrieval_mode must be one of {RETRIEVAL_MODES}")
+        self.retrieval_mode = retrieval_mode
+        self.hybrid_candidates = 50
+        self.bm25_index = None
+        self.bm25_index_lock = threading.Lock()
+
+        # Every chunk (up to max_chunks) of an article's content is embedded and stored in the
+        # chunks table; content_vector holds the first one. With chunk_search, vector search
+        # scores articles by the "max" or "mean" similarity of their chunks. Tables created
+        # before the chunks table existed are filled by migrate_chunk_embeddings.
+        if chunk_aggregation not in ("max", "mean"):
+            raise ValueError("chunk_aggregation must be 'max' or 'mean'")
+        if not 0 < max_chunks <= CHUNK_ID_STRIDE:
+            raise ValueError(f"max_chunks must be between 1 and {CHUNK_ID_STRIDE}")
+        self.chunk_search = chunk_search
+        self.chunk_aggregation = chunk_aggregation
+        self.max_chunks = max_chunks
+        # ANN chunk hits fetched per requested article before aggregating.
+        self.chunk_oversample = 8
+
+        # Callables invoked with the ids of newly inserted articles (e.g. to invalidate caches).
+        self.insert_listeners = []
+
+        # Citation graph of the whole corpus keyed by article id, loaded by
+        # load_citation_graph and then kept in sync by this instance's writes.
+        self.citation_graph = CitationGraph()
+        self.citation_graph_loaded = False
+        self.citation_graph_lock = threading.Lock()
+
+        # Reference titles are resolved to article ids on insert (see reference_indexes).
+        # With resolve_with_embeddings, titles that do not match fuzzily are compared by
+        # embedding as a last resort (every article title is embedded once).
+        self.resolve_with_embeddings = resolve_with_embeddings
+        self.title_index = None
+        self.unresolved_references = None
+        self.reference_indexes_lock = threading.RLock()
 
         # Set up the tables.
-        # self.setup_tables() 
+        # self.setup_tables()
 
-    def setup_tables(self):
+    @staticmethod
+    def _connect_iris(config):
+        if dbapi is None:
+            raise ImportError(
+                "The InterSystems IRIS driver (intersystems_iris) is required to connect to IRIS."
+            )
+        return dbapi.connect(**config)
 
+    @contextmanager
+    def borrow_cursor(self):
+        """
+        Borrows a pooled connection and a fresh cursor for the duration of the block.
+        The caller is responsible for committing; errors roll the transaction back.
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                yield conn, cursor
+            finally:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+
+    def close(self):
+        """
+        Closes all idle pooled connections.
+        """
+        self.pool.close()
+
+    def setup_tables(self, reset=False):
+        """
+        Creates the Articles, ArticleReferences, ArticleChunks and Questions tables and their
+        indexes where they do not exist yet, keeping existing data. With reset=True every
+        table is dropped and recreated empty. Tables created by older versions are upgraded
+        in place with the migrate_* methods.
+        """
         # --- Article Table ---
-        articles_table_definition = """
+        articles_table_definition = f"""
         (
           id BIGINT PRIMARY KEY,
-          name VARCHAR(255), 
-          url VARCHAR(255), 
-          authors VARCHAR(255), 
-          keywords VARCHAR(255), 
+          name VARCHAR(255),
+          url VARCHAR(255),
+          authors VARCHAR(255),
+          keywords VARCHAR(255),
           publication_date DATE,
           content TEXT,
-          content_vector VECTOR(DOUBLE, 1536),
+          content_vector VECTOR({self.vector_datatype.upper()}, {self.vector_dim}),
           summary TEXT,
           method_issues TEXT,
-          coi TEXT
+          coi TEXT,
+          arxiv_id VARCHAR(32),
+          arxiv_version INTEGER,
+          content_hash VARCHAR(64)
         )
         """
-        # Drop the table if it exists.
-        try:
-            self.cursor.execute(f"DROP TABLE {self.articles_table_name}")
-        except Exception as e:
-            print("Articles table did not exist or could not be dropped, continuing...")
-        # Create the Articles table.
-        self.cursor.execute(
-            f"CREATE TABLE {self.articles_table_name} {articles_table_definition}"
-        )
-        print("Articles table created successfully.")
-
         # --- Article References Table ---
         articles_references_table_definition = f"""
         (
           article_id BIGINT,
           name VARCHAR(255),
+          referenced_article_id BIGINT,
           PRIMARY KEY (article_id, name),
           FOREIGN KEY (article_id) REFERENCES {self.articles_table_name}(id)
         )
         """
-        try:
-            self.cursor.execute(f"DROP TABLE {self.articles_references_table_name}")
-        except Exception as e:
-            print("Article references table did not exist or could not be dropped, continuing...")
-        self.cursor.execute(f"CREATE TABLE {self.articles_references_table_name} {articles_references_table_definition}")
-        print("Article references table created successfully.")
-
         # --- Questions Table ---
-        questions_table_definition = """
+        questions_table_definition = f"""
         (
           id BIGINT PRIMARY KEY,
-          question VARCHAR(255), 
+          question VARCHAR(255),
           priority INTEGER,
-          question_vector VECTOR(DOUBLE, 1536)
+          question_vector VECTOR({self.vector_datatype.upper()}, {self.vector_dim})
+        )
+        """
+        # --- Id Sequences Table ---
+        id_sequences_table_definition = """
+        (
+          name VARCHAR(128) PRIMARY KEY,
+          next_id BIGINT
         )
         """
+        tables = [
+            (
+                self.articles_table_name,
+                articles_table_definition,
+                self._article_unique_indexes(),
+            ),
+            (
+                self.articles_references_table_name,
+                articles_references_table_definition,
+                [
+                    f"CREATE INDEX ArticleReferencesCited ON {self.articles_references_table_name} (referenced_article_id)"
+                ],
+            ),
+            (self.article_chunks_table_name, self._chunks_table_definition(), []),
+            (self.questions_table_name, questions_table_definition, []),
+            (self.id_sequences_table_name, id_sequences_table_definition, []),
+        ]
+        with self.borrow_cursor() as (conn, cursor):
+            if reset:
+                # Tables referencing Articles go first.
+                for table_name, _, _ in reversed(tables):
+                    try:
+                        cursor.execute(f"DROP TABLE {table_name}")
+                        conn.commit()
+                    except Exception as e:
+                        conn.rollback()
+                        print(f"{table_name} did not exist or could not be dropped, continuing...")
+            for table_name, definition, indexes in tables:
+                try:
+                    cursor.execute(f"CREATE TABLE {table_name} {definition}")
+                    for index in indexes:
+                        cursor.execute(index)
+                    conn.commit()
+                    print(f"{table_name} created successfully.")
+                except Exception as e:
+                    conn.rollback()
+                    print(f"{table_name} already exists, keeping its data.")
+
+        if not reset:
+            return
+        # The tables are empty now, so are the indexes.
+        with self.vector_indexes_lock:
+            self.vector_indexes = {
+                self.articles_table_name: IVFIndex(nprobe=self.ann_nprobe),
+                self.questions_table_name: IVFIndex(nprobe=self.ann_nprobe),
+                self.article_chunks_table_name: IVFIndex(nprobe=self.ann_nprobe),
+            }
+        with self.bm25_index_lock:
+            self.bm25_index = BM25Index()
+        with self.citation_graph_lock:
+            self.citation_graph = CitationGraph()
+            self.citation_graph_loaded = True
+        with self.reference_indexes_lock:
+            self.title_index = None
+            self.unresolved_references = None
+
+    def _article_unique_indexes(self):
+        # Concurrent writers cannot store the same paper twice; name lookups use the index.
+        return [
+            f"CREATE UNIQUE INDEX ArticlesName ON {self.articles_table_name} (name)",
+            f"CREATE UNIQUE INDEX ArticlesUrl ON {self.articles_table_name} (url)",
+            f"CREATE UNIQUE INDEX ArticlesArxivId ON {self.articles_table_name} (arxiv_id)",
+        ]
+
+    def migrate_unique_indexes(self):
+        """
+        Adds the unique name, url and arxiv_id indexes to an existing Articles table (run
+        migrate_article_versions first). The id sequences table is created by setup_tables().
+        An index is skipped, with a message, if the stored articles contain duplicates.
+        """
+        with self.borrow_cursor() as (conn, cursor):
+            try:
+                # Created without UNIQUE by migrate_article_versions.
+                cursor.execute(f"DROP INDEX ArticlesArxivId ON {self.articles_table_name}")
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+            for index in self._article_unique_indexes():
+                try:
+                    cursor.execute(index)
+                    conn.commit()
+                    print(f"Created: {index}")
+                except Exception as e:
+                    conn.rollback()
+                    print(f"Could not create the index (it exists or values are duplicated): {e}")
+
+    def allocate_ids(self, table_name, count):
+        """
+        Reserves `count` consecutive ids for `table_name` and returns the first one. The
+        sequence row is updated in its own short transaction, so concurrent writers (threads
+        or processes) get disjoint blocks; ids of a failed insert are simply skipped.
+        """
+        while True:
+            with self.borrow_cursor() as (conn, cursor):
+                cursor.execute(
+                    f"UPDATE {self.id_sequences_table_name} SET next_id = next_id + ? WHERE name = ?",
+                    (count, table_name),
+                )
+                cursor.execute(
+                    f"SELECT next_id FROM {self.id_sequences_table_name} WHERE name = ?", (table_name,)
+                )
+                row = cursor.fetchone()
+                if row is not None:
+                    conn.commit()
+                    return int(row[0]) - count
+                # First allocation: start after the ids already stored (a primary key lookup).
+                cursor.execute(f"SELECT MAX(id) FROM {table_name}")
+                max_id = cursor.fetchone()[0]
+                first_id = 1 if max_id is None else int(max_id) + 1
+                try:
+                    cursor.execute(
+                        f"INSERT INTO {self.id_sequences_table_name} (name, next_id) VALUES (?, ?)",
+                        (table_name, first_id + count),
+                    )
+                    conn.commit()
+                    return first_id
+                except IntegrityError:
+                    # Another writer created the sequence first; allocate from it.
+                    conn.rollback()
+
+    def _chunks_table_definition(self):
+        return f"""
+        (
+          article_id BIGINT,
+          chunk_no INTEGER,
+          chunk_vector VECTOR({self.vector_datatype.upper()}, {self.vector_dim}),
+          PRIMARY KEY (article_id, chunk_no),
+          FOREIGN KEY (article_id) REFERENCES {self.articles_table_name}(id)
+        )
+        """
+
+    def _table_exists(self, cursor, table_name):
+        schema, _, name = table_name.rpartition(".")
+        cursor.execute(
+            "SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = ? AND TABLE_NAME = ?",
+            (schema or "SQLUser", name),
+        )
+        return cursor.fetchone()[0] > 0
+
+    def _table_columns(self, cursor, table_name):
+        cursor.execute(f"SELECT TOP 1 * FROM {table_name}")
+        cursor.fetchall()
+        return {description[0].lower() for description in cursor.description}
+
+    def _stores_datatype(self, cursor, table_name, column, datatype):
+        """
+        Whether the stored vectors of `column` already have element type `datatype`. IRIS
+        vector functions reject vectors of different types, so this compares one stored
+        vector with a zero vector of `datatype`. An empty column counts as not converted;
+        errors other than the type mismatch are raised.
+        """
         try:
-            self.cursor.execute(f"DROP TABLE {self.questions_table_name}")
+            cursor.execute(
+                f"""
+                SELECT TOP 1 VECTOR_DOT_PRODUCT({column}, to_vector(?, {datatype})) FROM {table_name}
+                WHERE {column} IS NOT NULL
+                """,
+                (vector_literal(np.zeros(self.vector_dim), datatype),),
+            )
+            return cursor.fetchone() is not None
         except Exception as e:
-            print(
-                "Questions table did not exist or could not be dropped, continuing..."
+            message = str(e).lower()
+            if "vector" in message and "type" in message:
+                return False
+            raise
+
+    def migrate_vector_storage(self, datatype="float", batch_size=500):
+        """
+        Converts the vector columns of existing Articles, ArticleChunks and Questions tables to
+        `datatype` in place, keeping all rows. Vectors are copied into a new column in committed
+        batches, then the old column is dropped and the new one renamed.
+
+        Each table's state is read first, so an interrupted migration can be re-run: copying
+        resumes where it stopped, a run stopped between the drop and the rename only renames,
+        and columns already stored as `datatype` are skipped. Missing tables are skipped.
+        """
+        datatype = datatype.lower()
+        for table_name, column, keys in (
+            (self.articles_table_name, "content_vector", ("id",)),
+            (self.article_chunks_table_name, "chunk_vector", ("article_id", "chunk_no")),
+            (self.questions_table_name, "question_vector", ("id",)),
+        ):
+            new_column = f"{column}_{datatype}"
+            with self.borrow_cursor() as (conn, cursor):
+                if not self._table_exists(cursor, table_name):
+                    # e.g. ArticleChunks in databases created before chunk embeddings.
+                    print(f"{table_name} does not exist, skipping.")
+                    continue
+                columns = self._table_columns(cursor, table_name)
+                if column not in columns and new_column in columns:
+                    # Stopped after dropping the old column: only the rename is left.
+                    cursor.execute(f"ALTER TABLE {table_name} ALTER COLUMN {new_column} RENAME {column}")
+                    conn.commit()
+                    print(f"{table_name}.{column} is now stored as {datatype}.")
+                    continue
+                if column not in columns:
+                    print(f"{table_name} has no {column} column, skipping.")
+                    continue
+                if new_column not in columns:
+                    if self._stores_datatype(cursor, table_name, column, datatype):
+                        print(f"{table_name}.{column} is already stored as {datatype}.")
+                        continue
+                    cursor.execute(
+                        f"ALTER TABLE {table_name} ADD {new_column} VECTOR({datatype.upper()}, {self.vector_dim})"
+                    )
+                    conn.commit()
+                else:
+                    print(f"Column {new_column} already exists, resuming migration...")
+
+                migrated = 0
+                while True:
+                    cursor.execute(
+                        f"""
+                        SELECT TOP {int(batch_size)} {column}, {", ".join(keys)} FROM {table_name}
+                        WHERE {column} IS NOT NULL AND {new_column} IS NULL
+                        """
+                    )
+                    rows = cursor.fetchall()
+                    if not rows:
+                        break
+                    cursor.executemany(
+                        f"UPDATE {table_name} SET {new_column} = to_vector(?, {datatype}) "
+                        f"WHERE {' AND '.join(f'{key} = ?' for key in keys)}",
+                        [(vector_literal(row[0], datatype),) + tuple(row[1:]) for row in rows],
+                    )
+                    conn.commit()
+                    migrated += len(rows)
+                    print(f"Migrated {migrated} vectors in {table_name}...")
+
+                cursor.execute(f"ALTER TABLE {table_name} DROP COLUMN {column}")
+                conn.commit()
+                cursor.execute(f"ALTER TABLE {table_name} ALTER COLUMN {new_column} RENAME {column}")
+                conn.commit()
+            print(f"{table_name}.{column} is now stored as {datatype}.")
+        self.vector_datatype = datatype
+
+    def migrate_reference_links(self, batch_size=1000):
+        """
+        Adds the referenced_article_id column (and its index) to an existing references table
+        and resolves every stored reference title that is not linked yet. Safe to re-run.
+        """
+        with self.borrow_cursor() as (conn, cursor):
+            try:
+                cursor.execute(
+                    f"ALTER TABLE {self.articles_references_table_name} ADD referenced_article_id BIGINT"
+                )
+                cursor.execute(
+                    f"CREATE INDEX ArticleReferencesCited ON {self.articles_references_table_name} (referenced_article_id)"
+                )
+                conn.commit()
+            except Exception as e:
+                print("referenced_article_id already exists, resolving remaining references...")
+                conn.rollback()
+
+        # Rebuild the indexes from the current tables.
+        with self.reference_indexes_lock:
+            self.title_index = None
+            self.unresolved_references = None
+        titles, unresolved = self.reference_indexes()
+
+        links = []
+        with self.reference_indexes_lock:
+            for (article_id, name) in list(unresolved.entries):
+                cited = titles.match(name)
+                if cited is not None and cited != article_id:
+                    links.append((cited, article_id, name))
+        with self.borrow_cursor() as (conn, cursor):
+            for start in range(0, len(links), batch_size):
+                cursor.executemany(
+                    f"UPDATE {self.articles_references_table_name} SET referenced_article_id = ? WHERE article_id = ? AND name = ?",
+                    links[start : start + batch_size],
+                )
+                conn.commit()
+        unresolved.remove([(article_id, name) for _, article_id, name in links])
+        print(f"Resolved {len(links)} references, {len(unresolved)} still unresolved.")
+
+    def migrate_article_versions(self, batch_size=500):
+        """
+        Adds the arxiv_id, arxiv_version and content_hash columns (and the arxiv_id index) to
+        an existing Articles table and fills them from the stored url and content in committed
+        batches. Nothing is re-embedded. Safe to re-run.
+        """
+        with self.borrow_cursor() as (conn, cursor):
+            try:
+                cursor.execute(f"ALTER TABLE {self.articles_table_name} ADD arxiv_id VARCHAR(32)")
+                cursor.execute(f"ALTER TABLE {self.articles_table_name} ADD arxiv_version INTEGER")
+                cursor.execute(f"ALTER TABLE {self.articles_table_name} ADD content_hash VARCHAR(64)")
+                cursor.execute(
+                    f"CREATE INDEX ArticlesArxivId ON {self.articles_table_name} (arxiv_id)"
+                )
+                conn.commit()
+            except Exception as e:
+                print("Version columns already exist, filling remaining articles...")
+                conn.rollback()
+
+            migrated = 0
+            while True:
+                cursor.execute(
+                    f"""
+                    SELECT TOP {int(batch_size)} id, url, content FROM {self.articles_table_name}
+                    WHERE content_hash IS NULL
+                    """
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                cursor.executemany(
+                    f"UPDATE {self.articles_table_name} SET arxiv_id = ?, arxiv_version = ?, content_hash = ? WHERE id = ?",
+                    [parse_arxiv_id(url) + (content_hash(content), article_id) for article_id, url, content in rows],
+                )
+                conn.commit()
+                migrated += len(rows)
+                print(f"Filled the version columns of {migrated} articles...")
+        print(f"Article versions are up to date ({migrated} articles filled).")
+
+    def migrate_chunk_embeddings(self, batch_size=50):
+        """
+        Creates the chunks table for an existing database if needed and embeds the chunks of
+        every article that has none yet, `batch_size` articles per batch and commit. Safe to
+        re-run.
+        """
+        with self.borrow_cursor() as (conn, cursor):
+            try:
+                cursor.execute(
+                    f"CREATE TABLE {self.article_chunks_table_name} {self._chunks_table_definition()}"
+                )
+                conn.commit()
+            except Exception as e:
+                print("Article chunks table already exists, embedding remaining articles...")
+                conn.rollback()
+
+        migrated = 0
+        while True:
+            with self.borrow_cursor() as (conn, cursor):
+                cursor.execute(
+                    f"""
+                    SELECT TOP {int(batch_size)} id, content FROM {self.articles_table_name}
+                    WHERE id NOT IN (SELECT article_id FROM {self.article_chunks_table_name})
+                    """
+                )
+                rows = cursor.fetchall()
+            if not rows:
+                break
+            chunk_vectors = self.embeddings.embed_documents(
+                [row[1] or "" for row in rows], self.max_chunks
             )
-        self.cursor.execute(
-            f"CREATE TABLE {self.questions_table_name} {questions_table_definition}"
+            chunk_rows = []
+            for (article_id, _), vectors in zip(rows, chunk_vectors):
+                chunk_rows.extend(self._chunk_rows(article_id, vectors))
+            with self.borrow_cursor() as (conn, cursor):
+                self._write_chunks(cursor, chunk_rows)
+                conn.commit()
+            self._index_chunks(chunk_rows)
+            migrated += len(rows)
+            print(f"Embedded the chunks of {migrated} articles...")
+        print(f"Chunk embeddings are up to date ({migrated} articles embedded).")
+
+    def _chunk_rows(self, article_id, vectors):
+        return [(article_id, chunk_no, vector) for chunk_no, vector in enumerate(vectors)]
+
+    def _write_chunks(self, cursor, chunk_rows):
+        if chunk_rows:
+            cursor.executemany(
+                f"""
+                INSERT INTO {self.article_chunks_table_name} (article_id, chunk_no, chunk_vector)
+                VALUES (?, ?, to_vector(?, {self.vector_datatype}))
+                """,
+                [
+                    (article_id, chunk_no, vector_literal(vector, self.vector_datatype))
+                    for article_id, chunk_no, vector in chunk_rows
+                ],
+            )
+
+    def _index_chunks(self, chunk_rows):
+        self._index_vectors(
+            self.article_chunks_table_name,
+            [article_id * CHUNK_ID_STRIDE + chunk_no for article_id, chunk_no, _ in chunk_rows],
+            [vector for _, _, vector in chunk_rows],
         )
-        print("Questions table created successfully.")
 
     def embed_text(self, text):
         """
-        Computes an embedding for the given text using LangChain's OpenAIEmbeddings.
-        The document is split into chunks and, for simplicity, only the first chunk is used.
+        Computes an embedding for the given text using the shared embedding service.
+        Only the first chunk of the document is embedded, and results are cached by content hash.
+        """
+        return self.embeddings.embed(text)
+
+    def vector_index(self, table_name):
+        """
+        Returns the IVF index for `table_name` (articles, article chunks or questions), loading every stored
+        vector from the table the first time it is needed.
+        """
+        with self.vector_indexes_lock:
+            index = self.vector_indexes.get(table_name)
+            if index is not None:
+                return index
+            id_column = "id"
+            if table_name == self.articles_table_name:
+                vector_column = "content_vector"
+            elif table_name == self.article_chunks_table_name:
+                id_column = f"article_id * {CHUNK_ID_STRIDE} + chunk_no"
+                vector_column = "chunk_vector"
+            else:
+                vector_column = "question_vector"
+            index = IVFIndex(nprobe=self.ann_nprobe)
+            with self.borrow_cursor() as (conn, cursor):
+                cursor.execute(
+                    f"SELECT {id_column}, {vector_column} FROM {table_name} WHERE {vector_column} IS NOT NULL"
+                )
+                while True:
+                    rows = cursor.fetchmany(10000)
+                    if not rows:
+                        break
+                    index.add(
+                        [row[0] for row in rows], [to_array(row[1]) for row in rows]
+                    )
+            print(f"Loaded {len(index)} vectors from {table_name} into the ANN index.")
+            self.vector_indexes[table_name] = index
+            return index
+
+    def lexical_index(self):
+        """
+        Returns the BM25 index of the articles, loading LEXICAL_COLUMNS of every stored article
+        the first time it is needed.
+        """
+        with self.bm25_index_lock:
+            if self.bm25_index is not None:
+                return self.bm25_index
+            index = BM25Index()
+            with self.borrow_cursor() as (conn, cursor):
+                cursor.execute(f"SELECT id, {', '.join(LEXICAL_COLUMNS)} FROM {self.articles_table_name}")
+                while True:
+                    rows = cursor.fetchmany(10000)
+                    if not rows:
+                        break
+                    index.add_many((row[0], dict(zip(LEXICAL_COLUMNS, row[1:]))) for row in rows)
+            print(f"Loaded {len(index)} articles into the BM25 index.")
+            self.bm25_index = index
+            return index
+
+    def load_citation_graph(self):
+        """
+        Returns the citation graph of all stored articles (keyed by article id). The first
+        call reads every article and resolved reference; later calls only add the articles
+        that are not in the graph yet (e.g. written by another process) and the resolved
+        references that touch them. Ids are not assumed to commit in order, so a missing
+        article is found by its id rather than by being newer than the last one loaded.
+
+        Articles are never deleted, so while the stored article count equals the number of
+        nodes nothing is missing and the call costs one COUNT(*). Only new articles are
+        picked up from other processes: references that another process rewrites for an
+        existing article (_update_articles) stay as loaded here until the graph is reloaded
+        (set citation_graph_loaded to False) or the process restarts.
+        """
+        with self.citation_graph_lock:
+            if not self.citation_graph_loaded:
+                self.citation_graph = CitationGraph()
+            graph = self.citation_graph
+            with self.borrow_cursor() as (conn, cursor):
+                if self.citation_graph_loaded:
+                    cursor.execute(f"SELECT COUNT(*) FROM {self.articles_table_name}")
+                    if cursor.fetchone()[0] == len(graph):
+                        return graph
+                cursor.execute(f"SELECT id FROM {self.articles_table_name}")
+                article_ids = [row[0] for row in cursor.fetchall() if row[0] not in graph.node_ids]
+                if not article_ids and self.citation_graph_loaded:
+                    return graph
+                edges = []
+                if not self.citation_graph_loaded:
+                    cursor.execute(
+                        f"""
+                        SELECT article_id, referenced_article_id FROM {self.articles_references_table_name}
+                        WHERE referenced_article_id IS NOT NULL
+                        """
+                    )
+                    edges = cursor.fetchall()
+                else:
+                    for start in range(0, len(article_ids), self.max_in_list):
+                        batch = article_ids[start : start + self.max_in_list]
+                        placeholders = ",".join("?" for _ in batch)
+                        cursor.execute(
+                            f"""
+                            SELECT article_id, referenced_article_id FROM {self.articles_references_table_name}
+                            WHERE referenced_article_id IS NOT NULL
+                              AND (article_id IN ({placeholders}) OR referenced_article_id IN ({placeholders}))
+                            """,
+                            batch + batch,
+                        )
+                        edges.extend(cursor.fetchall())
+
+            for article_id in article_ids:
+                graph.add_node(article_id)
+            node_ids = graph.node_ids
+            graph.add_edges((src, dst) for src, dst in edges if src in node_ids and dst in node_ids)
+            self.citation_graph_loaded = True
+            print(f"Citation graph: {len(graph)} articles, {graph.num_edges} citations.")
+            return graph
+
+    def reference_indexes(self):
+        """
+        Returns (title_index, unresolved_references): article titles keyed by article id, and
+        the reference titles that did not resolve keyed by (article_id, name). Both are
+        loaded from the tables the first time they are needed and kept in sync on insert.
+        """
+        with self.reference_indexes_lock:
+            if self.title_index is not None:
+                return self.title_index, self.unresolved_references
+            embed = self.embeddings.embed_many if self.resolve_with_embeddings else None
+            titles = TitleIndex(embed=embed)
+            unresolved = TitleIndex()
+            with self.borrow_cursor() as (conn, cursor):
+                cursor.execute(f"SELECT id, name FROM {self.articles_table_name}")
+                titles.add_many(cursor.fetchall())
+                cursor.execute(
+                    f"SELECT article_id, name FROM {self.articles_references_table_name} WHERE referenced_article_id IS NULL"
+                )
+                unresolved.add_many(
+                    ((article_id, str(name)), str(name)) for article_id, name in cursor.fetchall()
+                )
+            print(
+                f"Loaded {len(titles)} article titles and {len(unresolved)} unresolved references."
+            )
+            self.title_index, self.unresolved_references = titles, unresolved
+            return titles, unresolved
+
+    def _resolve_references(self, new_articles, references):
+        """
+        Links references to article ids. `new_articles` are (id, name) of articles being
+        inserted and `references` are (article_id, title) pairs. Returns reference rows
+        (article_id, title, referenced id or None) and back-fill rows (new article id,
+        article_id, title) for stored references that now resolve to a new article.
+        Call with reference_indexes_lock held.
+        """
+        titles, unresolved = self.reference_indexes()
+        batch_titles = TitleIndex(threshold=titles.threshold)
+        batch_titles.add_many(new_articles)
+
+        reference_rows = []
+        for article_id, title in references:
+            cited = titles.match(title)
+            if cited is None:
+                cited = batch_titles.match(title)
+            if cited == article_id:
+                cited = None
+            reference_rows.append((article_id, title, cited))
+
+        backfill_rows = []
+        for article_id, name in new_articles:
+            for (citing_id, title), _ in unresolved.match_all(name):
+                if citing_id != article_id:
+                    backfill_rows.append((article_id, citing_id, title))
+        return reference_rows, backfill_rows
+
+    def _write_references(self, cursor, reference_rows, backfill_rows):
+        if reference_rows:
+            cursor.executemany(
+                f"INSERT INTO {self.articles_references_table_name} (article_id, name, referenced_article_id) VALUES (?, ?, ?)",
+                reference_rows,
+            )
+        if backfill_rows:
+            cursor.executemany(
+                f"UPDATE {self.articles_references_table_name} SET referenced_article_id = ? WHERE article_id = ? AND name = ?",
+                backfill_rows,
+            )
+
+    def _references_written(self, new_articles, reference_rows, backfill_rows):
         """
-        doc = Document(page_content=text)
-        splitter = CharacterTextSplitter(chunk_size=4096)
-        chunks = splitter.split_documents([doc])
-        embeddings = OpenAIEmbeddings()
-        embedded_chunks = embeddings.embed_documents(
-            [chunk.page_content for chunk in chunks]
+        Updates the in-memory title indexes and citation graph after a commit.
+        Call with reference_indexes_lock held.
+        """
+        titles, unresolved = self.reference_indexes()
+        titles.add_many(new_articles)
+        unresolved.remove([(article_id, title) for _, article_id, title in backfill_rows])
+        unresolved.add_many(
+            ((article_id, title), title)
+            for article_id, title, cited in reference_rows
+            if cited is None
         )
-        return embedded_chunks[0]
+        # load_citation_graph does not re-read edges between articles already in the graph,
+        # so once it is loaded the new articles and their edges are added here. Edges to an
+        # article that is not loaded yet are read when load_citation_graph adds it.
+        edges = [(article_id, cited) for article_id, _, cited in reference_rows if cited is not None]
+        edges += [(citing_id, cited) for cited, citing_id, _ in backfill_rows]
+        with self.citation_graph_lock:
+            if self.citation_graph_loaded:
+                for article_id, _ in new_articles:
+                    self.citation_graph.add_node(article_id)
+                node_ids = self.citation_graph.node_ids
+                self.citation_graph.add_edges(
+                    (src, dst) for src, dst in edges if src in node_ids and dst in node_ids
+                )
+
+    def _index_vectors(self, table_name, ids, vectors):
+        """
+        Adds freshly inserted vectors to the table's index if it has already been loaded.
+        The index is looked up under vector_indexes_lock, so while vector_index is loading it
+        this waits for the load and adds the vectors even if the load's scan missed them;
+        an index loaded later reads them from the table.
+        """
+        with self.vector_indexes_lock:
+            index = self.vector_indexes.get(table_name)
+        if index is not None:
+            index.add(ids, vectors)
+
+    def _index_lexical(self, documents):
+        """
+        Adds freshly inserted articles ((id, {column: text})) to the BM25 index if it has
+        already been loaded. Like _index_vectors, this waits for a load in progress.
+        """
+        with self.bm25_index_lock:
+            index = self.bm25_index
+        if index is not None:
+            index.add_many(documents)
+
+    def _notify_inserted(self, article_ids):
+        """
+        Calls every registered insert listener with the ids of new articles.
+        """
+        if not article_ids:
+            return
+        for listener in self.insert_listeners:
+            listener(article_ids)
+
+    def _ann_rows(self, cursor, table_name, columns, hits, score_position):
+        """
+        Fetches `columns` for the (id, score) pairs of an ANN search in one query. Returns rows
+        in descending score order with the similarity score inserted at `score_position`,
+        matching the shape of the exact VECTOR_DOT_PRODUCT queries.
+        """
+        if not hits:
+            return []
+        placeholders = ",".join("?" for _ in hits)
+        cursor.execute(
+            f"SELECT {columns} FROM {table_name} WHERE id IN ({placeholders})",
+            [article_id for article_id, _ in hits],
+        )
+        rows_by_id = {row[0]: tuple(row) for row in cursor.fetchall()}
+        return [
+            rows_by_id[hit_id][:score_position] + (score,) + rows_by_id[hit_id][score_position:]
+            for hit_id, score in hits
+            if hit_id in rows_by_id
+        ]
 
     def insert_article(
         self,
@@ -129,41 +951,61 @@ class InCiteIRISDatabase:
     ):
         """
         Inserts an article into the Articles table.
-        The content is embedded using LangChain and stored in the content_vector column.
+        Every chunk of the content is embedded and stored in the chunks table; the first
+        chunk's embedding is also stored in the content_vector column.
         """
         try:
-            # Compute the embedding for the article content.
-            content_vector = self.embed_text(content)
-            print("Article embedding:", content_vector)
+            # Compute the embeddings of the article content.
+            chunk_vectors = self.embeddings.embed_documents([content], self.max_chunks)[0]
+            content_vector = chunk_vectors[0]
+            chunk_rows = self._chunk_rows(id, chunk_vectors)
 
             # Convert the embedding into a string for SQL.
-            vector_literal = ",".join(str(x) for x in content_vector)
+            content_literal = vector_literal(content_vector, self.vector_datatype)
 
             # Insert into the Articles table.
+            arxiv_id, arxiv_version = parse_arxiv_id(url)
             sql = f"""
-            INSERT INTO {self.articles_table_name} 
-              (id, name, url, authors, keywords, publication_date, content, content_vector, summary, method_issues, coi)
-            VALUES (?, ?, ?, ?, ?, ?, ?, to_vector(?, double), ?, ?, ?)
+            INSERT INTO {self.articles_table_name}
+              (id, name, url, authors, keywords, publication_date, content, content_vector, summary, method_issues, coi,
+               arxiv_id, arxiv_version, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, to_vector(?, {self.vector_datatype}), ?, ?, ?, ?, ?, ?)
             """
-            self.cursor.execute(
-                sql,
-                (
-                    id,
-                    name,
-                    url,
-                    authors,
-                    keywords,
-                    publication_date,
-                    content,
-                    vector_literal,
-                    summary,
-                    method_issues,
-                    coi,
-                ),
+            with self.reference_indexes_lock:
+                # Stored references that cite this title are linked to the new article.
+                _, backfill_rows = self._resolve_references([(id, name)], [])
+                with self.borrow_cursor() as (conn, cursor):
+                    cursor.execute(
+                        sql,
+                        (
+                            id,
+                            name,
+                            url,
+                            authors,
+                            keywords,
+                            publication_date,
+                            content,
+                            content_literal,
+                            summary,
+                            method_issues,
+                            coi,
+                            arxiv_id,
+                            arxiv_version,
+                            content_hash(content),
+                        ),
+                    )
+                    self._write_chunks(cursor, chunk_rows)
+                    self._write_references(cursor, [], backfill_rows)
+                    conn.commit()
+                self._references_written([(id, name)], [], backfill_rows)
+            self._index_vectors(self.articles_table_name, [id], [content_vector])
+            self._index_chunks(chunk_rows)
+            self._index_lexical(
+                [(id, {"name": name, "authors": authors, "keywords": keywords, "summary": summary})]
             )
-            self.conn.commit()
+            self._notify_inserted([id])
             print(f"Article '{name}' inserted successfully.")
-        except dbapi.IntegrityError as e:
+        except IntegrityError as e:
             if "duplicate key value violates unique constraint" in str(e):
                 print(f"Error: An article with ID {id} already exists.")
             else:
@@ -179,59 +1021,71 @@ class InCiteIRISDatabase:
         query_embedding = self.embed_text(query_text)
         # print("Query embedding:", query_embedding)
 
-        # Convert the query embedding into a comma-separated string literal.
-        vector_literal = ",".join(str(x) for x in query_embedding)
-        # print("Vector literal:", vector_literal)
-
-        # Build the SQL query.
+        # Build the SQL query; the query vector is bound as a parameter.
         sql = f"""
-        SELECT TOP {top_k} 
+        SELECT TOP {int(top_k)}
                id, name, url, authors, keywords, publication_date, content,
-               VECTOR_DOT_PRODUCT(content_vector, to_vector('{vector_literal}', double)) AS similarity_score 
+               VECTOR_DOT_PRODUCT(content_vector, to_vector(?, {self.vector_datatype})) AS similarity_score
         FROM {self.articles_table_name}
         ORDER BY similarity_score DESC
         """
-        print("Executing SQL:", sql)
-        self.cursor.execute(sql)
-        results = self.cursor.fetchall()
+        if self.search_mode == "ann":
+            hits = self.vector_index(self.articles_table_name).search(query_embedding, top_k)
+            with self.borrow_cursor() as (conn, cursor):
+                return self._ann_rows(
+                    cursor,
+                    self.articles_table_name,
+                    "id, name, url, authors, keywords, publication_date, content",
+                    hits,
+                    7,
+                )
+        with self.borrow_cursor() as (conn, cursor):
+            print("Executing SQL:", sql)
+            cursor.execute(sql, (vector_literal(query_embedding, self.vector_datatype),))
+            results = cursor.fetchall()
         return results
 
     def lookup_article(self, article_id):
         """
-        Looks up an article by ID and retrieves its details along with referenced articles.
+        Looks up an article by ID and retrieves its details along with the ids of the
+        articles it references (references that did not resolve to an article are omitted).
         """
-        # Retrieve the article details.
-        self.cursor.execute(
-            f"SELECT * FROM {self.articles_table_name} WHERE id = ?", (article_id,)
-        )
-        article = self.cursor.fetchone()
-
-        # Retrieve references.
-        self.cursor.execute(
-            f"""
-            SELECT referenced_article_id FROM {self.articles_references_table_name} WHERE article_id = ?
-        """,
-            (article_id,),
-        )
-        references = [row[0] for row in self.cursor.fetchall()]
+        with self.borrow_cursor() as (conn, cursor):
+            # Retrieve the article details.
+            cursor.execute(
+                f"SELECT * FROM {self.articles_table_name} WHERE id = ?", (article_id,)
+            )
+            article = cursor.fetchone()
+
+            # Retrieve references.
+            cursor.execute(
+                f"""
+                SELECT referenced_article_id FROM {self.articles_references_table_name}
+                WHERE article_id = ? AND referenced_article_id IS NOT NULL
+            """,
+                (article_id,),
+            )
+            references = [row[0] for row in cursor.fetchall()]
 
         return article, references
 
     def insert_article_references(self, article_id, reference_names):
         """
         Inserts multiple article references into the ArticleReferences table.
-        Takes a list of reference names as strings.
+        Takes a list of reference names as strings; each is resolved to the id of a stored
+        article when its title matches (see vector_db/title_index.py).
         """
         try:
-            for ref_name in reference_names:
-                sql = f"""
-                INSERT INTO {self.articles_references_table_name} (article_id, name)
-                VALUES (?, ?)
-                """
-                self.cursor.execute(sql, (article_id, ref_name))
-            self.conn.commit()
+            with self.reference_indexes_lock:
+                reference_rows, _ = self._resolve_references(
+                    [], [(article_id, ref_name) for ref_name in reference_names]
+                )
+                with self.borrow_cursor() as (conn, cursor):
+                    self._write_references(cursor, reference_rows, [])
+                    conn.commit()
+                self._references_written([], reference_rows, [])
             print(f"References for article {article_id} inserted successfully.")
-        except dbapi.IntegrityError as e:
+        except IntegrityError as e:
             print(f"An error occurred while inserting references: {e}")
 
     def insert_question(self, id, question, priority):
@@ -244,19 +1098,21 @@ class InCiteIRISDatabase:
             question_vector = self.embed_text(question)
             # print("Question embedding:", question_vector)
 
-            # Convert the embedding into a comma-separated string.
-            vector_literal = ",".join(str(x) for x in question_vector)
-
-            # Build the INSERT SQL statement.
+            # Build the INSERT SQL statement; the vector is bound as a parameter.
             sql = f"""
-            INSERT INTO {self.questions_table_name} 
+            INSERT INTO {self.questions_table_name}
               (id, question, priority, question_vector)
-            VALUES (?, ?, ?, to_vector('{vector_literal}', double))
+            VALUES (?, ?, ?, to_vector(?, {self.vector_datatype}))
             """
-            self.cursor.execute(sql, (id, question, priority))
-            self.conn.commit()
+            with self.borrow_cursor() as (conn, cursor):
+                cursor.execute(
+                    sql,
+                    (id, question, priority, vector_literal(question_vector, self.vector_datatype)),
+                )
+                conn.commit()
+            self._index_vectors(self.questions_table_name, [id], [question_vector])
             print(f"Question '{question}' inserted successfully.")
-        except dbapi.IntegrityError as e:
+        except IntegrityError as e:
             if "duplicate key value violates unique constraint" in str(e):
                 print(f"Error: A question with ID {id} already exists.")
             else:
@@ -270,119 +1126,490 @@ class InCiteIRISDatabase:
         """
         query_embedding = self.embed_text(query_text)
         # print("Query embedding:", query_embedding)
-        vector_literal = ",".join(str(x) for x in query_embedding)
-        # print("Vector literal:", vector_literal)
         sql = f"""
-        SELECT TOP {top_k} 
+        SELECT TOP {int(top_k)}
                id, question, priority,
-               VECTOR_DOT_PRODUCT(question_vector, to_vector('{vector_literal}', double)) AS similarity_score 
+               VECTOR_DOT_PRODUCT(question_vector, to_vector(?, {self.vector_datatype})) AS similarity_score
         FROM {self.questions_table_name}
         ORDER BY similarity_score DESC
         """
-        print("Executing SQL:", sql)
-        self.cursor.execute(sql)
-        results = self.cursor.fetchall()
+        if self.search_mode == "ann":
+            hits = self.vector_index(self.questions_table_name).search(query_embedding, top_k)
+            with self.borrow_cursor() as (conn, cursor):
+                return self._ann_rows(
+                    cursor,
+                    self.questions_table_name,
+                    "id, question, priority",
+                    hits,
+                    3,
+                )
+        with self.borrow_cursor() as (conn, cursor):
+            print("Executing SQL:", sql)
+            cursor.execute(sql, (vector_literal(query_embedding, self.vector_datatype),))
+            results = cursor.fetchall()
         return results
 
     def lookup_question(self, question_id):
         """
         Looks up a question by ID and returns its row.
         """
-        self.cursor.execute(
-            f"SELECT * FROM {self.questions_table_name} WHERE id = ?", (question_id,)
-        )
-        return self.cursor.fetchone()
+        with self.borrow_cursor() as (conn, cursor):
+            cursor.execute(
+                f"SELECT * FROM {self.questions_table_name} WHERE id = ?", (question_id,)
+            )
+            return cursor.fetchone()
 
     def insert_article_json(self, article_json):
         """
         Inserts an article into the Articles table using a JSON/dict object, then returns the
-        article in the specified JSON format.
-        """
-        # Check if the db already has an article with the same name.
-        self.cursor.execute(f"SELECT * FROM {self.articles_table_name} WHERE name = ?", (article_json.get("name"),))
-        if self.cursor.fetchone():
-            return None
-        # Generate a new id by selecting the current maximum and adding 1.
-        self.cursor.execute(f"SELECT MAX(id) FROM {self.articles_table_name}")
-        max_id_row = self.cursor.fetchone()
-        new_id = 1 if (max_id_row[0] is None) else int(max_id_row[0]) + 1
-
-        # Extract fields from the JSON object.
-        name = article_json.get("name")
-        url = article_json.get("url")
-        authors = article_json.get("authors")
-        content = article_json.get("content")
-        publication_date = article_json.get("publication_date")
-        summary = article_json.get("summary")
-        method_issues = article_json.get("method_issues")
-        coi = article_json.get("coi")
-        future_research = article_json.get("future_research", "")
-        out_references = article_json.get("out_references", [])
-
-        # Compute the embedding for the article content.
-        content_vector = self.embed_text(content)
-        vector_literal = ",".join(str(x) for x in content_vector)
-
-        # Insert into the Articles table.
-        sql = f"""
-        INSERT INTO {self.articles_table_name} 
-          (id, name, url, authors, keywords, publication_date, content, content_vector, summary, method_issues, coi)
-        VALUES (?, ?, ?, ?, ?, ?, ?, to_vector(?, double), ?, ?, ?)
+        article in the specified JSON format. An article with the same arXiv id (or name) is
+        updated instead (see upsert_articles). Returns None if nothing changed.
         """
-        self.cursor.execute(
-            sql,
-            (
-                new_id,
-                name,
-                url,
-                authors,
-                "",
-                publication_date,
-                content,
-                vector_literal,
-                summary,
-                method_issues,
-                coi,
-            ),
+        written = self.upsert_articles([article_json])
+        return written[0] if written else None
+
+    def _article_keywords(self, paper):
+        """
+        Value of the keywords column: the paper's own keywords, else extracted ones.
+        """
+        keywords = paper.get("keywords") or extract_keywords(
+            paper.get("name"), paper.get("content"), paper.get("url")
         )
-        self.conn.commit()
+        if not isinstance(keywords, str):
+            keywords = ", ".join(keywords)
+        return keywords[:255]
 
-        # If there are outgoing references provided, insert them.
-        if out_references:
-            self.insert_article_references(new_id, out_references)
+    def _lexical_document(self, article_id, paper, keywords):
+        return (
+            article_id,
+            {
+                "name": paper.get("name"),
+                "authors": paper.get("authors"),
+                "keywords": keywords,
+                "summary": paper.get("summary"),
+            },
+        )
 
-        # Build and return the JSON object.
+    def _reference_titles(self, article_id, out_references):
+        """
+        (article_id, title) pairs to store for a paper's references. (article_id, name) is
+        the primary key, so repeated titles are skipped.
+        """
+        references = []
+        seen_refs = set()
+        for ref_name in out_references or []:
+            ref_name = ref_name[:255]
+            if ref_name and ref_name not in seen_refs:
+                seen_refs.add(ref_name)
+                references.append((article_id, ref_name))
+        return references
+
+    def _article_json(self, article_id, paper):
+        out_references = paper.get("out_references", [])
         return {
-            "name": name,
-            "url": url,
-            "authors": authors,
-            "content": content,
-            "publication_date": publication_date,
+            "id": article_id,
+            "name": paper.get("name"),
+            "url": paper.get("url"),
+            "authors": paper.get("authors"),
+            "content": paper.get("content"),
+            "publication_date": paper.get("publication_date"),
             "out_references": out_references,
             "num_out": len(out_references),
-            "summary": summary,
-            "method_issues": method_issues,
-            "coi": coi,
-            "future_research": future_research,
+            "summary": paper.get("summary"),
+            "method_issues": paper.get("method_issues"),
+            "coi": paper.get("coi"),
+            "future_research": paper.get("future_research", ""),
         }
 
-    def lookup_article_json(self, article_id):
+    def insert_articles_bulk(self, papers):
         """
-        Looks up an article by its id and returns its details in JSON format.
+        Inserts many articles (JSON/dict objects, as for insert_article_json) at once.
+        Names are deduplicated in one query, ids are allocated as a block (allocate_ids), the chunks of all
+        contents are embedded in one batch and articles, chunks and references are written
+        with executemany in a single transaction. Returns the inserted articles in the insert_article_json format,
+        with their new "id".
+        """
+        # Drop papers without a name and duplicates within the batch itself.
+        unique_papers = {}
+        for paper in papers:
+            name = paper.get("name")
+            if name and name not in unique_papers:
+                unique_papers[name] = paper
+        if not unique_papers:
+            return []
+
+        # Drop papers that are already in the db.
+        existing = set()
+        names = list(unique_papers)
+        with self.borrow_cursor() as (conn, cursor):
+            for start in range(0, len(names), self.max_in_list):
+                batch = names[start : start + self.max_in_list]
+                placeholders = ",".join("?" for _ in batch)
+                cursor.execute(
+                    f"SELECT name FROM {self.articles_table_name} WHERE name IN ({placeholders})",
+                    batch,
+                )
+                existing.update(row[0] for row in cursor.fetchall())
+        new_papers = [paper for name, paper in unique_papers.items() if name not in existing]
+        if existing:
+            print(f"Skipped {len(existing)} articles whose names are already stored.")
+        if not new_papers:
+            return []
+
+        # Embed the chunks of every paper in one batched call.
+        chunk_vectors = self.embeddings.embed_documents(
+            [paper.get("content") or "" for paper in new_papers], self.max_chunks
+        )
+        content_vectors = [vectors[0] for vectors in chunk_vectors]
+
+        # Load the title indexes and reserve a block of ids before borrowing a connection
+        # for the insert.
+        self.reference_indexes()
+        first_id = self.allocate_ids(self.articles_table_name, len(new_papers))
+        with self.reference_indexes_lock, self.borrow_cursor() as (conn, cursor):
+            article_rows = []
+            chunk_rows = []
+            new_articles = []
+            lexical_documents = []
+            references = []
+            inserted = []
+            for offset, (paper, content_vector) in enumerate(zip(new_papers, content_vectors)):
+                new_id = first_id + offset
+                keywords = self._article_keywords(paper)
+                arxiv_id, arxiv_version = parse_arxiv_id(paper.get("arxiv_id") or paper.get("url"))
+                article_rows.append(
+                    (
+                        new_id,
+                        paper.get("name"),
+                        paper.get("url"),
+                        paper.get("authors"),
+                        keywords,
+                        paper.get("publication_date"),
+                        paper.get("content"),
+                        vector_literal(content_vector, self.vector_datatype),
+                        paper.get("summary"),
+                        paper.get("method_issues"),
+                        paper.get("coi"),
+                        arxiv_id,
+                        arxiv_version,
+                        content_hash(paper.get("content")),
+                    )
+                )
+                chunk_rows.extend(self._chunk_rows(new_id, chunk_vectors[offset]))
+                new_articles.append((new_id, paper.get("name")))
+                lexical_documents.append(self._lexical_document(new_id, paper, keywords))
+                references.extend(self._reference_titles(new_id, paper.get("out_references")))
+                inserted.append(self._article_json(new_id, paper))
+
+            # Resolve the new references, and stored references citing the new articles.
+            reference_rows, backfill_rows = self._resolve_references(new_articles, references)
+
+            cursor.executemany(
+                f"""
+                INSERT INTO {self.articles_table_name}
+                  (id, name, url, authors, keywords, publication_date, content, content_vector, summary, method_issues, coi,
+                   arxiv_id, arxiv_version, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, to_vector(?, {self.vector_datatype}), ?, ?, ?, ?, ?, ?)
+                """,
+                article_rows,
+            )
+            self._write_chunks(cursor, chunk_rows)
+            self._write_references(cursor, reference_rows, backfill_rows)
+            conn.commit()
+            self._references_written(new_articles, reference_rows, backfill_rows)
+        new_ids = [article_id for article_id, _ in new_articles]
+        self._index_vectors(self.articles_table_name, new_ids, content_vectors)
+        self._index_chunks(chunk_rows)
+        self._index_lexical(lexical_documents)
+        self._notify_inserted(new_ids)
+        resolved = sum(1 for row in reference_rows if row[2] is not None)
+        print(
+            f"Inserted {len(inserted)} articles and {len(reference_rows)} references "
+            f"({resolved} resolved, {len(backfill_rows)} earlier references linked)."
+        )
+        return inserted
+
+    def _stored_articles(self, papers):
+        """
+        For each paper, the stored article it matches as a dict (id, arxiv_id, arxiv_version,
+        content_hash, keywords and UPSERT_COLUMNS), or None. Papers are matched by arXiv id
+        ("arxiv_id" or the url), then by name. A name match with a different arXiv id is
+        returned too, but it is a conflict (see _title_conflict), not an article to update.
+        """
+        columns = ["id", "arxiv_id", "arxiv_version", "content_hash", "keywords"] + list(UPSERT_COLUMNS)
+
+        def fetch(cursor, column, values):
+            rows = []
+            values = list(dict.fromkeys(values))
+            for start in range(0, len(values), self.max_in_list):
+                batch = values[start : start + self.max_in_list]
+                placeholders = ",".join("?" for _ in batch)
+                cursor.execute(
+                    f"SELECT {', '.join(columns)} FROM {self.articles_table_name} WHERE {column} IN ({placeholders})",
+                    batch,
+                )
+                rows.extend(dict(zip(columns, row)) for row in cursor.fetchall())
+            return rows
+
+        arxiv_ids = [parse_arxiv_id(paper.get("arxiv_id") or paper.get("url"))[0] for paper in papers]
+        with self.borrow_cursor() as (conn, cursor):
+            by_arxiv_id = {}
+            for row in fetch(cursor, "arxiv_id", [arxiv_id for arxiv_id in arxiv_ids if arxiv_id]):
+                stored = by_arxiv_id.get(row["arxiv_id"])
+                if stored is None or (row["arxiv_version"] or 0) > (stored["arxiv_version"] or 0):
+                    by_arxiv_id[row["arxiv_id"]] = row
+            names = [
+                paper["name"]
+                for paper, arxiv_id in zip(papers, arxiv_ids)
+                if arxiv_id not in by_arxiv_id
+            ]
+            by_name = {row["name"]: row for row in fetch(cursor, "name", names)}
+
+        return [
+            by_arxiv_id.get(arxiv_id) or by_name.get(paper["name"])
+            for paper, arxiv_id in zip(papers, arxiv_ids)
+        ]
+
+    @staticmethod
+    def _title_conflict(paper, stored):
         """
-        self.cursor.execute(
-            f"SELECT * FROM {self.articles_table_name} WHERE id = ?", (article_id,)
+        Whether `stored` only shares the paper's name and is a different arXiv paper. Names
+        are unique, so such a paper can be neither inserted nor used to update `stored`.
+        """
+        arxiv_id = parse_arxiv_id(paper.get("arxiv_id") or paper.get("url"))[0]
+        return stored is not None and stored["arxiv_id"] not in (None, arxiv_id)
+
+    def _plan_upserts(self, papers):
+        """
+        Splits papers into (new papers, updates, unchanged papers, conflicts). Updates are
+        (stored article, paper, content changed) and conflicts are (paper, stored article)
+        for papers whose name belongs to a stored article with another arXiv id. Within the
+        batch only the latest arXiv version of a paper is kept.
+        """
+        latest = {}
+        for paper in papers:
+            if not paper.get("name"):
+                continue
+            arxiv_id, version = parse_arxiv_id(paper.get("arxiv_id") or paper.get("url"))
+            key = arxiv_id or paper["name"]
+            seen = latest.get(key)
+            if seen is None or (version or 0) >= (seen[1] or 0):
+                latest[key] = (paper, version)
+        papers = [paper for paper, _ in latest.values()]
+        versions = [version for _, version in latest.values()]
+
+        new_papers, updates, unchanged, conflicts = [], [], [], []
+        for paper, version, stored in zip(papers, versions, self._stored_articles(papers)):
+            if stored is None:
+                new_papers.append(paper)
+                continue
+            if self._title_conflict(paper, stored):
+                conflicts.append((paper, stored))
+                continue
+            stored_version = stored["arxiv_version"]
+            if version is not None and stored_version is not None and version < stored_version:
+                unchanged.append(paper)
+                continue
+            content_changed = content_hash(paper.get("content")) != stored["content_hash"]
+            metadata_changed = (version is not None and version != stored_version) or any(
+                paper.get(column) is not None and str(paper.get(column)) != str(stored[column])
+                for column in UPSERT_COLUMNS
+            )
+            if content_changed or metadata_changed:
+                updates.append((stored, paper, content_changed))
+            else:
+                unchanged.append(paper)
+        return new_papers, updates, unchanged, conflicts
+
+    def needs_analysis(self, papers):
+        """
+        For each paper, whether it is new or its content differs from the stored version, i.e.
+        whether it has to be analysed before upsert_articles. Papers with unchanged content
+        can be upserted without analysis; their stored analysis is kept. Papers that
+        upsert_articles would reject as title conflicts are not analysed either.
+        """
+        stored_articles = self._stored_articles(papers)
+        return [
+            stored is None
+            or (
+                not self._title_conflict(paper, stored)
+                and content_hash(paper.get("content")) != stored["content_hash"]
+            )
+            for paper, stored in zip(papers, stored_articles)
+        ]
+
+    def upsert_articles(self, papers):
+        """
+        Inserts new articles and refreshes stored ones, matched by arXiv id (see
+        _stored_articles). A paper older than the stored arXiv version is ignored. If its
+        content hash is unchanged only the metadata and the analysis (summary, method_issues,
+        coi; None keeps the stored value) are updated and nothing is re-embedded; otherwise
+        the content, its chunk embeddings, keywords and references are replaced too.
+        A paper whose name belongs to a stored article with a different arXiv id is not
+        written; each such conflict is reported.
+        Returns the written articles in the insert_article_json format with their "id".
+        """
+        # A conflict means a concurrent writer stored at least one of these papers first, and
+        # it is an update in the next plan, so len(papers) + 1 attempts always suffice.
+        for attempt in range(len(papers) + 1):
+            new_papers, updates, unchanged, conflicts = self._plan_upserts(papers)
+            try:
+                inserted = self.insert_articles_bulk(new_papers)
+                break
+            except IntegrityError as e:
+                if attempt == len(papers):
+                    raise
+                print(f"Articles were inserted concurrently, upserting again: {e}")
+        updated = self._update_articles(updates)
+        for paper, stored in conflicts:
+            print(
+                f"Not storing '{paper['name']}' "
+                f"(arXiv {parse_arxiv_id(paper.get('arxiv_id') or paper.get('url'))[0]}): "
+                f"article {stored['id']} has this title and arXiv id {stored['arxiv_id']}."
+            )
+        print(
+            f"Upserted {len(papers)} papers: {len(inserted)} inserted, {len(updated)} updated "
+            f"({sum(1 for _, _, changed in updates if changed)} with new content), "
+            f"{len(unchanged)} unchanged, {len(conflicts)} title conflicts."
         )
-        row = self.cursor.fetchone()
-        if not row:
-            return None
-
-        # Retrieve outgoing references.
-        self.cursor.execute(
-            f"SELECT referenced_article_id FROM {self.articles_references_table_name} WHERE article_id = ?",
-            (article_id,),
+        return inserted + updated
+
+    def _update_articles(self, updates):
+        """
+        Writes (stored article, paper, content changed) updates in one transaction and
+        refreshes the in-memory indexes. Only changed contents are embedded.
+        """
+        if not updates:
+            return []
+        merged = []
+        for stored, paper, content_changed in updates:
+            values = {column: stored[column] for column in UPSERT_COLUMNS}
+            values.update(
+                (column, paper.get(column)) for column in UPSERT_COLUMNS if paper.get(column) is not None
+            )
+            values["keywords"] = self._article_keywords(paper) if content_changed else stored["keywords"]
+            values["content"] = paper.get("content")
+            values["out_references"] = paper.get("out_references", [])
+            values["future_research"] = paper.get("future_research", "")
+            merged.append(values)
+
+        rewritten = [
+            (stored["id"], paper, values)
+            for (stored, paper, content_changed), values in zip(updates, merged)
+            if content_changed
+        ]
+        chunk_vectors = self.embeddings.embed_documents(
+            [paper.get("content") or "" for _, paper, _ in rewritten], self.max_chunks
         )
-        refs = [str(r[0]) for r in self.cursor.fetchall()]
+        rewritten_ids = [article_id for article_id, _, _ in rewritten]
+        renamed = [
+            (stored["id"], values["name"])
+            for (stored, _, _), values in zip(updates, merged)
+            if values["name"] != stored["name"]
+        ]
+
+        self.reference_indexes()
+        with self.reference_indexes_lock, self.borrow_cursor() as (conn, cursor):
+            cursor.executemany(
+                f"""
+                UPDATE {self.articles_table_name}
+                SET name = ?, url = ?, authors = ?, publication_date = ?, summary = ?, method_issues = ?,
+                    coi = ?, arxiv_id = COALESCE(?, arxiv_id), arxiv_version = COALESCE(?, arxiv_version)
+                WHERE id = ?
+                """,
+                [
+                    tuple(values[column] for column in UPSERT_COLUMNS)
+                    + parse_arxiv_id(paper.get("arxiv_id") or paper.get("url"))
+                    + (stored["id"],)
+                    for (stored, paper, _), values in zip(updates, merged)
+                ],
+            )
+
+            chunk_rows = []
+            references = []
+            old_references = []
+            if rewritten:
+                cursor.executemany(
+                    f"""
+                    UPDATE {self.articles_table_name}
+                    SET content = ?, content_vector = to_vector(?, {self.vector_datatype}), keywords = ?, content_hash = ?
+                    WHERE id = ?
+                    """,
+                    [
+                        (
+                            paper.get("content"),
+                            vector_literal(vectors[0], self.vector_datatype),
+                            values["keywords"],
+                            content_hash(paper.get("content")),
+                            article_id,
+                        )
+                        for (article_id, paper, values), vectors in zip(rewritten, chunk_vectors)
+                    ],
+                )
+                for (article_id, paper, _), vectors in zip(rewritten, chunk_vectors):
+                    chunk_rows.extend(self._chunk_rows(article_id, vectors))
+                    references.extend(self._reference_titles(article_id, paper.get("out_references")))
+                for start in range(0, len(rewritten_ids), self.max_in_list):
+                    batch = rewritten_ids[start : start + self.max_in_list]
+                    placeholders = ",".join("?" for _ in batch)
+                    cursor.execute(
+                        f"SELECT article_id, name FROM {self.articles_references_table_name} WHERE article_id IN ({placeholders})",
+                        batch,
+                    )
+                    old_references.extend((row[0], str(row[1])) for row in cursor.fetchall())
+                    cursor.execute(
+                        f"DELETE FROM {self.article_chunks_table_name} WHERE article_id IN ({placeholders})",
+                        batch,
+                    )
+                    cursor.execute(
+                        f"DELETE FROM {self.articles_references_table_name} WHERE article_id IN ({placeholders})",
+                        batch,
+                    )
+                self._write_chunks(cursor, chunk_rows)
+
+            # Renamed articles can resolve stored references to their new title.
+            reference_rows, backfill_rows = self._resolve_references(renamed, references)
+            self._write_references(cursor, reference_rows, backfill_rows)
+            conn.commit()
+
+            self.reference_indexes()[1].remove(old_references)
+            with self.citation_graph_lock:
+                self.citation_graph.remove_out_edges(rewritten_ids)
+            self._references_written(renamed, reference_rows, backfill_rows)
+
+        if rewritten:
+            self._index_vectors(
+                self.articles_table_name, rewritten_ids, [vectors[0] for vectors in chunk_vectors]
+            )
+            with self.vector_indexes_lock:
+                chunks_index = self.vector_indexes.get(self.article_chunks_table_name)
+            if chunks_index is not None:
+                chunks_index.remove(
+                    [article_id * CHUNK_ID_STRIDE + chunk_no for article_id in rewritten_ids for chunk_no in range(CHUNK_ID_STRIDE)]
+                )
+            self._index_chunks(chunk_rows)
+        self._index_lexical(
+            self._lexical_document(stored["id"], values, values["keywords"])
+            for (stored, _, _), values in zip(updates, merged)
+        )
+        updated_ids = [stored["id"] for stored, _, _ in updates]
+        self._notify_inserted(updated_ids)
+        return [self._article_json(article_id, values) for article_id, values in zip(updated_ids, merged)]
+
+    def lookup_article_json(self, article_id):
+        """
+        Looks up an article by its id and returns its details in JSON format.
+        """
+        with self.borrow_cursor() as (conn, cursor):
+            cursor.execute(
+                f"SELECT * FROM {self.articles_table_name} WHERE id = ?", (article_id,)
+            )
+            row = cursor.fetchone()
+            if not row:
+                return None
+
+            # Retrieve outgoing references.
+            refs = self.fetch_references([article_id], cursor)[article_id]
 
         return {
             "name": row[1],
@@ -398,44 +1625,389 @@ class InCiteIRISDatabase:
             "future_research": "",
         }
 
-    def query_articles_json(self, query_text, top_k=3):
+    def fetch_references(self, article_ids, cursor=None):
+        """
+        Fetches the outgoing references of many articles with one IN query per
+        `max_in_list` ids. Returns a dict mapping article id to a list of reference names.
+        Pass `cursor` to reuse a connection the caller has already borrowed.
+        """
+        if cursor is None:
+            with self.borrow_cursor() as (conn, cursor):
+                return self.fetch_references(article_ids, cursor)
+
+        references = {article_id: [] for article_id in article_ids}
+        ids = list(references)
+        for start in range(0, len(ids), self.max_in_list):
+            batch = ids[start : start + self.max_in_list]
+            placeholders = ",".join("?" for _ in batch)
+            # Resolved references are reported under the cited article's own title.
+            cursor.execute(
+                f"""
+                SELECT r.article_id, COALESCE(a.name, r.name)
+                FROM {self.articles_references_table_name} r
+                LEFT JOIN {self.articles_table_name} a ON a.id = r.referenced_article_id
+                WHERE r.article_id IN ({placeholders})
+                """,
+                batch,
+            )
+            for article_id, name in cursor.fetchall():
+                references[article_id].append(str(name))
+        return references
+
+    def fetch_articles(self, article_ids, columns, cursor=None):
+        """
+        Fetches only `columns` (names from ARTICLE_COLUMNS) of many articles, with one IN
+        query per `max_in_list` ids. Returns a dict mapping article id to a dict of values.
+        """
+        columns = [column for column in columns if column in ARTICLE_COLUMNS]
+        if cursor is None:
+            with self.borrow_cursor() as (conn, cursor):
+                return self.fetch_articles(article_ids, columns, cursor)
+
+        articles = {}
+        ids = list(dict.fromkeys(article_ids))
+        select = ", ".join(["id"] + columns)
+        for start in range(0, len(ids), self.max_in_list):
+            batch = ids[start : start + self.max_in_list]
+            placeholders = ",".join("?" for _ in batch)
+            cursor.execute(
+                f"SELECT {select} FROM {self.articles_table_name} WHERE id IN ({placeholders})",
+                batch,
+            )
+            for row in cursor.fetchall():
+                articles[row[0]] = dict(zip(columns, row[1:]))
+        return articles
+
+    def _graph_nodes(self, article_ids, fields, in_refs, computed):
         """
-        Queries the Articles table by performing a similarity search and returns a list of articles in JSON format.
+        Builds node dicts ({"id", ...fields}) for query_graph and get_article. `in_refs` maps
+        each article id to the ids of the articles citing it, and `computed` maps other field
+        names ("score", "hops") to {article id: value}.
+        """
+        fields = [field for field in fields if field in GRAPH_FIELDS]
+        columns = [field for field in fields if field in ARTICLE_COLUMNS]
+        if "in_refs" in fields and "name" not in columns:
+            columns.append("name")
+        with self.borrow_cursor() as (conn, cursor):
+            articles = self.fetch_articles(article_ids, columns, cursor)
+            names = articles
+            if "in_refs" in fields:
+                # Titles of citing articles that are not among article_ids.
+                missing = {i for refs in in_refs.values() for i in refs if i not in articles}
+                names = dict(articles)
+                names.update(self.fetch_articles(missing, ["name"], cursor))
+            references = (
+                self.fetch_references(article_ids, cursor)
+                if "out_references" in fields or "num_out" in fields
+                else {}
+            )
+
+        nodes = []
+        for article_id in article_ids:
+            article = articles.get(article_id)
+            if article is None:
+                continue
+            node = {"id": article_id}
+            for field in fields:
+                if field in ARTICLE_COLUMNS:
+                    node[field] = article[field]
+                elif field == "out_references":
+                    node[field] = references[article_id]
+                elif field == "num_out":
+                    node[field] = len(references[article_id])
+                elif field == "in_refs":
+                    node[field] = [names[i]["name"] for i in in_refs[article_id] if i in names]
+                elif field == "num_in":
+                    node[field] = len(in_refs[article_id])
+                elif field == "future_research":
+                    node[field] = ""
+                else:
+                    node[field] = computed.get(field, {}).get(article_id)
+            nodes.append(node)
+        return nodes
+
+    def get_article(self, article_id, fields=PAPER_FIELDS):
+        """
+        Returns the requested `fields` (from GRAPH_FIELDS) of one article plus its "id", or
+        None if there is no such article. in_refs/num_in count citations from the whole corpus.
+        """
+        graph = self.load_citation_graph()
+        citing = []
+        if article_id in graph.node_ids:
+            citing = [graph.key(node) for node in graph.predecessors(graph.node(article_id))]
+        nodes = self._graph_nodes([article_id], fields, {article_id: citing}, {})
+        return nodes[0] if nodes else None
+
+    def search_article_ids(self, query_text, top_k=100, mode=None):
+        """
+        Article search that returns only [(article id, score)], best first. `mode` (default:
+        retrieval_mode) is "vector" (dot-product similarity), "lexical" (BM25 score) or
+        "hybrid" (reciprocal rank fusion score of the vector and BM25 rankings).
+        """
+        mode = mode or self.retrieval_mode
+        if mode == "vector":
+            return self.vector_search_ids(query_text, top_k)
+        if mode == "lexical":
+            return self.lexical_index().search(query_text, top_k)
+        if mode != "hybrid":
+            raise ValueError(f"mode must be one of {RETRIEVAL_MODES}")
+        candidates = max(top_k, self.hybrid_candidates)
+        lexical = self.lexical_index().search(query_text, candidates)
+        vector = self.vector_search_ids(query_text, candidates)
+        return reciprocal_rank_fusion([vector, lexical], top_k=top_k)
+
+    def vector_search_ids(self, query_text, top_k=100):
+        """
+        Similarity search that returns only [(article id, similarity score)], best first.
+        With chunk_search an article's score is the max (or mean, see chunk_aggregation) of
+        its chunks' similarities; otherwise only content_vector is compared.
         """
         query_embedding = self.embed_text(query_text)
-        vector_literal = ",".join(str(x) for x in query_embedding)
+        if self.chunk_search:
+            return self._chunk_search_ids(query_embedding, top_k)
+        if self.search_mode == "ann":
+            return self.vector_index(self.articles_table_name).search(query_embedding, top_k)
+        return self._article_search_ids(query_embedding, top_k)
+
+    def _article_search_ids(self, query_embedding, top_k):
+        """
+        Exact search over content_vector.
+        """
         sql = f"""
-        SELECT TOP {top_k} 
-               id, name, url, authors, keywords, publication_date, content,
-               VECTOR_DOT_PRODUCT(content_vector, to_vector('{vector_literal}', double)) AS similarity_score,
-               summary, method_issues, coi
+        SELECT TOP {int(top_k)}
+               id, VECTOR_DOT_PRODUCT(content_vector, to_vector(?, {self.vector_datatype})) AS similarity_score
         FROM {self.articles_table_name}
         ORDER BY similarity_score DESC
         """
-        self.cursor.execute(sql)
-        rows = self.cursor.fetchall()
+        with self.borrow_cursor() as (conn, cursor):
+            cursor.execute(sql, (vector_literal(query_embedding, self.vector_datatype),))
+            return [(row[0], float(row[1])) for row in cursor.fetchall()]
 
-        articles = []
-        for row in rows:
-            article_id = row[0]
-            self.cursor.execute(
-                f"SELECT name FROM {self.articles_references_table_name} WHERE article_id = ?",
-                (article_id,),
+    def _chunk_search_ids(self, query_embedding, top_k):
+        """
+        Chunk-level search aggregated per article. The ANN variant aggregates the best
+        top_k * chunk_oversample chunk hits, so "mean" averages an article's retrieved
+        chunks rather than all of them.
+        """
+        if self.search_mode == "ann":
+            hits = self.vector_index(self.article_chunks_table_name).search(
+                query_embedding, top_k * self.chunk_oversample
             )
-            refs = [str(r[0]) for r in self.cursor.fetchall()]
+            return self._aggregate_chunk_hits(hits, top_k)
+        function = "MAX" if self.chunk_aggregation == "max" else "AVG"
+        sql = f"""
+        SELECT TOP {int(top_k)}
+               article_id,
+               {function}(VECTOR_DOT_PRODUCT(chunk_vector, to_vector(?, {self.vector_datatype}))) AS similarity_score
+        FROM {self.article_chunks_table_name}
+        GROUP BY article_id
+        ORDER BY similarity_score DESC
+        """
+        with self.borrow_cursor() as (conn, cursor):
+            cursor.execute(sql, (vector_literal(query_embedding, self.vector_datatype),))
+            return [(row[0], float(row[1])) for row in cursor.fetchall()]
 
+    def _aggregate_chunk_hits(self, hits, top_k):
+        """
+        Turns ANN chunk hits [(chunk id, score)] into the best top_k [(article id, score)].
+        """
+        scores = {}
+        for chunk_id, score in hits:
+            scores.setdefault(chunk_id // CHUNK_ID_STRIDE, []).append(score)
+        aggregate = max if self.chunk_aggregation == "max" else (lambda s: sum(s) / len(s))
+        ranked = sorted(
+            ((article_id, aggregate(s)) for article_id, s in scores.items()),
+            key=lambda hit: hit[1],
+            reverse=True,
+        )
+        return ranked[:top_k]
+
+    def search_many(self, query_texts, top_k=10, min_score=None, batch_size=32):
+        """
+        Vector search for many queries at once: all queries are embedded in one batch and,
+        with min_score, each group of `batch_size` queries is answered by a single scan (one
+        SQL query computing every query's similarity, or one matrix product in ANN mode).
+        Articles are scored like vector_search_ids. Returns one [(article id, score)] list
+        per query, best first, keeping only scores >= min_score when it is given.
+        """
+        query_texts = list(query_texts)
+        if not query_texts:
+            return []
+        embeddings = self.embeddings.embed_many(query_texts)
+        results = []
+        for start in range(0, len(embeddings), batch_size):
+            batch = embeddings[start : start + batch_size]
+            if self.search_mode == "ann":
+                if self.chunk_search:
+                    index = self.vector_index(self.article_chunks_table_name)
+                    hits = [
+                        self._aggregate_chunk_hits(chunk_hits, top_k)
+                        for chunk_hits in index.search_many(batch, top_k * self.chunk_oversample)
+                    ]
+                else:
+                    hits = self.vector_index(self.articles_table_name).search_many(batch, top_k)
+            else:
+                hits = self._scan_many(batch, top_k, min_score)
+            results.extend(
+                [hit for hit in query_hits if min_score is None or hit[1] >= min_score]
+                for query_hits in hits
+            )
+        return results
+
+    def _scan_many(self, query_embeddings, top_k, min_score):
+        """
+        Exact search for several query vectors. With min_score, one table scan scores every
+        query and rows below it for every query are dropped in the database; each query
+        keeps its best top_k of the streamed rows. Without min_score nothing would bound the
+        rows returned by a shared scan, so each query runs its own TOP top_k search.
+        """
+        if min_score is None:
+            search = self._chunk_search_ids if self.chunk_search else self._article_search_ids
+            return [search(query_embedding, top_k) for query_embedding in query_embeddings]
+        if self.chunk_search:
+            function = "MAX" if self.chunk_aggregation == "max" else "AVG"
+            table_name, id_column, vector_column = (
+                self.article_chunks_table_name, "article_id", "chunk_vector"
+            )
+        else:
+            function = ""
+            table_name, id_column, vector_column = self.articles_table_name, "id", "content_vector"
+        scores = ", ".join(
+            f"{function}(VECTOR_DOT_PRODUCT({vector_column}, to_vector(?, {self.vector_datatype}))) AS score{i}"
+            for i in range(len(query_embeddings))
+        )
+        sql = f"SELECT {id_column} AS article_id, {scores} FROM {table_name}"
+        if self.chunk_search:
+            sql += " GROUP BY article_id"
+        params = [vector_literal(embedding, self.vector_datatype) for embedding in query_embeddings]
+        conditions = " OR ".join(f"score{i} >= ?" for i in range(len(query_embeddings)))
+        sql = f"SELECT * FROM ({sql}) WHERE {conditions}"
+        params += [min_score] * len(query_embeddings)
+
+        # Per query, a min-heap of its best (score, article id) so far.
+        best = [[] for _ in query_embeddings]
+        with self.borrow_cursor() as (conn, cursor):
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                for row in rows:
+                    for heap, score in zip(best, row[1:]):
+                        if score is None or score < min_score:
+                            continue
+                        if len(heap) < top_k:
+                            heapq.heappush(heap, (float(score), row[0]))
+                        elif score > heap[0][0]:
+                            heapq.heapreplace(heap, (float(score), row[0]))
+        return [
+            [(article_id, score) for score, article_id in sorted(heap, reverse=True)]
+            for heap in best
+        ]
+
+    def query_graph(
+        self,
+        query_text,
+        max_nodes=100,
+        hops=0,
+        top_k=None,
+        fields=DEFAULT_GRAPH_FIELDS,
+        offset=0,
+        limit=None,
+        direction="both",
+    ):
+        """
+        Builds the citation graph around a query and returns one page of it.
+
+        The `top_k` best search results (see search_article_ids; default: max_nodes without
+        expansion, a quarter of it otherwise) are expanded `hops` citation steps in `direction` until `max_nodes`
+        articles are selected. Nodes are ordered by hop distance, then by search rank (search
+        results) or citation count (expanded nodes), and nodes[offset:offset + limit] are
+        returned with only the requested `fields` (from GRAPH_FIELDS) plus "id".
+        in_refs/num_in count citations from the whole corpus, as in get_article, so a node
+        reports the same counts on every page, in streamed responses and from /get_paper.
+
+        Returns {"nodes", "edges": [[citing id, cited id]] for edges whose citing node is on
+        the page, "total": number of selected nodes, "next_offset": None on the last page}.
+        """
+        if top_k is None:
+            top_k = max_nodes if hops == 0 else max(1, max_nodes // 4)
+        seeds = self.search_article_ids(query_text, min(top_k, max_nodes))
+        if not seeds:
+            return {"nodes": [], "edges": [], "total": 0, "next_offset": None}
+
+        graph = self.load_citation_graph()
+        scores = {article_id: score for article_id, score in seeds}
+        seed_nodes = [graph.node(article_id) for article_id in scores if article_id in graph.node_ids]
+        if hops > 0:
+            nodes, distances = graph.k_hop(seed_nodes, hops, direction, max_nodes)
+        else:
+            nodes = np.asarray(seed_nodes, dtype=np.int64)
+            distances = np.zeros(len(nodes), dtype=np.int64)
+        seed_rank = np.full(len(graph), len(seed_nodes))
+        seed_rank[seed_nodes] = np.arange(len(seed_nodes))
+        order = np.lexsort((-graph.in_degree()[nodes], seed_rank[nodes], distances))
+        nodes, distances = nodes[order], distances[order]
+        ids = [graph.key(node) for node in nodes]
+
+        end = len(ids) if limit is None else offset + limit
+        page_ids = ids[offset:end]
+        page = set(page_ids)
+        citing, cited = graph.subgraph_edges(nodes)
+        edges = [(graph.key(src), graph.key(dst)) for src, dst in zip(citing, cited)]
+        in_refs = {
+            graph.key(node): [graph.key(source) for source in graph.predecessors(node)]
+            for node in nodes[offset:end]
+        }
+
+        distance_by_id = dict(zip(ids, distances.tolist()))
+        page_nodes = self._graph_nodes(
+            page_ids, fields, in_refs, {"score": scores, "hops": distance_by_id}
+        )
+
+        return {
+            "nodes": page_nodes,
+            "edges": [[src, dst] for src, dst in edges if src in page],
+            "total": len(ids),
+            "next_offset": end if end < len(ids) else None,
+        }
+
+    def query_articles_json(self, query_text, top_k=3, include_content=True, mode=None):
+        """
+        Searches the Articles table (see search_article_ids for the retrieval `mode`) and
+        returns a list of articles in JSON format, best first.
+        Articles and their references are fetched in one query each. With include_content=False
+        the (large) content column is neither selected nor returned.
+        """
+        hits = self.search_article_ids(query_text, top_k, mode)
+        article_ids = [article_id for article_id, _ in hits]
+        columns = ["name", "url", "authors", "publication_date", "summary", "method_issues", "coi"]
+        if include_content:
+            columns.append("content")
+        with self.borrow_cursor() as (conn, cursor):
+            rows = self.fetch_articles(article_ids, columns, cursor)
+            references = self.fetch_references(article_ids, cursor)
+
+        articles = []
+        for article_id in article_ids:
+            row = rows.get(article_id)
+            if row is None:
+                continue
+            refs = references[article_id]
             article_obj = {
-                "name": row[1],
-                "url": row[2],
-                "authors": row[3],
-                "content": row[6],
-                "publication_date": row[5],
+                "name": row["name"],
+                "url": row["url"],
+                "authors": row["authors"],
+                "content": row.get("content"),
+                "publication_date": row["publication_date"],
                 "out_references": refs,
                 "num_out": len(refs),
-                "summary": row[8],
-                "method_issues": row[9],
-                "coi": row[10],
+                "summary": row["summary"],
+                "method_issues": row["method_issues"],
+                "coi": row["coi"],
                 "future_research": "",
             }
+            if not include_content:
+                del article_obj["content"]
             articles.append(article_obj)
         return articles
@@ -0,0 +1,259 @@
+import threading
+
+import numpy as np
+
+from vector_db.vectors import to_array
+
+
+class IVFIndex:
+    """
+    In-memory inverted-file (IVF) index for dot-product search.
+
+    Vectors are clustered with spherical k-means into `nlist` lists; a query only scores the
+    vectors in its `nprobe` closest lists. Raising `nprobe` trades latency for recall, and
+    nprobe >= nlist (or exact=True) is an exact scan. Until `min_train_size` vectors have
+    been added the index is untrained and every search is exact.
+
+    Adds and removes trigger (re)training in a background thread once the index has grown
+    4x since it was last trained, or once removed vectors outnumber live ones. Training
+    compacts the removed vectors away, runs k-means without holding the search lock and
+    then swaps in the new centroids and lists at once, so searches never wait for k-means.
+    """
+
+    def __init__(self, dim=1536, nprobe=16, min_train_size=1024, kmeans_iterations=10, seed=0):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+
+        self.lock = threading.RLock()
+        # Serialises train(); only the compaction and the final swap also take self.lock.
+        self.train_lock = threading.Lock()
+        self.training_thread = None
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+        self._positions = {}
+
+        self.centroids = None
+        self._lists = []
+        self._trained_size = 0
+
+    def __len__(self):
+        return len(self._positions)
+
+    def _ensure_capacity(self, extra):
+        needed = self._size + extra
+        capacity = len(self._ids)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, 2 * capacity, 1024)
+        vectors = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        vectors[: self._size] = self._vectors[: self._size]
+        ids = np.zeros(new_capacity, dtype=np.int64)
+        ids[: self._size] = self._ids[: self._size]
+        alive = np.zeros(new_capacity, dtype=bool)
+        alive[: self._size] = self._alive[: self._size]
+        self._vectors, self._ids, self._alive = vectors, ids, alive
+
+    def add(self, ids, vectors):
+        """
+        Adds (or replaces) vectors for the given ids.
+        """
+        if not isinstance(vectors, np.ndarray):
+            vectors = [to_array(vector) for vector in vectors]
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        with self.lock:
+            self.remove(ids)
+            self._ensure_capacity(len(ids))
+            start = self._size
+            end = start + len(ids)
+            self._vectors[start:end] = vectors
+            self._ids[start:end] = ids
+            self._alive[start:end] = True
+            self._size = end
+            for offset, vector_id in enumerate(ids):
+                self._positions[int(vector_id)] = start + offset
+            if self.centroids is not None:
+                self._add_to_lists(np.arange(start, end), self._assign(vectors, self.centroids))
+            self._maybe_train()
+
+    def _add_to_lists(self, positions, assignments):
+        for list_no in np.unique(assignments):
+            self._lists[list_no] = np.concatenate(
+                [self._lists[list_no], positions[assignments == list_no]]
+            )
+
+    def remove(self, ids):
+        """
+        Removes the given ids from the index. Unknown ids are ignored.
+        """
+        with self.lock:
+            for vector_id in ids:
+                position = self._positions.pop(int(vector_id), None)
+                if position is not None:
+                    self._alive[position] = False
+            self._maybe_train()
+
+    def _compact(self):
+        """
+        Drops removed vectors from the arrays and inverted lists. Call with self.lock held.
+        """
+        alive = self._alive[: self._size]
+        if alive.all():
+            return
+        new_positions = np.cumsum(alive) - 1
+        keep = np.flatnonzero(alive)
+        self._vectors = self._vectors[keep]
+        self._ids = self._ids[keep]
+        self._alive = np.ones(len(keep), dtype=bool)
+        self._size = len(keep)
+        self._positions = {int(vector_id): position for position, vector_id in enumerate(self._ids)}
+        self._lists = [new_positions[positions[alive[positions]]] for positions in self._lists]
+
+    def _assign(self, vectors, centroids, block_size=8192):
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), block_size):
+            block = vectors[start : start + block_size]
+            assignments[start : start + block_size] = np.argmax(block @ centroids.T, axis=1)
+        return assignments
+
+    def train(self):
+        """
+        Compacts removed vectors away, (re)clusters the live vectors into sqrt(n) lists and
+        swaps in the rebuilt inverted lists. Vectors added meanwhile are assigned at the swap.
+        """
+        with self.train_lock:
+            with self.lock:
+                self._compact()
+                # Rows below _size are never rewritten (adds append, removes only clear
+                # _alive), so they can be read without the lock while it is released.
+                vectors, trained_size = self._vectors, self._size
+                positions = np.flatnonzero(self._alive[:trained_size])
+                n = len(positions)
+                if n < self.min_train_size:
+                    self.centroids = None
+                    self._lists = []
+                    self._trained_size = 0
+                    return
+            nlist = max(1, int(np.sqrt(n)))
+            rng = np.random.default_rng(self.seed)
+            sample = vectors[rng.choice(positions, min(n, 64 * nlist), replace=False)]
+
+            centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+            for _ in range(self.kmeans_iterations):
+                assignments = self._assign(sample, centroids)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignments, sample)
+                counts = np.bincount(assignments, minlength=nlist)
+                # Empty clusters keep their previous centroid.
+                nonempty = counts > 0
+                centroids[nonempty] = sums[nonempty]
+                norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+                centroids /= np.where(norms == 0, 1, norms)
+
+            assignments = self._assign(vectors[positions], centroids)
+            order = np.argsort(assignments, kind="stable")
+            bounds = np.searchsorted(assignments[order], np.arange(nlist + 1))
+            lists = [positions[order[bounds[i] : bounds[i + 1]]] for i in range(nlist)]
+
+            with self.lock:
+                self.centroids = centroids
+                self._lists = lists
+                self._trained_size = n
+                added = np.arange(trained_size, self._size)
+                if len(added):
+                    self._add_to_lists(added, self._assign(self._vectors[added], centroids))
+
+    def _train_in_background(self):
+        try:
+            self.train()
+        except Exception as e:
+            print(f"Could not train the IVF index: {e}")
+            with self.lock:
+                self.training_thread = None
+            return
+        with self.lock:
+            self.training_thread = None
+            # Catch up with adds and removes made while training.
+            self._maybe_train()
+
+    def _maybe_train(self):
+        """
+        Starts train() in a background thread if the index needs it and no training is
+        running. Call with self.lock held.
+        """
+        if self.training_thread is not None:
+            return
+        n = len(self._positions)
+        grown = n >= self.min_train_size and (self.centroids is None or n > 4 * self._trained_size)
+        shrunk = self.centroids is not None and n < self.min_train_size
+        removed = self._size - n
+        if grown or shrunk or removed > max(n, self.min_train_size):
+            self.training_thread = threading.Thread(
+                target=self._train_in_background, name="ivf-training", daemon=True
+            )
+            self.training_thread.start()
+
+    def wait_for_training(self):
+        """
+        Waits until no background training is running (including catch-up runs).
+        """
+        while True:
+            thread = self.training_thread
+            if thread is None:
+                return
+            thread.join()
+
+    def search(self, query, top_k=10, nprobe=None, exact=False):
+        """
+        Returns up to top_k (id, score) pairs ordered by descending dot product.
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        with self.lock:
+            nprobe = self.nprobe if nprobe is None else nprobe
+            candidates = None
+            if not exact and self.centroids is not None and nprobe < len(self.centroids):
+                probes = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+                candidates = np.concatenate([self._lists[list_no] for list_no in probes])
+                candidates = candidates[self._alive[candidates]]
+                # Too few candidates to fill top_k: fall back to an exact scan.
+                if len(candidates) < top_k:
+                    candidates = None
+            if candidates is None:
+                candidates = np.flatnonzero(self._alive[: self._size])
+            if len(candidates) == 0:
+                return []
+            scores = self._vectors[candidates] @ query
+            ids = self._ids[candidates]
+
+        k = min(top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(ids[i]), float(scores[i])) for i in best]
+
+    def search_many(self, queries, top_k=10, nprobe=None, exact=False):
+        """
+        search() for several queries at once, returning one hit list per query. Exact scans
+        (also used while the index is untrained) score all queries with one matrix product.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        with self.lock:
+            nprobe = self.nprobe if nprobe is None else nprobe
+            if not exact and self.centroids is not None and nprobe < len(self.centroids):
+                return [self.search(query, top_k, nprobe) for query in queries]
+            candidates = np.flatnonzero(self._alive[: self._size])
+            if len(candidates) == 0:
+                return [[] for _ in queries]
+            scores = self._vectors[candidates] @ queries.T
+            ids = self._ids[candidates]
+
+        k = min(top_k, len(ids))
+        results = []
+        for column in scores.T:
+            best = np.argpartition(-column, k - 1)[:k]
+            best = best[np.argsort(-column[best])]
+            results.append([(int(ids[i]), float(column[i])) for i in best])
+        return results
@@ -0,0 +1,126 @@
+import time
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections.
+    At most `size` connections are handed out at once; idle connections that have not been
+    used for `health_check_interval` seconds are pinged before reuse, and broken connections
+    are discarded and transparently replaced.
+    """
+
+    def __init__(
+        self,
+        connect,
+        size=8,
+        timeout=30.0,
+        health_check_sql="SELECT 1",
+        health_check_interval=30.0,
+        connect_retries=3,
+        retry_backoff=0.5,
+    ):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.health_check_sql = health_check_sql
+        self.health_check_interval = health_check_interval
+        self.connect_retries = connect_retries
+        self.retry_backoff = retry_backoff
+
+        self._slots = threading.BoundedSemaphore(size)
+        # LIFO keeps the most recently used (and most likely healthy) connections warm.
+        self._idle = queue.LifoQueue()
+        self._closed = False
+
+    def _open(self):
+        for attempt in range(self.connect_retries):
+            try:
+                return self.connect()
+            except Exception as e:
+                if attempt == self.connect_retries - 1:
+                    raise
+                print(f"Database connection failed ({e}), retrying...")
+                time.sleep(self.retry_backoff * (2**attempt))
+
+    def _is_healthy(self, conn):
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.health_check_sql)
+            cursor.fetchall()
+            return True
+        except Exception:
+            return False
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        if self._closed:
+            raise PoolTimeoutError("Connection pool is closed.")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeoutError(f"No database connection available after {self.timeout}s.")
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._open()
+                if time.monotonic() - last_used < self.health_check_interval or self._is_healthy(conn):
+                    return conn
+                self._discard(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, discard=False):
+        if discard or self._closed:
+            self._discard(conn)
+        else:
+            self._idle.put((conn, time.monotonic()))
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrows a connection for the duration of the block. On error the transaction is
+        rolled back, and the connection is dropped if it no longer passes the health check.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+                healthy = self._is_healthy(conn)
+            except Exception:
+                healthy = False
+            self.release(conn, discard=not healthy)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
@@ -0,0 +1,304 @@
+import os
+import re
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+from array import array
+from itertools import islice
+from collections import OrderedDict
+
+EMBEDDING_DIM = 1536
+DEFAULT_EMBEDDING_MODEL = "text-embedding-ada-002"
+DEFAULT_CHUNK_SIZE = 4096
+DEFAULT_CHUNK_OVERLAP = 200
+DEFAULT_CACHE_DIR = os.environ.get(
+    "INCITE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "incite")
+)
+
+
+def iter_chunks(text, chunk_size=DEFAULT_CHUNK_SIZE, chunk_overlap=DEFAULT_CHUNK_OVERLAP, separator="\n\n"):
+    """
+    Lazily yields the chunks LangChain's CharacterTextSplitter would produce for `text`.
+    Being a generator, callers that only need the first chunk never split the rest.
+    """
+    splits = [s for s in re.split(re.escape(separator), text) if s != ""]
+    separator_len = len(separator)
+    current_doc = []
+    total = 0
+    for split in splits:
+        split_len = len(split)
+        if total + split_len + (separator_len if current_doc else 0) > chunk_size:
+            if current_doc:
+                doc = separator.join(current_doc).strip()
+                if doc:
+                    yield doc
+                # Keep a tail of the previous chunk as overlap for the next one.
+                while total > chunk_overlap or (
+                    total + split_len + (separator_len if current_doc else 0) > chunk_size
+                    and total > 0
+                ):
+                    total -= len(current_doc[0]) + (separator_len if len(current_doc) > 1 else 0)
+                    current_doc = current_doc[1:]
+        current_doc.append(split)
+        total += split_len + (separator_len if len(current_doc) > 1 else 0)
+    doc = separator.join(current_doc).strip()
+    if doc:
+        yield doc
+
+
+def first_chunk(text, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Returns the first chunk of `text`, the one embed_text embeds.
+    Empty documents fall back to a single space so the embedding call still succeeds.
+    """
+    return next(iter_chunks(text or "", chunk_size), None) or " "
+
+
+def embedding_key(model, text):
+    """
+    Cache key for an embedding: the model name plus a SHA-256 of the text.
+    """
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class OpenAIEmbeddingBackend:
+    """
+    Wraps a single long-lived OpenAIEmbeddings client.
+    """
+
+    def __init__(self, model=DEFAULT_EMBEDDING_MODEL):
+        from langchain_community.embeddings import OpenAIEmbeddings
+
+        self.model = model
+        self.client = OpenAIEmbeddings(model=model)
+
+    def embed(self, texts):
+        return self.client.embed_documents(texts)
+
+
+class FakeEmbeddingBackend:
+    """
+    Offline backend returning deterministic unit vectors seeded by the text hash.
+    `latency` (seconds per request) can be set to mimic a remote API when benchmarking.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM, latency=0.0, model="fake"):
+        self.dim = dim
+        self.latency = latency
+        self.model = model
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        vectors = []
+        for text in texts:
+            rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+            vector = [rng.gauss(0.0, 1.0) for _ in range(self.dim)]
+            norm = sum(x * x for x in vector) ** 0.5 or 1.0
+            vectors.append([x / norm for x in vector])
+        return vectors
+
+
+class EmbeddingCache:
+    """
+    Two-level embedding cache keyed by embedding_key: an in-memory LRU in front of
+    a SQLite file on disk, so embeddings survive restarts and are shared between processes.
+    Pass path=None to keep the cache in memory only.
+
+    Like LLMCache, the file is bounded to `max_entries`, evicting least recently used rows.
+    """
+
+    def __init__(self, path=None, max_memory_items=10000, max_entries=100000):
+        self.path = path
+        self.max_memory_items = max_memory_items
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.size = 0
+        self.db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB, accessed_at REAL)"
+            )
+            columns = [row[1] for row in self.db.execute("PRAGMA table_info(embeddings)")]
+            if "accessed_at" not in columns:
+                # Files written before eviction: their rows are evicted first.
+                self.db.execute("ALTER TABLE embeddings ADD COLUMN accessed_at REAL DEFAULT 0")
+            self.db.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_accessed_at ON embeddings (accessed_at)"
+            )
+            self.db.commit()
+            self.size = self.db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _remember(self, key, vector):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_items:
+            self.memory.popitem(last=False)
+
+    def get_many(self, keys):
+        """
+        Returns a dict of the keys that are cached, checking memory before disk.
+        """
+        found = {}
+        with self.lock:
+            missing = []
+            for key in keys:
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    found[key] = self.memory[key]
+                else:
+                    missing.append(key)
+            if self.db is not None and missing:
+                # Stay under SQLite's bound-parameter limit.
+                for start in range(0, len(missing), 500):
+                    batch = missing[start : start + 500]
+                    placeholders = ",".join("?" for _ in batch)
+                    rows = self.db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                        batch,
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = array("d", blob).tolist()
+                        self._remember(key, vector)
+                        found[key] = vector
+                    if rows:
+                        now = time.time()
+                        self.db.executemany(
+                            "UPDATE embeddings SET accessed_at = ? WHERE key = ?",
+                            [(now, key) for key, _ in rows],
+                        )
+                self.db.commit()
+        return found
+
+    def put_many(self, items):
+        """
+        Stores (key, vector) pairs in memory and on disk.
+        """
+        with self.lock:
+            for key, vector in items:
+                self._remember(key, vector)
+            if self.db is not None:
+                now = time.time()
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, accessed_at) VALUES (?, ?, ?)",
+                    [(key, array("d", vector).tobytes(), now) for key, vector in items],
+                )
+                # An upper bound: replaced keys and other processes' rows are recounted below.
+                self.size += len(items)
+                if self.size > self.max_entries:
+                    self.size = self.db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                if self.size > self.max_entries:
+                    # Evict down to 90% so this does not run on every insert.
+                    self.db.execute(
+                        "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY accessed_at LIMIT ?)",
+                        (self.size - self.max_entries * 9 // 10,),
+                    )
+                    self.size = self.db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                self.db.commit()
+
+
+class EmbeddingService:
+    """
+    Shared embedding front-end used by the database layer.
+    Keeps one backend client alive, embeds only the chunks that are stored, batches
+    uncached texts into as few backend requests as possible and caches every result.
+    """
+
+    def __init__(self, backend=None, cache=None, batch_size=256, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.backend = backend if backend is not None else OpenAIEmbeddingBackend()
+        self.model = getattr(self.backend, "model", type(self.backend).__name__)
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.hits = 0
+        self.misses = 0
+        self.stats_lock = threading.Lock()
+
+    def embed(self, text):
+        """
+        Embeds the first chunk of a document.
+        """
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts):
+        """
+        Embeds the first chunk of each document in `texts`, preserving order.
+        """
+        return self.embed_chunks([first_chunk(text, self.chunk_size) for text in texts])
+
+    def embed_documents(self, texts, max_chunks=None):
+        """
+        Embeds every chunk (at most `max_chunks`) of each document in `texts` in one batched
+        pass. Returns one list of chunk vectors per document, in order; the first vector of a
+        document is the one embed_many returns for it.
+        """
+        chunked = [
+            list(islice(iter_chunks(text or "", self.chunk_size), max_chunks)) or [" "]
+            for text in texts
+        ]
+        vectors = self.embed_chunks([chunk for chunks in chunked for chunk in chunks])
+        documents = []
+        start = 0
+        for chunks in chunked:
+            documents.append(vectors[start : start + len(chunks)])
+            start += len(chunks)
+        return documents
+
+    def embed_chunks(self, chunks):
+        """
+        Embeds already-chunked strings. Duplicates and cached chunks are only
+        sent to the backend once, in batches of at most `batch_size`.
+        """
+        keys = [embedding_key(self.model, chunk) for chunk in chunks]
+        found = self.cache.get_many(set(keys))
+
+        pending = OrderedDict()
+        for key, chunk in zip(keys, chunks):
+            if key not in found and key not in pending:
+                pending[key] = chunk
+        with self.stats_lock:
+            self.hits += len(chunks) - len(pending)
+            self.misses += len(pending)
+
+        pending_items = list(pending.items())
+        for start in range(0, len(pending_items), self.batch_size):
+            batch = pending_items[start : start + self.batch_size]
+            vectors = self.backend.embed([chunk for _, chunk in batch])
+            new_items = [(key, vector) for (key, _), vector in zip(batch, vectors)]
+            self.cache.put_many(new_items)
+            found.update(new_items)
+
+        return [found[key] for key in keys]
+
+
+_default_service = None
+_default_service_lock = threading.Lock()
+
+
+def get_embedding_service():
+    """
+    Returns the process-wide EmbeddingService, creating it on first use.
+    INCITE_EMBEDDING_BACKEND=fake selects the offline backend.
+    """
+    global _default_service
+    with _default_service_lock:
+        if _default_service is None:
+            if os.environ.get("INCITE_EMBEDDING_BACKEND", "openai") == "fake":
+                backend = FakeEmbeddingBackend()
+            else:
+                backend = OpenAIEmbeddingBackend()
+            cache = EmbeddingCache(os.path.join(DEFAULT_CACHE_DIR, f"embeddings-{backend.model}.sqlite3"))
+            _default_service = EmbeddingService(backend=backend, cache=cache)
+        return _default_service
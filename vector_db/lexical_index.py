@@ -0,0 +1,152 @@
+import re
+import math
+import heapq
+import threading
+import unicodedata
+from collections import Counter
+
+STOPWORDS = frozenset(
+    """
+    a about above after again against all also an and any are as at be because been before
+    being below between both but by can could did do does doing down during each few for from
+    further had has have having he her here hers him his how i if in into is it its itself
+    just me more most my no nor not now of off on once only or other our ours out over own
+    same she should so some such than that the their theirs them then there these they this
+    those through to too under until up very was we were what when where which while who whom
+    why will with would you your yours via using use uses used based show shows shown paper
+    propose proposed approach method methods results result work new et al however
+    """.split()
+)
+
+ARXIV_ID = re.compile(r"\d{4}\.\d{4,5}")
+TOKEN = re.compile(r"\d{4}\.\d{4,5}|[a-z0-9]+")
+
+
+def tokenize(text):
+    """
+    Lowercase, accent-free word tokens of `text` without stopwords. arXiv ids such as
+    2101.01234 are kept as one token.
+    """
+    if not text:
+        return []
+    text = str(text)
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def extract_keywords(title, content, url=None, max_keywords=8):
+    """
+    Keywords for the Articles.keywords column: the arXiv id (from the url), then the most
+    frequent content terms, counting terms that also appear in the title three times.
+    """
+    keywords = []
+    arxiv_id = ARXIV_ID.search(url or "")
+    if arxiv_id:
+        keywords.append(arxiv_id.group())
+    title_terms = set(tokenize(title))
+    counts = Counter(
+        token for token in tokenize(content) if len(token) > 2 and not token.isdigit()
+    )
+    for term in title_terms:
+        if term in counts:
+            counts[term] *= 3
+    keywords.extend(term for term, _ in counts.most_common(max_keywords) if term not in keywords)
+    return keywords[: max_keywords + 1]
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over documents made of several text fields.
+
+    Term frequencies and lengths of the fields are combined with `field_weights` (a simple
+    BM25F), so a term in the title counts more than one in the summary. Documents can be
+    added, replaced and removed at any time; search() only reads the posting lists of the
+    query terms.
+    """
+
+    def __init__(self, field_weights=None, k1=1.2, b=0.75):
+        self.field_weights = field_weights or {"name": 3.0, "authors": 2.0, "keywords": 2.0, "summary": 1.0}
+        self.k1 = k1
+        self.b = b
+
+        self.lock = threading.RLock()
+        self.postings = {}  # term -> {doc id: weighted term frequency}
+        self.doc_terms = {}  # doc id -> terms (for removal)
+        self.doc_lengths = {}  # doc id -> weighted length
+        self.total_length = 0.0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add_many(self, documents):
+        """
+        Indexes (doc id, {field: text}) pairs. Re-adding a doc id replaces the document.
+        """
+        with self.lock:
+            for doc_id, fields in documents:
+                self._remove(doc_id)
+                frequencies = Counter()
+                length = 0.0
+                for field, weight in self.field_weights.items():
+                    tokens = tokenize(fields.get(field))
+                    length += weight * len(tokens)
+                    for token, count in Counter(tokens).items():
+                        frequencies[token] += weight * count
+                for term, frequency in frequencies.items():
+                    self.postings.setdefault(term, {})[doc_id] = frequency
+                self.doc_terms[doc_id] = list(frequencies)
+                self.doc_lengths[doc_id] = length
+                self.total_length += length
+
+    def _remove(self, doc_id):
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings[term]
+            del posting[doc_id]
+            if not posting:
+                del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+
+    def remove(self, doc_ids):
+        with self.lock:
+            for doc_id in doc_ids:
+                self._remove(doc_id)
+
+    def search(self, query, top_k=10):
+        """
+        Returns [(doc id, BM25 score)] of the best `top_k` documents containing any query
+        term, best first.
+        """
+        terms = set(tokenize(query))
+        scores = {}
+        with self.lock:
+            count = len(self.doc_lengths)
+            if not count or not terms:
+                return []
+            average_length = self.total_length / count or 1.0
+            for term in terms:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1.0 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, frequency in posting.items():
+                    norm = self.k1 * (1.0 - self.b + self.b * self.doc_lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1.0) / (frequency + norm)
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings, k=60, top_k=None):
+    """
+    Fuses ranked lists of (id, score) with reciprocal rank fusion: each id scores
+    sum(1 / (k + rank)) over the lists it appears in. Returns [(id, fused score)], best first.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, (doc_id, _) in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+    return ranked if top_k is None else ranked[:top_k]
@@ -0,0 +1,228 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from vector_db.embeddings import DEFAULT_CACHE_DIR
+
+
+def normalize_query(query):
+    """
+    Canonical form of a query used as the cache key: lowercased, punctuation removed and
+    whitespace collapsed, so "Graph  Neural Networks?" and "graph neural networks" match.
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+
+class QueryResultCache:
+    """
+    TTL + LRU cache of /get_graph results keyed by normalized query text.
+
+    Entries live in an in-memory LRU backed by a SQLite file, so they survive restarts.
+    If `embed` (a text -> vector function) and `similarity_threshold` are given, a query with
+    no exact entry is also matched against the embeddings of cached queries, so near-duplicate
+    phrasings reuse an existing result.
+
+    Entries are tagged with the corpus generation they were computed at. Call invalidate()
+    whenever the underlying articles change: it bumps the generation, stored in the SQLite
+    file so every worker process sharing the file stops serving older entries. Read
+    generation() before computing a result and pass it to put(), so a result computed while
+    articles were being inserted is not stored as current.
+    """
+
+    def __init__(
+        self,
+        path=os.path.join(DEFAULT_CACHE_DIR, "query_results.sqlite3"),
+        ttl=24 * 60 * 60,
+        max_entries=1000,
+        embed=None,
+        similarity_threshold=None,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.lock = threading.Lock()
+        # key -> (created_at, value, embedding or None, generation)
+        self.memory = OrderedDict()
+        # Used without a SQLite file; otherwise the generation row is the shared source.
+        self.local_generation = 0
+        self.hits = 0
+        self.misses = 0
+
+        self.db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self.db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_results (
+                    key TEXT PRIMARY KEY,
+                    created_at REAL,
+                    accessed_at REAL,
+                    value TEXT,
+                    embedding BLOB,
+                    generation INTEGER
+                )
+                """
+            )
+            columns = [row[1] for row in self.db.execute("PRAGMA table_info(query_results)")]
+            if "generation" not in columns:
+                # Files written before generations: their entries never match and expire.
+                self.db.execute("ALTER TABLE query_results ADD COLUMN generation INTEGER")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS corpus_generation (id INTEGER PRIMARY KEY, value INTEGER)"
+            )
+            self.db.execute("INSERT OR IGNORE INTO corpus_generation (id, value) VALUES (0, 0)")
+            self.db.commit()
+            self._load()
+
+    def _load(self):
+        cutoff = time.time() - self.ttl
+        self.db.execute("DELETE FROM query_results WHERE created_at < ?", (cutoff,))
+        self.db.commit()
+        rows = self.db.execute(
+            "SELECT key, created_at, value, embedding, generation FROM query_results ORDER BY accessed_at DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for key, created_at, value, embedding, generation in reversed(rows):
+            vector = np.frombuffer(embedding, dtype=np.float32) if embedding else None
+            self.memory[key] = (created_at, json.loads(value), vector, generation)
+
+    def _generation(self):
+        if self.db is None:
+            return self.local_generation
+        return self.db.execute("SELECT value FROM corpus_generation WHERE id = 0").fetchone()[0]
+
+    def generation(self):
+        """
+        The current corpus generation, to pass to put() with a result computed afterwards.
+        """
+        with self.lock:
+            return self._generation()
+
+    def _evict(self):
+        while len(self.memory) > self.max_entries:
+            key, _ = self.memory.popitem(last=False)
+            if self.db is not None:
+                self.db.execute("DELETE FROM query_results WHERE key = ?", (key,))
+
+    def _lookup(self, key, generation):
+        entry = self.memory.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[0] > self.ttl or entry[3] != generation:
+            del self.memory[key]
+            if self.db is not None:
+                self.db.execute("DELETE FROM query_results WHERE key = ?", (key,))
+                self.db.commit()
+            return None
+        self.memory.move_to_end(key)
+        if self.db is not None:
+            self.db.execute(
+                "UPDATE query_results SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self.db.commit()
+        return entry[1]
+
+    def _nearest_key(self, vector, generation):
+        now = time.time()
+        keys = [
+            key
+            for key, (created_at, _, embedding, entry_generation) in self.memory.items()
+            if embedding is not None and now - created_at <= self.ttl and entry_generation == generation
+        ]
+        if not keys:
+            return None
+        matrix = np.stack([self.memory[key][2] for key in keys])
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        return keys[best] if scores[best] >= self.similarity_threshold else None
+
+    def _query_vector(self, key):
+        if self.embed is None or self.similarity_threshold is None:
+            return None
+        return np.asarray(self.embed(key), dtype=np.float32)
+
+    def get(self, query):
+        """
+        Returns the cached result for `query` computed at the current corpus generation,
+        or None.
+        """
+        key = normalize_query(query)
+        with self.lock:
+            value = self._lookup(key, self._generation())
+        if value is None:
+            # Embedding may be a network call, so it runs without holding the lock.
+            vector = self._query_vector(key)
+            if vector is not None:
+                with self.lock:
+                    generation = self._generation()
+                    nearest = self._nearest_key(vector, generation)
+                    if nearest is not None:
+                        value = self._lookup(nearest, generation)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, query, value, generation):
+        """
+        Stores a JSON-serialisable result for `query`, computed after generation() returned
+        `generation`. Nothing is stored if the corpus has changed since.
+        """
+        key = normalize_query(query)
+        # Embedded before taking the lock, as in get.
+        vector = self._query_vector(key)
+        now = time.time()
+        with self.lock:
+            if generation != self._generation():
+                return
+            self.memory[key] = (now, value, vector, generation)
+            self.memory.move_to_end(key)
+            if self.db is not None:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO query_results (key, created_at, accessed_at, value, embedding, generation) VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        now,
+                        now,
+                        json.dumps(value, default=str),
+                        vector.tobytes() if vector is not None else None,
+                        generation,
+                    ),
+                )
+            self._evict()
+            if self.db is not None:
+                self.db.commit()
+
+    def invalidate(self, *args):
+        """
+        Bumps the corpus generation, so entries computed before are no longer returned (by
+        any process sharing the SQLite file); they are dropped when next looked up or evicted.
+        Accepts and ignores arguments so it can be registered directly as an
+        InCiteIRISDatabase insert listener.
+        """
+        with self.lock:
+            if self.db is None:
+                self.local_generation += 1
+                return
+            self.db.execute("UPDATE corpus_generation SET value = value + 1 WHERE id = 0")
+            self.db.commit()
+
+    def clear(self):
+        """
+        Drops every entry.
+        """
+        with self.lock:
+            self.memory.clear()
+            if self.db is not None:
+                self.db.execute("DELETE FROM query_results")
+                self.db.commit()
@@ -0,0 +1,173 @@
+import re
+import math
+import threading
+import unicodedata
+
+from vector_db.ann_index import IVFIndex
+
+
+def normalize_title(title):
+    """
+    Canonical form of a paper title for matching: accents, LaTeX markup, punctuation and
+    case are dropped and whitespace collapsed.
+    """
+    if not title:
+        return ""
+    title = unicodedata.normalize("NFKD", str(title))
+    title = "".join(c for c in title if not unicodedata.combining(c))
+    title = re.sub(r"\\[a-zA-Z]+|[{}$]", " ", title)
+    title = re.sub(r"[^a-z0-9]+", " ", title.lower())
+    return title.strip()
+
+
+def trigrams(normalized):
+    padded = f" {normalized} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+
+class TitleIndex:
+    """
+    Resolves (possibly garbled) reference titles to keys such as article ids.
+
+    Titles are normalised first; exact matches on the normalised title are a dict lookup.
+    Otherwise candidates come from an inverted index of character trigrams: a title with
+    trigram Jaccard similarity >= `threshold` to the query must contain at least one of the
+    query's len(q) - ceil(threshold * len(q)) + 1 rarest trigrams, so only those (short)
+    posting lists are read and no match is missed. The best candidate at or above the
+    threshold wins. If `embed` (a batch text -> vectors function) is given, titles are also
+    embedded and a nearest-neighbour search with `embedding_threshold` is the last resort.
+    """
+
+    def __init__(
+        self,
+        threshold=0.75,
+        min_fuzzy_length=12,
+        embed=None,
+        embedding_threshold=0.95,
+    ):
+        self.threshold = threshold
+        self.min_fuzzy_length = min_fuzzy_length
+        self.embed = embed
+        self.embedding_threshold = embedding_threshold
+
+        self.lock = threading.RLock()
+        self.exact = {}  # normalised title -> set of keys
+        self.entries = {}  # key -> (normalised title, trigram set)
+        self.postings = {}  # trigram -> set of keys
+        self.vectors = IVFIndex() if embed is not None else None
+        self.vector_keys = {}  # int id in self.vectors -> key
+        self.vector_ids = {}  # key -> int id in self.vectors
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add_many(self, items):
+        """
+        Indexes (key, title) pairs. Re-adding a key replaces its title.
+        """
+        items = [(key, title) for key, title in items if normalize_title(title)]
+        with self.lock:
+            for key, title in items:
+                self._remove(key)
+                normalized = normalize_title(title)
+                grams = trigrams(normalized)
+                self.entries[key] = (normalized, grams)
+                self.exact.setdefault(normalized, set()).add(key)
+                for gram in grams:
+                    self.postings.setdefault(gram, set()).add(key)
+        if self.vectors is not None and items:
+            vectors = self.embed([title for _, title in items])
+            with self.lock:
+                ids = []
+                for key, _ in items:
+                    vector_id = self.vector_ids.get(key)
+                    if vector_id is None:
+                        vector_id = len(self.vector_keys)
+                        self.vector_ids[key] = vector_id
+                        self.vector_keys[vector_id] = key
+                    ids.append(vector_id)
+                self.vectors.add(ids, vectors)
+
+    def add(self, key, title):
+        self.add_many([(key, title)])
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        normalized, grams = entry
+        self.exact[normalized].discard(key)
+        if not self.exact[normalized]:
+            del self.exact[normalized]
+        for gram in grams:
+            posting = self.postings[gram]
+            posting.discard(key)
+            if not posting:
+                del self.postings[gram]
+        vector_id = self.vector_ids.pop(key, None)
+        if vector_id is not None:
+            del self.vector_keys[vector_id]
+            self.vectors.remove([vector_id])
+
+    def remove(self, keys):
+        with self.lock:
+            for key in keys:
+                self._remove(key)
+
+    def match_all(self, title):
+        """
+        Returns [(key, similarity)] for every indexed title matching `title`, best first.
+        Exact (normalised) matches have similarity 1.0.
+        """
+        normalized = normalize_title(title)
+        if not normalized:
+            return []
+        with self.lock:
+            exact = self.exact.get(normalized)
+            if exact:
+                return [(key, 1.0) for key in exact]
+            if len(normalized) < self.min_fuzzy_length:
+                return []
+            grams = trigrams(normalized)
+            prefix_length = len(grams) - math.ceil(self.threshold * len(grams)) + 1
+            rarest = sorted(grams, key=lambda gram: len(self.postings.get(gram, ())))
+            candidates = set()
+            for gram in rarest[:prefix_length]:
+                candidates.update(self.postings.get(gram, ()))
+            # Sets whose sizes differ by more than the threshold allows cannot match.
+            min_size = self.threshold * len(grams)
+            max_size = len(grams) / self.threshold
+            scored = [
+                (key, jaccard(grams, candidate_grams))
+                for key, (_, candidate_grams) in ((key, self.entries[key]) for key in candidates)
+                if min_size <= len(candidate_grams) <= max_size
+            ]
+        matches = sorted(
+            ((key, score) for key, score in scored if score >= self.threshold),
+            key=lambda match: match[1],
+            reverse=True,
+        )
+        if matches or self.vectors is None or not len(self.vectors):
+            return matches
+
+        hits = self.vectors.search(self.embed([title])[0], top_k=1)
+        with self.lock:
+            return [
+                (self.vector_keys[vector_id], score)
+                for vector_id, score in hits
+                if score >= self.embedding_threshold and vector_id in self.vector_keys
+            ]
+
+    def match(self, title):
+        """
+        Returns the key of the best match for `title`, or None.
+        """
+        matches = self.match_all(title)
+        return matches[0][0] if matches else None
@@ -0,0 +1,34 @@
+import numpy as np
+
+# Significant digits needed for a lossless text round trip of each IRIS vector datatype.
+VECTOR_PRECISION = {"double": 17, "float": 9}
+
+_literal_formats = {}
+
+
+def to_array(vector, dtype=np.float32):
+    """
+    Converts a list, NumPy array or IRIS vector string into a 1-D NumPy array.
+    """
+    if isinstance(vector, np.ndarray):
+        return vector.astype(dtype, copy=False)
+    if isinstance(vector, (bytes, bytearray)):
+        vector = vector.decode("utf-8")
+    if isinstance(vector, str):
+        return np.array(vector.strip("[]").split(","), dtype=dtype)
+    return np.asarray(vector, dtype=dtype)
+
+
+def vector_literal(vector, datatype="double"):
+    """
+    Formats a vector as the comma-separated text accepted by TO_VECTOR(?, datatype).
+    Uses a single cached %-format string per (length, datatype) instead of one str() call
+    per element, and rounds to what the column actually stores (9 digits for float).
+    """
+    values = to_array(vector, np.float64 if datatype == "double" else np.float32).tolist()
+    key = (len(values), datatype)
+    fmt = _literal_formats.get(key)
+    if fmt is None:
+        fmt = ",".join([f"%.{VECTOR_PRECISION[datatype]}g"] * len(values))
+        _literal_formats[key] = fmt
+    return fmt % tuple(values)